@@ -0,0 +1,50 @@
+"""
+Archivar las ventas antiguas fuera de la base viva.
+
+Mueve las ventas (con sus items) de los meses completos más viejos que --dias
+a archive_AAAA.db, un archivo por año junto a la base. Los reportes siguen
+viéndolas: Database adjunta el archivo cuando el rango consultado lo alcanza.
+Se puede ejecutar las veces que haga falta (por ejemplo, una vez por mes).
+
+Uso:
+    python archive_sales.py [--base kiosco_pos.db] [--dias 730] [--compactar]
+"""
+import argparse
+import os
+import sys
+import time
+
+from database import Database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivar ventas antiguas en archive_AAAA.db")
+    parser.add_argument("--base", default="kiosco_pos.db")
+    parser.add_argument("--dias", type=int, default=Database.ARCHIVE_AFTER_DAYS,
+                        help="antigüedad mínima de las ventas a archivar")
+    parser.add_argument("--compactar", action="store_true",
+                        help="VACUUM de la base viva al terminar, para achicar el archivo")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.base):
+        print(f"❌ No existe {args.base}")
+        sys.exit(1)
+
+    db = Database(args.base)
+    started = time.perf_counter()
+    archived = db.archive_old_sales(args.dias)
+    if not archived:
+        print(f"No hay ventas de más de {args.dias} días para archivar")
+    for year, count in archived.items():
+        print(f"📦 {count} ventas de {year} → {os.path.basename(db.archive_path(year))}")
+    if archived and args.compactar:
+        db.get_connection().execute('VACUUM')
+    print(f"Listo en {time.perf_counter() - started:.1f} s\n")
+
+    for year, file, archived_until, sales_count, items_count in db.get_sales_archives():
+        print(f"{file}: {sales_count} ventas, {items_count} items (hasta {archived_until})")
+    db.close_connection()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1841 @@
+"""
+Benchmarks de la capa de base de datos.
+
+Uso:
+    python benchmark_db.py conexiones [--productos 20000] [--repeticiones 200]
+    python benchmark_db.py planes [--items 1000000]
+    python benchmark_db.py rangos [--items 1000000] [--anios 5]
+    python benchmark_db.py ventas [--repeticiones 200]
+    python benchmark_db.py resumen [--items 1000000] [--anios 3]
+    python benchmark_db.py horarios [--items 1000000] [--anios 3]
+    python benchmark_db.py productos [--items 1000000] [--anios 1] [--productos 300]
+    python benchmark_db.py cierre [--items 1000000] [--productos 20000]
+    python benchmark_db.py inventario [--productos 20000]
+    python benchmark_db.py migraciones
+    python benchmark_db.py concurrencia [--items 1000000] [--segundos 5]
+    python benchmark_db.py perfilado [--items 100000]
+    python benchmark_db.py archivo [--items 300000] [--anios 3] [--dias 365]
+    python benchmark_db.py respaldo [--items 100000,300000,1000000] [--compresion gz]
+    python benchmark_db.py diario [--items 100000] [--rondas 6] [--ventas 200]
+    python benchmark_db.py escaneo [--productos 1000,10000,30000,100000] [--escaneos 300]
+    python benchmark_db.py refresco [--productos 30,3000,30000] [--ventas 50]
+    python benchmark_db.py grilla [--productos 50000] [--busqueda "producto 123"]
+    python benchmark_db.py carrito [--lineas 10,100,500] [--repeticiones 20]
+    python benchmark_db.py busqueda [--productos 50000] [--busquedas "coca 2.25;cafe;c"]
+    python benchmark_db.py catalogo [--productos 50000] [--cambios 50]
+
+Cada benchmark trabaja sobre una base temporal (nunca sobre kiosco_pos.db).
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from database import Database, date_range_filter
+from db_profiler import QueryProfiler, percentile, read_timings
+from synthetic_data import generate_dataset
+from utils.money import Money
+
+# Fecha final fija para que los datos sintéticos sean reproducibles
+SEED_END_DATE = datetime(2024, 12, 31)
+
+
+class DatabaseConexionPorLlamada(Database):
+    """Comportamiento anterior: una conexión nueva de sqlite3 en cada llamada"""
+
+    def get_connection(self):
+        previous = getattr(self, '_previous_conn', None)
+        if previous is not None:
+            previous.close()
+        self._previous_conn = sqlite3.connect(self.db_name, isolation_level=None)
+        return self._previous_conn
+
+
+class DatabaseVentaPorItem(Database):
+    """Comportamiento anterior de save_sale: hasta tres sentencias por cada item"""
+
+    def save_sale(self, sale_data, items):
+        with self.transaction() as cursor:
+            payment_method = sale_data.get('payment_method', 'Efectivo')
+            payment_status = 'cuenta_corriente' if payment_method == 'Cuenta Corriente' else 'pagado'
+            cursor.execute('''
+                INSERT INTO sales (customer_id, total, payment_method, payment_status, customer_type, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (sale_data.get('customer_id'), Money.to_cents(sale_data['total']), payment_method, payment_status,
+                  sale_data.get('customer_type', 'Consumidor Final'), self.get_current_local_time()))
+            sale_id = cursor.lastrowid
+            for item in items:
+                product_id = item.get('product_id')
+                if not product_id:
+                    cursor.execute('SELECT id FROM products WHERE name = ?', (item['name'],))
+                    result = cursor.fetchone()
+                    if result:
+                        product_id = result[0]
+                cursor.execute('''
+                    INSERT INTO sale_items (sale_id, product_id, product_name, quantity, price, subtotal)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (sale_id, product_id, item['name'], item['quantity'],
+                      Money.to_cents(item['price']), Money.to_cents(item['subtotal'])))
+                if product_id:
+                    cursor.execute('UPDATE products SET stock = stock - ? WHERE id = ?',
+                                   (item['quantity'], product_id))
+        return sale_id
+
+
+def seed_products(db, total_products):
+    """Cargar un catálogo sintético de productos (precios en centavos)"""
+    with db.transaction() as cursor:
+        cursor.executemany('''
+            INSERT INTO products (code, name, category_id, description, buy_price, sell_price, stock, min_stock)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            (f"779{i:010d}", f"Producto {i:05d}", (i % 8) + 1, "", (100 + i % 50) * 100, (150 + i % 70) * 100, i % 40, 5)
+            for i in range(total_products)
+        ))
+
+
+def seed_sales(db, total_items, days=365, items_per_sale=3, total_products=2000, seed=42):
+    """
+    Cargar ventas sintéticas repartidas en los últimos `days` días hasta SEED_END_DATE.
+    Los importes van en centavos; en las bases anteriores a la migración 6 quedan
+    como pesos (más grandes), lo que no cambia ninguna de las verificaciones.
+    """
+    rng = random.Random(seed)
+    total_sales = max(1, total_items // items_per_sale)
+    first_day = SEED_END_DATE - timedelta(days=days - 1)
+    seconds_span = days * 86400
+
+    with db.transaction() as cursor:
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM sales')
+        first_sale_id = cursor.fetchone()[0] + 1
+
+        sales = []
+        items = []
+        for offset in range(total_sales):
+            sale_id = first_sale_id + offset
+            # Ventas ordenadas en el tiempo, como en un local real
+            created_at = first_day + timedelta(seconds=offset * seconds_span // total_sales)
+            total = 0
+            for _ in range(items_per_sale):
+                product_id = rng.randint(1, total_products)
+                quantity = rng.randint(1, 3)
+                price = (150 + product_id % 70) * 100
+                items.append((sale_id, product_id, f"Producto {product_id - 1:05d}", quantity, price, quantity * price))
+                total += quantity * price
+            is_credit = rng.random() < 0.1
+            sales.append((sale_id, total, "Cuenta Corriente" if is_credit else "💵 Efectivo",
+                          "cuenta_corriente" if is_credit else "pagado", "🧑 Consumidor Final",
+                          created_at.strftime("%Y-%m-%d %H:%M:%S")))
+
+        cursor.executemany('''
+            INSERT INTO sales (id, total, payment_method, payment_status, customer_type, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', sales)
+        cursor.executemany('''
+            INSERT INTO sale_items (sale_id, product_id, product_name, quantity, price, subtotal)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', items)
+    return total_sales
+
+
+def time_calls(func, repetitions):
+    """Devuelve la lista de tiempos (ms) de cada llamada"""
+    timings = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def print_timings(label, timings):
+    print(f"  {label:<38} media {statistics.mean(timings):8.3f} ms   "
+          f"mediana {statistics.median(timings):8.3f} ms")
+
+
+def bench_connections(args):
+    """Latencia por llamada: conexión por llamada vs conexión persistente"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "bench.db")
+        db = Database(db_path)
+        seed_products(db, args.productos)
+        db.close_connection()
+
+        calls = [
+            ("get_low_stock_count()", lambda d: d.get_low_stock_count()),
+            ("get_product_by_code()", lambda d: d.get_product_by_code("7790000000123")),
+            ("get_categories()", lambda d: d.get_categories()),
+            ("get_sales_summary(hoy, hoy)", lambda d: d.get_sales_summary("2024-01-01", "2024-01-01")),
+        ]
+
+        print(f"Catálogo: {args.productos} productos, {args.repeticiones} repeticiones por método\n")
+        for title, db_class in (("ANTES - conexión por llamada", DatabaseConexionPorLlamada),
+                                ("AHORA - conexión persistente", Database)):
+            print(title)
+            bench_db = db_class(db_path)
+            for label, call in calls:
+                print_timings(label, time_calls(lambda: call(bench_db), args.repeticiones))
+            bench_db.close_connection()
+            print()
+
+
+# Métodos de reporte que se revisan en `planes`, con el rango de fechas típico de la UI
+REPORT_CALLS = [
+    ("get_sales_summary", lambda d, s, e: d.get_sales_summary(s, e)),
+    ("get_previous_period_sales", lambda d, s, e: d.get_previous_period_sales(s, e)),
+    ("get_top_products", lambda d, s, e: d.get_top_products(s, e, 10)),
+    ("get_total_products_sold", lambda d, s, e: d.get_total_products_sold(s, e)),
+    ("get_sales_report", lambda d, s, e: d.get_sales_report(s, e)),
+    ("get_detailed_sales_report", lambda d, s, e: d.get_detailed_sales_report(s, e)),
+    ("get_hourly_sales", lambda d, s, e: d.get_hourly_sales(s, e)),
+    ("get_payment_methods_distribution", lambda d, s, e: d.get_payment_methods_distribution(s, e)),
+    ("get_detailed_movements", lambda d, s, e: d.get_detailed_movements(e)),
+    ("get_credit_payments_by_date", lambda d, s, e: d.get_credit_payments_by_date(e)),
+    ("get_cash_register_income_summary", lambda d, s, e: d.get_cash_register_income_summary(e)),
+]
+
+# Tablas grandes que ningún reporte con rango de fechas debe recorrer completas
+LARGE_TABLES = {
+    "sale_items": ("sale_items", "si"),
+    "sales": ("sales", "s"),
+    "credit_payments": ("credit_payments", "cp"),
+}
+
+
+def capture_statements(db, call):
+    """Ejecutar `call` y devolver las sentencias SELECT que envió a SQLite"""
+    statements = []
+    conn = db.get_connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    return [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+
+
+def find_full_scans(conn, sql):
+    """Devuelve los pasos del plan que recorren completa alguna tabla de LARGE_TABLES"""
+    full_scans = []
+    for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+        detail = row[3]
+        if not detail.startswith("SCAN "):
+            continue
+        scanned = detail.split()[1]
+        for table, names in LARGE_TABLES.items():
+            if scanned in names:
+                full_scans.append(detail)
+    return full_scans
+
+
+def check_query_plans(args):
+    """Regresión de EXPLAIN QUERY PLAN: ningún reporte debe recorrer una tabla grande completa"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, "plans.db"))
+        seed_products(db, 2000)
+        print(f"Generando {args.items} items de venta...")
+        seed_sales(db, args.items, days=args.dias)
+
+        end = SEED_END_DATE.strftime("%Y-%m-%d")
+        start = (SEED_END_DATE - timedelta(days=6)).strftime("%Y-%m-%d")
+        conn = db.get_connection()
+        failures = 0
+
+        for name, call in REPORT_CALLS:
+            statements = capture_statements(db, lambda: call(db, start, end))
+            full_scans = [scan for sql in statements for scan in find_full_scans(conn, sql)]
+            status = "❌ SCAN" if full_scans else "✅ OK  "
+            print(f"{status} {name:<36} {'; '.join(full_scans)}")
+            failures += bool(full_scans)
+
+        db.close_connection()
+
+    if failures:
+        print(f"\n{failures} método(s) recorren una tabla grande completa")
+        sys.exit(1)
+    print("\nTodos los reportes usan índices sobre las tablas grandes")
+
+
+def bench_date_ranges(args):
+    """Filtro DATE(created_at) BETWEEN vs rango semiabierto sobre varios años de ventas"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, "ranges.db"))
+        seed_products(db, 2000)
+        print(f"Generando {args.items} items de venta en {args.anios} años...")
+        seed_sales(db, args.items, days=args.anios * 365)
+        conn = db.get_connection()
+
+        end = SEED_END_DATE.strftime("%Y-%m-%d")
+        ranges = [
+            ("1 día", end),
+            ("1 semana", (SEED_END_DATE - timedelta(days=6)).strftime("%Y-%m-%d")),
+            ("1 mes", (SEED_END_DATE - timedelta(days=29)).strftime("%Y-%m-%d")),
+        ]
+        select = "SELECT COUNT(*), COALESCE(SUM(total), 0) FROM sales WHERE "
+        failures = 0
+
+        for label, start in ranges:
+            date_filter, date_params = date_range_filter("created_at", start, end)
+            variants = [
+                ("DATE() BETWEEN", select + "DATE(created_at) BETWEEN ? AND ?", [start, end]),
+                ("rango semiabierto", select + date_filter, date_params),
+            ]
+            print(f"\nRango: {label} ({start} a {end})")
+            results = set()
+            for name, sql, params in variants:
+                plan = "; ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+                results.add(conn.execute(sql, params).fetchone())
+                timings = time_calls(lambda: conn.execute(sql, params).fetchone(), args.repeticiones)
+                print_timings(name, timings)
+                print(f"      plan: {plan}")
+            if "USING INDEX idx_sales_created_at" not in plan or len(results) != 1:
+                failures += 1
+
+        print("\nReportes completos con el rango de 1 semana")
+        start = ranges[1][1]
+        for name, call in REPORT_CALLS:
+            print_timings(name, time_calls(lambda: call(db, start, end), 5))
+
+        db.close_connection()
+
+    if failures:
+        print(f"\n{failures} rango(s) sin búsqueda por índice o con resultados distintos")
+        sys.exit(1)
+    print("\nEl rango semiabierto usa idx_sales_created_at y devuelve los mismos totales")
+
+
+def make_basket(lines, with_ids=True):
+    """Carrito sintético con `lines` productos distintos, como lo arma SalesModule"""
+    items = []
+    for i in range(lines):
+        product_id = i + 1
+        item = {'name': f"Producto {i:05d}", 'quantity': 1, 'price': 150 + product_id % 70,
+                'subtotal': 150 + product_id % 70, 'stock': 1000000}
+        if with_ids:
+            item['product_id'] = product_id
+        items.append(item)
+    return items
+
+
+def bench_sales(args):
+    """save_sale: sentencias por item vs inserción por lotes, con carritos de 1, 10 y 100 líneas"""
+    sale_data = {'total': 0, 'payment_method': '💵 Efectivo', 'customer_type': '🧑 Consumidor Final'}
+    failures = 0
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for title, db_class in (("ANTES - sentencias por item", DatabaseVentaPorItem),
+                                ("AHORA - por lotes con descuento condicional", Database)):
+            print(title)
+            db = db_class(os.path.join(tmp_dir, f"{db_class.__name__}.db"))
+            seed_products(db, 200)
+            with db.transaction() as cursor:
+                cursor.execute('UPDATE products SET stock = 1000000')
+            for lines in (1, 10, 100):
+                for with_ids in (True, False):
+                    basket = make_basket(lines, with_ids)
+                    label = f"{lines:>3} líneas {'con id' if with_ids else 'por nombre'}"
+                    print_timings(label, time_calls(lambda: db.save_sale(sale_data, basket), args.repeticiones))
+            db.close_connection()
+            print()
+
+        # Un carrito con una línea sin stock no debe guardar nada
+        db = Database(os.path.join(tmp_dir, "atomic.db"))
+        seed_products(db, 10)
+        conn = db.get_connection()
+        before = (conn.execute('SELECT COUNT(*) FROM sales').fetchone(),
+                  conn.execute('SELECT SUM(stock) FROM products').fetchall())
+        basket = make_basket(10)
+        basket[-1]['quantity'] = 1000
+        try:
+            db.save_sale(sale_data, basket)
+            print("❌ La venta sin stock suficiente se guardó")
+            failures += 1
+        except Exception as e:
+            after = (conn.execute('SELECT COUNT(*) FROM sales').fetchone(),
+                     conn.execute('SELECT SUM(stock) FROM products').fetchall())
+            if after != before:
+                print("❌ La venta fallida dejó cambios en la base")
+                failures += 1
+            else:
+                print(f"✅ Venta sin stock rechazada sin cambios: {e}")
+        db.close_connection()
+
+    if failures:
+        sys.exit(1)
+
+
+def summary_from_sales(db, start_date, end_date):
+    """Resumen calculado recorriendo sales (como antes de sales_daily)"""
+    date_filter, date_params = date_range_filter("created_at", start_date, end_date)
+    return db.get_connection().execute(f'''
+        SELECT COUNT(*), COALESCE(SUM(total), 0) / 100.0, COALESCE(AVG(total), 0) / 100.0,
+               COUNT(DISTINCT customer_type)
+        FROM sales WHERE {date_filter}
+    ''', date_params).fetchone()
+
+
+def same_summary(a, b):
+    return a[0] == b[0] and a[3] == b[3] and all(abs(x - y) < 0.01 for x, y in zip(a[1:3], b[1:3]))
+
+
+def bench_daily_summary(args):
+    """get_sales_summary: recorrer sales vs leer el resumen diario sales_daily"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, "summary.db"))
+        seed_products(db, 2000)
+        print(f"Generando {args.items} items de venta en {args.anios} años...")
+        seed_sales(db, args.items, days=args.anios * 365)
+
+        # Modificar y borrar algunas ventas para ejercitar los triggers
+        with db.transaction() as cursor:
+            cursor.execute("UPDATE sales SET payment_status = 'cuenta_corriente', total = total + 1 WHERE id % 97 = 0")
+            cursor.execute("UPDATE sales SET created_at = DATETIME(created_at, '-1 day') WHERE id % 89 = 0")
+            cursor.execute("DELETE FROM sales WHERE id % 101 = 0")
+
+        end = SEED_END_DATE.strftime("%Y-%m-%d")
+        failures = 0
+        for label, days in (("1 día", 1), ("1 mes", 30), ("1 año", 365)):
+            start = (SEED_END_DATE - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+            print(f"\nRango: {label}")
+            scanned = summary_from_sales(db, start, end)
+            rollup = db.get_sales_summary(start, end)
+            print_timings("recorriendo sales", time_calls(lambda: summary_from_sales(db, start, end), args.repeticiones))
+            print_timings("sales_daily", time_calls(lambda: db.get_sales_summary(start, end), args.repeticiones))
+            if not same_summary(scanned, rollup):
+                print(f"  ❌ Distinto: {scanned} vs {rollup}")
+                failures += 1
+
+        db.close_connection()
+
+    if failures:
+        sys.exit(1)
+    print("\nsales_daily coincide con el cálculo sobre sales en todos los rangos")
+
+
+def bench_hourly_sales(args):
+    """Ventas por hora, por día de la semana y mapa de calor desde sales_hourly"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, "hourly.db"))
+        seed_products(db, 2000)
+        print(f"Generando {args.items} items de venta en {args.anios} años...")
+        seed_sales(db, args.items, days=args.anios * 365)
+        with db.transaction() as cursor:
+            cursor.execute("UPDATE sales SET created_at = DATETIME(created_at, '+5 hours') WHERE id % 89 = 0")
+            cursor.execute("DELETE FROM sales WHERE id % 101 = 0")
+        conn = db.get_connection()
+
+        # Referencia: agrupar directamente sobre sales, como antes
+        def hourly_from_sales():
+            return conn.execute('''
+                SELECT strftime('%H', created_at), COUNT(*), COALESCE(SUM(total), 0) / 100.0
+                FROM sales GROUP BY 1 ORDER BY 1
+            ''').fetchall()
+
+        def weekday_from_sales():
+            return conn.execute('''
+                SELECT CAST(strftime('%w', created_at) AS INTEGER), COUNT(*), COALESCE(SUM(total), 0) / 100.0
+                FROM sales GROUP BY 1 ORDER BY 1
+            ''').fetchall()
+
+        checks = [
+            ("por hora", hourly_from_sales, lambda: db.get_hourly_sales()),
+            ("por día de la semana", weekday_from_sales, lambda: db.get_weekday_sales()),
+        ]
+        failures = 0
+        for label, from_sales, from_rollup in checks:
+            print(f"\nVentas {label} (historial completo)")
+            print_timings("recorriendo sales", time_calls(from_sales, args.repeticiones))
+            print_timings("sales_hourly", time_calls(from_rollup, args.repeticiones))
+            expected, actual = from_sales(), from_rollup()
+            if len(expected) != len(actual) or not all(
+                    a[0] == b[0] and a[1] == b[1] and abs(a[2] - b[2]) < 0.01 for a, b in zip(expected, actual)):
+                print(f"  ❌ Distinto: {expected} vs {actual}")
+                failures += 1
+
+        print("\nMapa de calor")
+        print_timings("get_sales_heatmap()", time_calls(lambda: db.get_sales_heatmap(), args.repeticiones))
+        heatmap = db.get_sales_heatmap()
+        if sum(map(sum, heatmap['sales_count'])) != conn.execute('SELECT COUNT(*) FROM sales').fetchone()[0]:
+            print("  ❌ El mapa de calor no suma la cantidad de ventas")
+            failures += 1
+
+        db.close_connection()
+
+    if failures:
+        sys.exit(1)
+    print("\nsales_hourly coincide con el cálculo sobre sales")
+
+
+def products_in_money(rows):
+    """Filas de get_products con los precios en Money, como CatalogService.product"""
+    return [row[:4] + (Money.from_pesos(row[4]), Money.from_pesos(row[5])) + tuple(row[6:]) for row in rows]
+
+
+def top_products_from_items(db, start_date, end_date, limit):
+    """Ranking calculado con el join sales/sale_items (como antes de product_sales_daily)"""
+    date_filter, date_params = date_range_filter("s.created_at", start_date, end_date)
+    return db.get_connection().execute(f'''
+        SELECT si.product_id, SUM(si.quantity) as total_quantity, SUM(si.subtotal)
+        FROM sales s
+        CROSS JOIN sale_items si ON si.sale_id = s.id
+        WHERE {date_filter}
+        GROUP BY si.product_id
+        ORDER BY total_quantity DESC, si.product_id
+        LIMIT ?
+    ''', date_params + [limit]).fetchall()
+
+
+def top_products_from_rollup(db, start_date, end_date, limit):
+    return db.get_connection().execute('''
+        SELECT product_id, SUM(quantity) as total_quantity, SUM(revenue)
+        FROM product_sales_daily
+        WHERE date BETWEEN ? AND ?
+        GROUP BY product_id
+        ORDER BY total_quantity DESC, product_id
+        LIMIT ?
+    ''', (start_date, end_date, limit)).fetchall()
+
+
+def bench_product_sales(args):
+    """get_top_products / get_total_products_sold: join sobre sale_items vs product_sales_daily"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, "products.db"))
+        seed_products(db, args.productos)
+        print(f"Generando {args.items} items de venta en {args.anios} año(s) sobre {args.productos} productos...")
+        seed_sales(db, args.items, days=args.anios * 365, total_products=args.productos)
+
+        # Ejercitar los triggers: cambios de fecha, items y ventas borrados
+        with db.transaction() as cursor:
+            cursor.execute("UPDATE sales SET created_at = DATETIME(created_at, '-1 day') WHERE id % 89 = 0")
+            cursor.execute("UPDATE sale_items SET quantity = quantity + 1, subtotal = subtotal * 2 WHERE id % 83 = 0")
+            cursor.execute("DELETE FROM sale_items WHERE id % 79 = 0")
+            cursor.execute("DELETE FROM sales WHERE id % 101 = 0")
+
+        end = SEED_END_DATE.strftime("%Y-%m-%d")
+        failures = 0
+        for label, days in (("1 día", 1), ("1 mes", 30), ("1 año", 365)):
+            start = (SEED_END_DATE - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+            print(f"\nRango: {label}")
+            for limit in (5, 50):
+                print_timings(f"join sale_items (top {limit})",
+                              time_calls(lambda: top_products_from_items(db, start, end, limit), args.repeticiones))
+                print_timings(f"get_top_products (top {limit})",
+                              time_calls(lambda: db.get_top_products(start, end, limit), args.repeticiones))
+                expected = top_products_from_items(db, start, end, limit)
+                actual = top_products_from_rollup(db, start, end, limit)
+                if [row[:2] for row in expected] != [row[:2] for row in actual] or \
+                        any(abs(a[2] - b[2]) > 0.01 for a, b in zip(expected, actual)):
+                    print(f"  ❌ Ranking distinto (top {limit})")
+                    failures += 1
+
+        expected_units = db.get_connection().execute(
+            'SELECT SUM(si.quantity) FROM sales s CROSS JOIN sale_items si ON si.sale_id = s.id').fetchone()[0]
+        if db.get_total_products_sold() != expected_units:
+            print("  ❌ get_total_products_sold no coincide con sale_items")
+            failures += 1
+
+        # Borrar el producto más vendido no debe borrar su historial
+        top_name, top_quantity, _ = db.get_top_products(None, None, 1)[0]
+        with db.transaction() as cursor:
+            cursor.execute('DELETE FROM products WHERE name = ?', (top_name,))
+        if db.get_top_products(None, None, 1)[0][:2] != (top_name, top_quantity):
+            print("  ❌ Se perdió el historial de un producto borrado")
+            failures += 1
+        else:
+            print(f"\n✅ '{top_name}' sigue en el ranking después de borrarlo")
+
+        db.close_connection()
+
+    if failures:
+        sys.exit(1)
+    print("product_sales_daily coincide con el join sobre sale_items")
+
+
+def cash_close_with_separate_calls(db, date):
+    """Las ocho llamadas que hacían los diálogos de cierre de caja"""
+    total_sales, total_amount, average_ticket, unique_customers = db.get_sales_summary(date, date)
+    return {
+        'total_income': db.get_cash_register_income_summary(date),
+        'total_sales': total_sales,
+        'total_amount': total_amount,
+        'average_ticket': average_ticket,
+        'unique_customers': unique_customers,
+        'total_products_sold': db.get_total_products_sold(date, date),
+        'top_products': db.get_top_products(date, date, 5),
+        'inventory_value': db.get_inventory_value(),
+        'total_products': db.get_total_products(),
+        'low_stock_count': db.get_low_stock_count(),
+        'out_of_stock_count': db.get_out_of_stock_count(),
+    }
+
+
+def bench_cash_close(args):
+    """Cierre de caja: ocho llamadas separadas vs get_cash_close_snapshot()"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, "cash_close.db"))
+        seed_products(db, args.productos)
+        print(f"Generando {args.items} items de venta...")
+        seed_sales(db, args.items, total_products=min(args.productos, 2000))
+        date = SEED_END_DATE.strftime("%Y-%m-%d")
+
+        print_timings("8 llamadas separadas",
+                      time_calls(lambda: cash_close_with_separate_calls(db, date), args.repeticiones))
+        print_timings("get_cash_close_snapshot()",
+                      time_calls(lambda: db.get_cash_close_snapshot(date), args.repeticiones))
+
+        expected = cash_close_with_separate_calls(db, date)
+        snapshot = db.get_cash_close_snapshot(date)
+        different = [key for key, value in expected.items()
+                     if (abs(value - snapshot[key]) > 0.01 if isinstance(value, float) else value != snapshot[key])]
+        db.close_connection()
+
+    if different:
+        print(f"❌ Valores distintos: {', '.join(different)}")
+        sys.exit(1)
+    print("\nEl snapshot coincide con las llamadas separadas")
+
+
+def inventory_stats_from_scans(db):
+    """Los cuatro recorridos de products que hacían las tarjetas y alertas"""
+    conn = db.get_connection()
+    return (
+        conn.execute('SELECT COUNT(*) FROM products').fetchone()[0],
+        conn.execute('SELECT COUNT(*) FROM products WHERE stock > 0 AND stock <= min_stock').fetchone()[0],
+        conn.execute('SELECT COUNT(*) FROM products WHERE stock = 0').fetchone()[0],
+        conn.execute('SELECT COALESCE(SUM(stock * buy_price), 0) / 100.0 FROM products WHERE stock > 0').fetchone()[0],
+    )
+
+
+def bench_inventory_stats(args):
+    """Contadores de inventario: cuatro recorridos de products vs inventory_stats"""
+    rng = random.Random(7)
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, "inventory.db"))
+        seed_products(db, args.productos)
+
+        print_timings("4 recorridos de products", time_calls(lambda: inventory_stats_from_scans(db), args.repeticiones))
+        print_timings("get_inventory_stats()", time_calls(db.get_inventory_stats, args.repeticiones))
+
+        # Altas, bajas, ediciones y ventas al azar: los triggers deben seguir exactos
+        with db.transaction() as cursor:
+            for _ in range(2000):
+                product_id = rng.randint(1, args.productos)
+                action = rng.random()
+                if action < 0.5:
+                    cursor.execute('UPDATE products SET stock = ? WHERE id = ?', (rng.randint(0, 10), product_id))
+                elif action < 0.7:
+                    cursor.execute('UPDATE products SET min_stock = ?, buy_price = ? WHERE id = ?',
+                                   (rng.randint(0, 8), rng.randint(500, 5000), product_id))
+                elif action < 0.85:
+                    cursor.execute('DELETE FROM products WHERE id = ?', (product_id,))
+                else:
+                    cursor.execute('''
+                        INSERT INTO products (code, name, buy_price, sell_price, stock, min_stock)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    ''', (f"X{rng.random()}", "Nuevo", rng.randint(500, 5000), 9900, rng.randint(0, 10), 5))
+        sale_item = {'product_id': 2, 'name': 'x', 'quantity': 1, 'price': 1, 'subtotal': 1}
+        with db.transaction() as cursor:
+            cursor.execute('UPDATE products SET stock = 5 WHERE id = 2')
+        db.save_sale({'total': 1}, [sale_item])
+
+        stats = db.get_inventory_stats()
+        if db.check_inventory_stats():
+            failures += 1
+        else:
+            print(f"\n✅ inventory_stats consistente después de 2000 cambios: {stats}")
+
+        # Un desvío provocado a mano debe detectarse y repararse
+        with db.transaction() as cursor:
+            cursor.execute('UPDATE inventory_stats SET low_stock_count = low_stock_count + 3')
+        if not db.check_inventory_stats(repair=True) or db.check_inventory_stats():
+            print("❌ El verificador no detectó o no reparó el desvío")
+            failures += 1
+        else:
+            print("✅ Desvío detectado y reparado")
+        db.close_connection()
+
+    if failures:
+        sys.exit(1)
+
+
+class DatabaseEnVersion(Database):
+    """Base creada solo hasta la migración `version` (esquemas históricos)"""
+
+    def __init__(self, db_name, version):
+        self.SCHEMA_MIGRATIONS = Database.SCHEMA_MIGRATIONS[:version]
+        super().__init__(db_name)
+
+
+class DatabaseInicioCompleto(Database):
+    """Inicio anterior: revisar todo el esquema en cada arranque"""
+
+    def init_database(self):
+        with self.transaction() as cursor:
+            self._create_schema(cursor)
+            self.apply_migrations(cursor)
+
+
+# Esquema de aronium_pos.db: sin categorías, sin category_id y con un único precio
+ARONIUM_SCHEMA = [
+    '''CREATE TABLE products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, code TEXT UNIQUE NOT NULL, name TEXT NOT NULL,
+        description TEXT, price REAL NOT NULL, stock INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''',
+    '''CREATE TABLE customers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, email TEXT, phone TEXT, address TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''',
+    '''CREATE TABLE sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, customer_id INTEGER, total REAL NOT NULL, payment_method TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY (customer_id) REFERENCES customers (id))''',
+    '''CREATE TABLE sale_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, sale_id INTEGER, product_id INTEGER, quantity INTEGER NOT NULL,
+        price REAL NOT NULL, FOREIGN KEY (sale_id) REFERENCES sales (id),
+        FOREIGN KEY (product_id) REFERENCES products (id))''',
+]
+
+
+def build_aronium_schema(path):
+    conn = sqlite3.connect(path)
+    for ddl in ARONIUM_SCHEMA:
+        conn.execute(ddl)
+    conn.executemany('INSERT INTO products (code, name, price, stock) VALUES (?, ?, ?, ?)',
+                     [(f"A{i}", f"Producto {i}", 100 + i, i % 7) for i in range(50)])
+    conn.executemany('INSERT INTO sales (id, total, payment_method, created_at) VALUES (?, ?, ?, ?)',
+                     [(i, 300 + i, "Cuenta Corriente" if i % 5 == 0 else "Efectivo",
+                       f"2024-12-{1 + i % 28:02d} 1{i % 10}:00:00") for i in range(1, 201)])
+    conn.executemany('INSERT INTO sale_items (sale_id, product_id, quantity, price) VALUES (?, ?, ?, ?)',
+                     [(1 + i // 2, 1 + i % 50, 1 + i % 3, 100 + i % 50) for i in range(400)])
+    conn.commit()
+    conn.close()
+
+
+def build_schema_without_category(path):
+    """Esquema base anterior a las categorías (products sin category_id)"""
+    db = DatabaseEnVersion(path, 0)
+    with db.transaction() as cursor:
+        cursor.execute('DROP TABLE categories')
+        cursor.execute('DROP TABLE products')
+        cursor.execute('''
+            CREATE TABLE products (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, code TEXT UNIQUE, name TEXT NOT NULL, description TEXT,
+                buy_price REAL NOT NULL, sell_price REAL NOT NULL, stock INTEGER NOT NULL,
+                min_stock INTEGER DEFAULT 5, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)
+        ''')
+        cursor.executemany('''
+            INSERT INTO products (code, name, buy_price, sell_price, stock, min_stock) VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(f"779{i:010d}", f"Producto {i:05d}", 100, 150 + i % 70, i % 40, 5) for i in range(200)])
+    seed_sales(db, 3000, days=60, total_products=200)
+    db.close_connection()
+
+
+def build_schema_version(path, version):
+    db = DatabaseEnVersion(path, version)
+    seed_products(db, 200)
+    seed_sales(db, 3000, days=60, total_products=200)
+    db.close_connection()
+
+
+def schema_objects(conn):
+    """{tabla: columnas} y nombres de índices/triggers de una base"""
+    tables = {}
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"):
+        tables[name] = {row[1] for row in conn.execute(f"PRAGMA table_info({name})")}
+    others = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger') "
+                                             "AND name NOT LIKE 'sqlite_%'")}
+    return tables, others
+
+
+def check_upgraded_database(path, reference):
+    """Errores encontrados en una base recién actualizada (lista vacía si está bien)"""
+    errors = []
+    raw = sqlite3.connect(path)
+    counts_before = [raw.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                     for table in ("products", "sales", "sale_items")]
+    raw.close()
+
+    db = Database(path)
+    conn = db.get_connection()
+    if db.get_schema_version() != db.latest_schema_version():
+        errors.append(f"versión {db.get_schema_version()}")
+
+    tables, others = schema_objects(conn)
+    reference_tables, reference_others = reference
+    for table, columns in reference_tables.items():
+        missing = columns - tables.get(table, set())
+        if missing:
+            errors.append(f"faltan columnas en {table}: {sorted(missing)}")
+    if reference_others - others:
+        errors.append(f"faltan índices/triggers: {sorted(reference_others - others)}")
+
+    counts_after = [conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                    for table in ("products", "sales", "sale_items")]
+    if counts_after != counts_before:
+        errors.append(f"filas antes {counts_before}, después {counts_after}")
+
+    scanned = conn.execute('''
+        SELECT COUNT(*), COALESCE(SUM(total), 0) / 100.0, COALESCE(AVG(total), 0) / 100.0,
+               COUNT(DISTINCT customer_type)
+        FROM sales
+    ''').fetchone()
+    if not same_summary(scanned, db.get_sales_summary()):
+        errors.append("sales_daily no coincide con sales")
+    units = conn.execute('''
+        SELECT COALESCE(SUM(si.quantity), 0) FROM sales s CROSS JOIN sale_items si ON si.sale_id = s.id
+    ''').fetchone()[0]
+    if db.get_total_products_sold() != units:
+        errors.append("product_sales_daily no coincide con sale_items")
+    if db.check_inventory_stats():
+        errors.append("inventory_stats no coincide con products")
+    db.close_connection()
+    return errors
+
+
+def check_migrations(args):
+    """Actualizar bases de cada esquema histórico a la última versión y verificarlas"""
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        reference_db = Database(os.path.join(tmp_dir, "reference.db"))
+        reference = schema_objects(reference_db.get_connection())
+        reference_db.close_connection()
+
+        cases = [
+            ("aronium (sin categorías ni category_id)", build_aronium_schema),
+            ("base sin category_id", build_schema_without_category),
+        ]
+        cases += [(f"versión {version}", lambda path, v=version: build_schema_version(path, v))
+                  for version in range(0, reference_db.latest_schema_version())]
+        if os.path.exists("aronium_pos.db"):
+            cases.append(("aronium_pos.db", lambda path: shutil.copy("aronium_pos.db", path)))
+
+        for label, build in cases:
+            path = os.path.join(tmp_dir, f"case_{len(label)}_{abs(hash(label))}.db")
+            build(path)
+            print(f"\n== {label}")
+            errors = check_upgraded_database(path, reference)
+            if errors:
+                print(f"❌ {label}: {'; '.join(errors)}")
+                failures += 1
+            else:
+                print(f"✅ {label}: actualizada a v{reference_db.latest_schema_version()}")
+
+        # Inicio con la base ya en la última versión
+        path = os.path.join(tmp_dir, "startup.db")
+        build_schema_version(path, reference_db.latest_schema_version())
+        print()
+        for label, db_class in (("ANTES - revisar todo el esquema", DatabaseInicioCompleto),
+                                ("AHORA - solo PRAGMA user_version", Database)):
+            def open_database():
+                db_class(path).close_connection()
+            print_timings(label, time_calls(open_database, args.repeticiones))
+
+    if failures:
+        sys.exit(1)
+
+
+def bench_concurrency(args):
+    """Lecturas en paralelo mientras se guardan ventas, y cancelación de tareas de DbExecutor"""
+    failures = 0
+    sale_data = {'total': 0, 'payment_method': '💵 Efectivo', 'customer_type': '🧑 Consumidor Final'}
+    # Un mes de reporte, como el período "Este mes" de ReportsModule
+    start_date = (SEED_END_DATE - timedelta(days=29)).strftime("%Y-%m-%d")
+    end_date = SEED_END_DATE.strftime("%Y-%m-%d")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, "concurrency.db"))
+        seed_products(db, 200)
+        with db.transaction() as cursor:
+            cursor.execute('UPDATE products SET stock = 1000000')
+        print(f"Generando {args.items} items de venta...")
+        seed_sales(db, args.items, total_products=200)
+        conn = db.get_connection()
+        sales_before = conn.execute('SELECT COUNT(*) FROM sales').fetchone()[0]
+        stock_before = conn.execute('SELECT SUM(stock) FROM products').fetchone()[0]
+
+        stop = threading.Event()
+        reads, writes, errors = [], [], []
+
+        def reader():
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    db.get_detailed_sales_report(start_date, end_date)
+                    db.get_top_products(start_date, end_date, 10)
+                except Exception as e:
+                    errors.append(f"lectura: {e}")
+                reads.append((time.perf_counter() - started) * 1000)
+
+        def writer():
+            basket = make_basket(5)
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    db.save_sale(sale_data, basket)
+                except Exception as e:
+                    errors.append(f"venta: {e}")
+                    continue
+                writes.append((time.perf_counter() - started) * 1000)
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        threads += [threading.Thread(target=writer) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.segundos)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        print(f"{len(reads)} lecturas y {len(writes)} ventas en {args.segundos} s")
+        print_timings("lectura (4 hilos)", reads)
+        print_timings("save_sale (2 hilos)", writes)
+
+        sales_after = conn.execute('SELECT COUNT(*) FROM sales').fetchone()[0]
+        stock_after = conn.execute('SELECT SUM(stock) FROM products').fetchone()[0]
+        if errors:
+            print(f"❌ {len(errors)} errores, el primero: {errors[0]}")
+            failures += 1
+        if sales_after - sales_before != len(writes) or stock_before - stock_after != 5 * len(writes):
+            print("❌ Las ventas guardadas no coinciden con el stock descontado")
+            failures += 1
+        else:
+            print("✅ Ventas serializadas sin errores de bloqueo y con el stock consistente")
+
+        failures += check_executor_cancel(db)
+        db.close_connection()
+
+    if failures:
+        sys.exit(1)
+
+
+def check_executor_cancel(db):
+    """Una tarea cancelada se interrumpe en SQLite y su resultado no llega a la UI"""
+    from PyQt5.QtCore import QCoreApplication
+    from utils.db_worker import DbExecutor
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    executor = DbExecutor(db)
+    delivered = []
+    slow_query = ('WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1000000000) '
+                  'SELECT COUNT(*) FROM c')
+
+    executor.read('lenta', lambda db: db.get_connection().execute(slow_query).fetchone(),
+                  delivered.append, delivered.append)
+    time.sleep(0.2)
+    started = time.perf_counter()
+    executor.cancel('lenta')
+    executor.read_pool.waitForDone(5000)
+    cancel_time = time.perf_counter() - started
+
+    # Una lectura normal en el mismo pool sigue funcionando después de la interrupción
+    executor.read('conteo', lambda db: db.get_connection().execute('SELECT COUNT(*) FROM sales').fetchone()[0],
+                  delivered.append)
+    executor.read_pool.waitForDone(5000)
+    app.processEvents()
+    executor.shutdown()
+
+    if cancel_time > 1 or len(delivered) != 1 or not isinstance(delivered[0], int):
+        print(f"❌ Cancelación: {cancel_time * 1000:.0f} ms, resultados entregados {delivered}")
+        return 1
+    print(f"✅ Consulta cancelada en {cancel_time * 1000:.0f} ms, sin resultado entregado")
+    return 0
+
+
+def bench_profiler(args):
+    """Costo de la instrumentación (POS_DB_SLOW_MS) y contenido del log de consultas lentas"""
+    start_date = (SEED_END_DATE - timedelta(days=29)).strftime("%Y-%m-%d")
+    end_date = SEED_END_DATE.strftime("%Y-%m-%d")
+    calls = (
+        ("get_sales_summary", lambda db: db.get_sales_summary(start_date, end_date)),
+        ("get_top_products", lambda db: db.get_top_products(start_date, end_date, 10)),
+        ("get_sales_report", lambda db: db.get_sales_report(start_date, end_date)),
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "profiler.db")
+        db = Database(path)
+        seed_products(db, 2000)
+        print(f"Generando {args.items} items de venta...")
+        seed_sales(db, args.items)
+        db.close_connection()
+
+        log_dir = os.path.join(tmp_dir, "logs")
+        for title, profiler in (("sin instrumentación", None),
+                                ("con instrumentación", QueryProfiler(slow_ms=args.umbral, log_dir=log_dir))):
+            db = Database(path, profiler=profiler)
+            print(title)
+            for name, call in calls:
+                print_timings(name, time_calls(lambda: call(db), args.repeticiones))
+            db.close_connection()
+
+        logged = read_timings(os.path.join(log_dir, "db_timings.log"))
+        with open(os.path.join(log_dir, "slow_queries.log"), encoding="utf-8") as slow_log:
+            slow_entries = slow_log.read().count("LENTO ")
+            slow_log.seek(0)
+            plans = slow_log.read().count("PLAN: ")
+
+    print()
+    profiler.print_summary()
+    missing = [name for name, _ in calls if len(logged.get(name, [])) != args.repeticiones]
+    if missing:
+        print(f"❌ Faltan mediciones en el log para: {', '.join(missing)}")
+        sys.exit(1)
+    print(f"\n{slow_entries} llamadas sobre {args.umbral} ms en el log de lentas, con {plans} líneas de plan")
+
+
+def bench_archive(args):
+    """Archivo de ventas antiguas: tiempos de los reportes con y sin las ventas viejas archivadas"""
+    recent_start = (SEED_END_DATE - timedelta(days=29)).strftime("%Y-%m-%d")
+    end = SEED_END_DATE.strftime("%Y-%m-%d")
+    old_day = (SEED_END_DATE - timedelta(days=args.anios * 365 - 100)).strftime("%Y-%m-%d")
+    boundary = (SEED_END_DATE - timedelta(days=args.dias)).replace(day=1)
+    around_boundary = ((boundary - timedelta(days=10)).strftime("%Y-%m-%d"),
+                       (boundary + timedelta(days=10)).strftime("%Y-%m-%d"))
+    calls = [
+        ("get_sales_report (mes reciente)", lambda db: db.get_sales_report(recent_start, end)),
+        ("get_detailed_sales_report (mes reciente)", lambda db: db.get_detailed_sales_report(recent_start, end)),
+        ("get_payment_methods_distribution (mes reciente)",
+         lambda db: db.get_payment_methods_distribution(recent_start, end)),
+        ("get_sales_report (toda la historia)", lambda db: db.get_sales_report()),
+        ("get_detailed_sales_report (cruza el corte)", lambda db: db.get_detailed_sales_report(*around_boundary)),
+        ("get_payment_methods_distribution (toda la historia)", lambda db: db.get_payment_methods_distribution()),
+        ("get_detailed_movements (día archivado)", lambda db: db.get_detailed_movements(old_day)),
+        ("get_cash_register_income_summary (día archivado)",
+         lambda db: db.get_cash_register_income_summary(old_day)),
+        ("get_sales_summary (toda la historia)", lambda db: db.get_sales_summary()),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        live_path = os.path.join(tmp_dir, "sin_archivar", "pos.db")
+        archived_path = os.path.join(tmp_dir, "archivada", "pos.db")
+        os.makedirs(os.path.dirname(live_path))
+        os.makedirs(os.path.dirname(archived_path))
+        db = Database(live_path)
+        print(f"Generando {args.items} items de venta en {args.anios} años...")
+        generate_dataset(db, sale_items=args.items, days=args.anios * 365, end_date=SEED_END_DATE)
+        db.get_connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        db.close_connection()
+        shutil.copy(live_path, archived_path)
+
+        archived_db = Database(archived_path)
+        started = time.perf_counter()
+        archived = archived_db.archive_old_sales(args.dias, reference_date=end)
+        print(f"Archivado en {time.perf_counter() - started:.1f} s: {archived}")
+        archived_db.get_connection().execute('VACUUM')
+        live_sales = archived_db.get_connection().execute('SELECT COUNT(*) FROM sales').fetchone()[0]
+        print(f"Base viva: {os.path.getsize(live_path) // 1024} KB → {os.path.getsize(archived_path) // 1024} KB, "
+              f"{live_sales} ventas\n")
+
+        live_db = Database(live_path)
+        for label, call in calls:
+            print(label)
+            print_timings("sin archivar", time_calls(lambda: call(live_db), args.repeticiones))
+            print_timings("con archivos", time_calls(lambda: call(archived_db), args.repeticiones))
+        live_db.close_connection()
+        archived_db.close_connection()
+
+
+def bench_backup(args):
+    """Respaldo en línea: tiempo de copia y compresión según el tamaño, con ventas guardándose durante la copia"""
+    from db_backup import BackupService, decompress_file
+
+    failures = 0
+    sale_data = {'total': 0, 'payment_method': '💵 Efectivo', 'customer_type': '🧑 Consumidor Final'}
+    sizes = [int(value) for value in args.items.split(",")]
+    rows = []
+
+    for total_items in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "backup.db")
+            db = Database(path)
+            seed_products(db, 2000)
+            with db.transaction() as cursor:
+                cursor.execute('UPDATE products SET stock = 1000000')
+            print(f"Generando {total_items} items de venta...")
+            seed_sales(db, total_items)
+            db.get_connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            sales_before = db.get_connection().execute('SELECT COUNT(*) FROM sales').fetchone()[0]
+
+            # Antes: backup() de un solo paso sobre la conexión de quien lo llama
+            one_shot_path = os.path.join(tmp_dir, "un_paso.db")
+            started = time.perf_counter()
+            target = sqlite3.connect(one_shot_path)
+            db.get_connection().backup(target)
+            target.close()
+            one_shot = time.perf_counter() - started
+            os.remove(one_shot_path)
+
+            # Ahora: por tramos en otro hilo, con un cajero vendiendo mientras tanto
+            service = BackupService(path, backup_dir=os.path.join(tmp_dir, "backups"),
+                                    compression=args.compresion)
+            writes, errors = [], []
+            job = service.start()
+
+            def writer():
+                basket = make_basket(3)
+                while not job.done.is_set():
+                    started = time.perf_counter()
+                    try:
+                        db.save_sale(sale_data, basket)
+                    except Exception as e:
+                        errors.append(str(e))
+                        continue
+                    writes.append((time.perf_counter() - started) * 1000)
+
+            thread = threading.Thread(target=writer)
+            thread.start()
+            job.wait()
+            thread.join()
+
+            if not job.verified or errors:
+                print(f"❌ Respaldo: {job.error or job.entry['integrity']}, errores de venta: {errors[:1]}")
+                failures += 1
+            else:
+                restored_path = decompress_file(job.path, os.path.join(tmp_dir, "restaurada.db"))
+                restored = sqlite3.connect(restored_path)
+                integrity = restored.execute('PRAGMA integrity_check').fetchone()[0]
+                restored_sales = restored.execute('SELECT COUNT(*) FROM sales').fetchone()[0]
+                restored.close()
+                # La copia es una foto: tiene al menos lo de antes y nunca más de lo guardado después
+                if integrity != 'ok' or not sales_before <= restored_sales <= sales_before + len(writes):
+                    print(f"❌ Copia inválida: integrity_check={integrity}, {restored_sales} ventas "
+                          f"(antes {sales_before}, después {sales_before + len(writes)})")
+                    failures += 1
+                if job.restarts:
+                    print(f"❌ La copia se reinició {job.restarts} veces")
+                    failures += 1
+            db.close_connection()
+
+            megabytes = job.database_bytes / 1024 / 1024
+            rows.append((total_items, megabytes, one_shot, job.copy_seconds, job.compress_seconds,
+                         job.verify_seconds, job.compressed_bytes / 1024 / 1024, job.steps, len(writes),
+                         max(writes) if writes else 0.0))
+            print_timings("save_sale durante la copia", writes)
+
+    print(f"\n{'items':>9} {'MB':>7} {'un paso s':>10} {'tramos s':>9} {'comprimir s':>12} {'verificar s':>12} "
+          f"{'MB comp.':>9} {'tramos':>7} {'ventas':>7} {'máx venta ms':>13}")
+    for (total_items, megabytes, one_shot, copy_seconds, compress_seconds, verify_seconds,
+         compressed, steps, sales, worst) in rows:
+        print(f"{total_items:>9} {megabytes:>7.1f} {one_shot:>10.2f} {copy_seconds:>9.2f} {compress_seconds:>12.2f} "
+              f"{verify_seconds:>12.2f} {compressed:>9.1f} {steps:>7} {sales:>7} {worst:>13.1f}")
+    if failures:
+        sys.exit(1)
+    print("\n✅ Copias íntegras y sin reinicios mientras se guardaban ventas")
+
+
+def bench_change_journal(args):
+    """Diario de cambios: tiempos de envío y de reconstrucción, y costo de los triggers en save_sale"""
+    from db_backup import BackupService, decompress_file
+    from db_journal import list_segments, replay_journal
+
+    rng = random.Random(7)
+    end = SEED_END_DATE.strftime("%Y-%m-%d")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "pos.db")
+        db = Database(path)
+        seed_products(db, 2000)
+        print(f"Generando {args.items} items de venta en dos años...")
+        seed_sales(db, args.items, days=730)
+        with db.transaction() as cursor:
+            cursor.execute('UPDATE products SET stock = 1000000')
+        started = time.perf_counter()
+        shipped = db.ship_change_journal()
+        print(f"Carga inicial: {shipped} cambios enviados en {time.perf_counter() - started:.1f} s")
+
+        base = BackupService(path, backup_dir=os.path.join(tmp_dir, "backups")).backup_now()
+
+        # Después del respaldo: todas las operaciones que registra el diario, con envíos intermedios
+        sale_data = {'total': 0, 'payment_method': '💵 Efectivo', 'customer_type': '🧑 Consumidor Final'}
+        credit_sale = {'total': 0, 'payment_method': 'Cuenta Corriente', 'customer_type': '👤 Cliente'}
+        ship_times = []
+        for round_number in range(args.rondas):
+            for _ in range(args.ventas):
+                db.save_sale(credit_sale if rng.random() < 0.1 else sale_data, make_basket(rng.randint(1, 6)))
+            with db.transaction() as cursor:
+                cursor.execute('INSERT INTO customers (name, phone) VALUES (?, ?)',
+                               (f"Cliente diario {round_number}", "1100000000"))
+                customer_id = cursor.lastrowid
+                cursor.execute('''
+                    INSERT INTO credit_payments (customer_id, amount, payment_method) VALUES (?, ?, ?)
+                ''', (customer_id, Money.to_cents(1500.5), '💵 Efectivo'))
+                cursor.execute('UPDATE customers SET current_credit = current_credit - ? WHERE id = ?',
+                               (Money.to_cents(1500.5), customer_id))
+                # Anular una venta vieja: sus items se borran por trigger
+                cursor.execute('DELETE FROM sales WHERE id = ?', (rng.randint(1, 1000),))
+            db.add_product({'code': f"DIARIO{round_number}", 'name': f"Producto diario {round_number}",
+                            'buy_price': 99.99, 'sell_price': 149.9, 'stock': 10})
+            db.update_product_stock(rng.randint(1, 2000), rng.randint(0, 50))
+            db.delete_product(db.get_product_by_code(f"DIARIO{round_number}")[0])
+            db.add_category(f"Categoría diario {round_number}")
+            day = (SEED_END_DATE + timedelta(days=round_number + 1)).strftime("%Y-%m-%d")
+            db.insert_cash_open_record(day, 10000)
+            db.insert_cash_close_record(day, 54321.09)
+            if round_number == args.rondas // 2:
+                archived = db.archive_old_sales(365, reference_date=end)
+                print(f"Archivadas en el medio: {archived}")
+            started = time.perf_counter()
+            db.ship_change_journal()
+            ship_times.append((time.perf_counter() - started) * 1000)
+        db.ship_change_journal()
+        db.get_connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        db.close_connection()
+        print_timings("ship_change_journal por ronda", ship_times)
+
+        journal_directory = os.path.join(tmp_dir, "backups", "journal_pos")
+        segments = [segment for segment in list_segments(journal_directory) if segment[1] > base.entry["journal_seq"]]
+        journal_bytes = sum(os.path.getsize(segment_path) for _, _, segment_path in segments)
+        print(f"Respaldo completo {base.compressed_bytes // 1024} KB; diario posterior "
+              f"{len(segments)} segmentos, {journal_bytes // 1024} KB")
+
+        replayed_path = decompress_file(base.path, os.path.join(tmp_dir, "reconstruida.db"))
+        started = time.perf_counter()
+        changes = replay_journal(replayed_path, journal_directory)
+        print(f"Reconstrucción: {changes} cambios aplicados en {time.perf_counter() - started:.2f} s")
+
+        # Costo de los triggers del diario en save_sale
+        db = Database(path)
+        with_journal = time_calls(lambda: db.save_sale(sale_data, make_basket(5)), args.repeticiones)
+        with db.transaction() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_journal_%'")
+            for (name,) in cursor.fetchall():
+                cursor.execute(f'DROP TRIGGER {name}')
+        without_journal = time_calls(lambda: db.save_sale(sale_data, make_basket(5)), args.repeticiones)
+        db.close_connection()
+        print("save_sale de 5 items")
+        print_timings("con diario", with_journal)
+        print_timings("sin diario", without_journal)
+
+
+def bench_barcode_scan(args):
+    """Escaneo hasta el carrito en SalesModule: índice por código contra recorrer la lista, según el catálogo"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from modules.sales import SalesModule
+
+    class SalesModuleBusquedaLineal(SalesModule):
+        """Comportamiento anterior: recorrer la lista de productos en cada escaneo"""
+
+        def find_product_by_code(self, code):
+            for slot, product_code in enumerate(self.catalog.codes):
+                if product_code == code:
+                    return self.sales_product(self.catalog.product(slot))
+            return None
+
+    app = QApplication.instance() or QApplication([])
+    failures = 0
+    sizes = [int(value) for value in args.productos.split(",")]
+    rng = random.Random(42)
+    medians = []
+    print(f"{'productos':>10} {'lista p50':>10} {'lista p95':>10} {'índice p50':>11} {'índice p95':>11}")
+
+    for total_products in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = Database(os.path.join(tmp_dir, "scan.db"))
+            seed_products(db, total_products)
+            with db.transaction() as cursor:
+                cursor.execute('UPDATE products SET stock = 1000000')
+            # Los códigos de seed_products son 779 + índice; el id es índice + 1
+            picks = [rng.randrange(total_products) for _ in range(args.escaneos)]
+            results = []
+            for module_class in (SalesModuleBusquedaLineal, SalesModule):
+                module = module_class(db)
+                # Se mide la búsqueda y el carrito, no el armado de la grilla de productos
+                module.filter_products = lambda: None
+                module.load_products()
+                timings = []
+                for index in picks:
+                    module.cart_items = []
+                    module.barcode_input.setText(f"779{index:010d}")
+                    started = time.perf_counter()
+                    module.search_by_barcode()
+                    timings.append((time.perf_counter() - started) * 1000)
+                    if [item['product_id'] for item in module.cart_items] != [index + 1]:
+                        failures += 1
+                ordered = sorted(timings)
+                results.append((percentile(ordered, 50), percentile(ordered, 95)))
+                if module_class is not SalesModule:
+                    # El módulo anterior deja de escuchar al catálogo compartido
+                    db.catalog.remove_listener(module.on_catalog_changed)
+                    db.catalog.remove_listener(module.products_model.on_catalog_changed)
+            medians.append(results[1][0])
+
+            # Un producto dado de alta después de cargar se encuentra en la base y queda en el índice
+            db.add_product({'code': "ALTA-NUEVA", 'name': "Producto nuevo", 'sell_price': 10, 'stock': 5})
+            module.cart_items = []
+            module.barcode_input.setText("ALTA-NUEVA")
+            module.search_by_barcode()
+            if [item['name'] for item in module.cart_items] != ["Producto nuevo"] \
+                    or "ALTA-NUEVA" not in db.catalog.by_code:
+                print("❌ El producto nuevo no se encontró en la base")
+                failures += 1
+            module.widget.deleteLater()
+            db.close_connection()
+
+        (linear_p50, linear_p95), (index_p50, index_p95) = results
+        print(f"{total_products:>10} {linear_p50:>8.3f}ms {linear_p95:>8.3f}ms {index_p50:>9.3f}ms {index_p95:>9.3f}ms")
+        app.processEvents()
+
+    if failures:
+        print(f"❌ {failures} escaneos agregaron otro producto al carrito")
+        sys.exit(1)
+    print(f"\nCon el índice, la mediana va de {medians[0]:.3f} ms a {medians[-1]:.3f} ms "
+          f"entre {sizes[0]} y {sizes[-1]} productos")
+
+
+def bench_catalog_refresh(args):
+    """Actualización de la pantalla de ventas después de una venta: cambios del catálogo contra recarga completa"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from modules.sales import SalesModule
+
+    app = QApplication.instance() or QApplication([])
+    failures = 0
+    sizes = [int(value) for value in args.productos.split(",")]
+    rng = random.Random(42)
+    print(f"{'productos':>10} {'recarga':>10} {'cambios p50':>12} {'cambios p95':>12}")
+
+    for total_products in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = Database(os.path.join(tmp_dir, "refresh.db"))
+            seed_products(db, total_products)
+            with db.transaction() as cursor:
+                cursor.execute('UPDATE products SET stock = 1000000')
+            module = SalesModule(db)
+            started = time.perf_counter()
+            module.load_products()
+            reload_ms = (time.perf_counter() - started) * 1000
+
+            timings = []
+            for _ in range(args.ventas):
+                product_ids = rng.sample(range(1, total_products + 1), min(3, total_products))
+                db.save_sale({'total': 300, 'payment_method': "Efectivo"}, [
+                    {'product_id': product_id, 'name': f"Producto {product_id}", 'quantity': 1,
+                     'price': 100, 'subtotal': 100}
+                    for product_id in product_ids
+                ])
+                started = time.perf_counter()
+                module.refresh_products()
+                timings.append((time.perf_counter() - started) * 1000)
+                app.processEvents()
+
+            # La tabla y el catálogo en memoria tienen que quedar como después de una recarga completa
+            expected = products_in_money(db.get_products())
+            in_memory = [db.catalog.product(slot) for slot in range(len(db.catalog))]
+            shown = [module.products_proxy.index(row, 2).data() for row in range(module.products_proxy.rowCount())]
+            module.load_products()
+            reloaded = [module.products_proxy.index(row, 2).data() for row in range(module.products_proxy.rowCount())]
+            if sorted(expected) != sorted(in_memory) or shown != reloaded:
+                print(f"❌ Con {total_products} productos la pantalla no coincide con la base")
+                failures += 1
+            module.widget.deleteLater()
+            app.processEvents()
+            db.close_connection()
+
+        ordered = sorted(timings)
+        print(f"{total_products:>10} {reload_ms:>8.1f}ms {percentile(ordered, 50):>10.3f}ms "
+              f"{percentile(ordered, 95):>10.3f}ms")
+
+    if failures:
+        sys.exit(1)
+
+
+def bench_product_grid(args):
+    """Grillas de productos de Ventas y Productos: tiempo por tecla al filtrar, con la grilla ya dibujada"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from modules.sales import SalesModule
+    from modules.products import ProductsModule
+
+    app = QApplication.instance() or QApplication([])
+    target_ms = 16
+    failures = 0
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, "grid.db"))
+        seed_products(db, args.productos)
+        products = db.get_products()
+        # Se escribe la búsqueda letra por letra, se borra y se cambia de categoría
+        query = args.busqueda
+        keystrokes = [query[:i] for i in range(1, len(query) + 1)] + \
+                     [query[:i] for i in range(len(query) - 1, -1, -1)]
+
+        sales = SalesModule(db)
+        inventory = ProductsModule(db)
+        # Un solo catálogo en memoria para las dos pantallas
+        db.catalog.load()
+        screens = [
+            ("Ventas", sales, sales.name_search_input, sales.category_filter, "Bebidas"),
+            ("Productos", inventory, inventory.search_input, inventory.category_combo, "Bebidas"),
+        ]
+
+        print(f"{args.productos} productos, búsqueda {query!r}")
+        for label, module, search_input, category_combo, category in screens:
+            module.widget.resize(1280, 800)
+            module.widget.show()
+            # Sin la espera entre teclas: se mide el filtrado de cada una
+            module.search_timer.setInterval(0)
+            app.processEvents()
+
+            timings = []
+            for text in keystrokes + [None]:
+                started = time.perf_counter()
+                if text is None:
+                    category_combo.setCurrentText(category)
+                else:
+                    search_input.setText(text)
+                # Filtrado, armado de la vista y dibujo, como en una vuelta del bucle de eventos
+                app.processEvents()
+                timings.append((time.perf_counter() - started) * 1000)
+
+            # Con la categoría elegida y sin texto: mismas filas que filtrando la lista a mano
+            category_index = 3
+            expected = sorted(row[0] for row in products if row[category_index] == category)
+            shown = sorted(module.products_proxy.record(row)[0]
+                           for row in range(module.products_proxy.rowCount()))
+            search_input.setText(query)
+            app.processEvents()
+            expected_query = sorted(row[0] for row in products if row[category_index] == category
+                                    and search_reference(query, f"{row[2]} {row[1] or ''}"))
+            shown_query = sorted(module.products_proxy.record(row)[0]
+                                 for row in range(module.products_proxy.rowCount()))
+            if shown != expected or shown_query != expected_query:
+                print(f"❌ {label}: las filas visibles no coinciden con el filtro")
+                failures += 1
+
+            ordered = sorted(timings)
+            p95 = percentile(ordered, 95)
+            status = "✅" if p95 < target_ms else "❌"
+            print(f"  {status} {label:<10} teclas {len(timings):>3}   p50 {percentile(ordered, 50):7.2f} ms   "
+                  f"p95 {p95:7.2f} ms   máx {ordered[-1]:7.2f} ms")
+            if p95 >= target_ms:
+                failures += 1
+            module.widget.hide()
+
+        inventory.executor.shutdown()
+        db.close_connection()
+
+    if failures:
+        sys.exit(1)
+
+
+def bench_cart(args):
+    """Carrito de la pantalla de ventas: costo de sumar, cambiar cantidad y quitar una línea según su tamaño"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import (QApplication, QTableWidget, QTableWidgetItem, QWidget, QHBoxLayout,
+                                 QPushButton, QLabel)
+    from modules.sales import SalesModule
+    from utils.formatters import format_currency
+
+    def rebuild_cart_table(table, items):
+        """Como el update_cart_display anterior: recrear items y botones de todas las filas"""
+        table.setRowCount(len(items))
+        for row, item in enumerate(items):
+            table.setItem(row, 0, QTableWidgetItem(item['name']))
+            table.setItem(row, 1, QTableWidgetItem(format_currency(item['price'])))
+            qty_widget = QWidget()
+            qty_layout = QHBoxLayout(qty_widget)
+            for text in ("-", str(item['quantity']), "+"):
+                widget = QLabel(text) if text.isdigit() else QPushButton(text)
+                widget.setStyleSheet("font-weight: bold;")
+                qty_layout.addWidget(widget)
+            table.setCellWidget(row, 2, qty_widget)
+            table.setItem(row, 3, QTableWidgetItem(format_currency(item['subtotal'])))
+            remove_btn = QPushButton("🗑️")
+            remove_btn.setStyleSheet("background-color: #6b7280; border-radius: 6px;")
+            table.setCellWidget(row, 4, remove_btn)
+
+    app = QApplication.instance() or QApplication([])
+    failures = 0
+    sizes = [int(value) for value in args.lineas.split(",")]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, "cart.db"))
+        seed_products(db, max(sizes) + 1)
+        with db.transaction() as cursor:
+            cursor.execute('UPDATE products SET stock = 1000000')
+        module = SalesModule(db)
+        module.load_products()
+        # Productos en el orden de la grilla: (id, nombre, precio, stock) para add_to_cart
+        products = [(row[0], row[2], row[5], row[6])
+                    for row in map(db.catalog.product, db.catalog.name_order())]
+        module.widget.resize(1280, 800)
+        module.widget.show()
+        old_table = QTableWidget(0, 5)
+        old_table.resize(700, 500)
+        old_table.show()
+        app.processEvents()
+
+        print(f"{'líneas':>7} {'agregar':>9} {'cantidad':>9} {'quitar':>9} {'anterior':>10}")
+        for lines in sizes:
+            module.cart_items = []
+            for product in products[:lines]:
+                module.add_to_cart(*product)
+            app.processEvents()
+
+            def timed(action):
+                timings = []
+                for n in range(args.repeticiones):
+                    started = time.perf_counter()
+                    action(n)
+                    app.processEvents()
+                    timings.append((time.perf_counter() - started) * 1000)
+                return percentile(sorted(timings), 50)
+
+            extra = products[lines]
+            add_ms = timed(lambda n: (module.add_to_cart(extra[0], extra[1], extra[2], extra[3]),
+                                      module.remove_from_cart(len(module.cart_items) - 1)))
+            quantity_ms = timed(lambda n: module.increase_quantity(lines // 2))
+            remove_ms = timed(lambda n: (module.remove_from_cart(lines // 2),
+                                         module.add_to_cart(*products[lines // 2])))
+            old_ms = timed(lambda n: rebuild_cart_table(old_table, module.cart_items))
+
+            expected = sum((item['price'] * item['quantity'] for item in module.cart_items), Money(0))
+            if module.cart_model.total != expected or module.total_value.text() != format_currency(expected):
+                print(f"❌ Con {lines} líneas el total no coincide con la suma del carrito")
+                failures += 1
+            print(f"{lines:>7} {add_ms:>7.2f}ms {quantity_ms:>7.2f}ms {remove_ms:>7.2f}ms {old_ms:>8.2f}ms")
+
+        module.widget.hide()
+        old_table.hide()
+        db.close_connection()
+
+    print("\nagregar / quitar incluyen deshacer el cambio; anterior = recrear todas las filas como antes")
+    if failures:
+        sys.exit(1)
+
+
+def search_catalog_names(total_products, seed=42):
+    """
+    Textos de búsqueda del catálogo (nombre y código, como CatalogService.search_text):
+    marcas, acentos y presentaciones ("Coca-Cola Zero 2,25L 7790000000001")
+    """
+    rng = random.Random(seed)
+    brands = ["Coca-Cola", "Pepsi", "Sprite", "Fanta", "Café La Virginia", "Yerba Playadito",
+              "Galletitas Oreo", "Alfajor Jorgito", "Leche La Serenísima", "Agua Villavicencio",
+              "Cerveza Quilmes", "Chocolate Águila", "Té Taragüí", "Jugo Cepita", "Papas Lay's"]
+    variants = ["Original", "Zero", "Light", "Limón", "Naranja", "Clásico", "Sin azúcar",
+                "Durazno", "Negro", "Mantecol", "Triple", "Descremada"]
+    sizes = ["354ml", "500ml", "1L", "1,5L", "2,25L", "3L", "250g", "500g", "1kg", "x 6u"]
+    return [f"{rng.choice(brands)} {rng.choice(variants)} {rng.choice(sizes)} 779{i:010d}"
+            for i in range(1, total_products + 1)]
+
+
+def search_reference(query, text):
+    """Mismo criterio que SearchIndex, recorriendo las palabras del texto"""
+    from utils.search_index import search_tokens, infix_searchable, is_barcode, suffix_searchable
+    tokens = search_tokens(text)
+    return all(any(token.startswith(word) or (infix_searchable(word) and word in token)
+                   or (suffix_searchable(word) and is_barcode(token) and token.endswith(word))
+                   for token in tokens)
+               for word in search_tokens(query))
+
+
+def bench_search_index(args):
+    """Índice de búsqueda de productos: armado y tiempo por búsqueda contra recorrer los nombres"""
+    from utils.search_index import SearchIndex
+
+    names = search_catalog_names(args.productos)
+    queries = [query.strip() for query in args.busquedas.split(";") if query.strip()]
+    failures = 0
+
+    started = time.perf_counter()
+    index = SearchIndex(names)
+    build_ms = (time.perf_counter() - started) * 1000
+    print(f"{args.productos} productos: índice armado en {build_ms:.0f} ms, "
+          f"{len(index.postings)} palabras\n")
+
+    lowered = [name.lower() for name in names]
+    print(f"{'búsqueda':<16} {'filas':>7} {'índice p50':>11} {'p95':>9} {'recorrido':>10}")
+    for query in queries:
+        timings = []
+        for _ in range(args.repeticiones):
+            started = time.perf_counter()
+            groups = index.search(query)
+            rows = [row for score in sorted(groups, reverse=True) for row in sorted(groups[score])]
+            timings.append((time.perf_counter() - started) * 1000)
+
+        # La búsqueda anterior: el texto tal cual dentro de cada nombre en minúsculas
+        started = time.perf_counter()
+        for _ in range(args.repeticiones):
+            text = query.lower()
+            [row for row, name in enumerate(lowered) if text in name]
+        scan_ms = (time.perf_counter() - started) * 1000 / args.repeticiones
+
+        expected = {row for row, name in enumerate(names) if search_reference(query, name)}
+        if set(rows) != expected or len(rows) != len(expected):
+            print(f"❌ {query!r}: las filas no coinciden con recorrer los nombres")
+            failures += 1
+
+        ordered = sorted(timings)
+        print(f"{query!r:<16} {len(rows):>7} {percentile(ordered, 50):>9.2f}ms "
+              f"{percentile(ordered, 95):>7.2f}ms {scan_ms:>8.2f}ms")
+
+    # "coca 2.25" tiene que encontrar "Coca-Cola ... 2,25L" aunque el nombre use coma y guion
+    rows = set().union(*index.search("coca 2.25").values())
+    if not rows or any(not names[row].startswith("Coca-Cola") or "2,25L" not in names[row]
+                       for row in rows):
+        print("❌ 'coca 2.25' no encuentra solo los Coca-Cola de 2,25L")
+        failures += 1
+    # Sin acentos encuentra con acentos, y al revés
+    if index.search("aguila") != index.search("Águila") or not index.search("serenisima"):
+        print("❌ La búsqueda distingue acentos")
+        failures += 1
+    # Los últimos dígitos del código de barras encuentran el producto
+    last_row = len(names) - 1
+    if last_row not in set().union(*index.search(names[last_row].split()[-1][-5:]).values()):
+        print("❌ Los últimos dígitos del código no encuentran el producto")
+        failures += 1
+
+    if failures:
+        sys.exit(1)
+
+
+def bench_shared_catalog(args):
+    """Catálogo compartido (db_catalog.py): memoria contra una copia por módulo y cambios visibles en las dos grillas"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    import tracemalloc
+    from PyQt5.QtWidgets import QApplication
+    from modules.sales import SalesModule
+    from modules.products import ProductsModule
+    from utils.formatters import format_currency
+    from utils.search_index import SearchIndex
+
+    app = QApplication.instance() or QApplication([])
+    failures = 0
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, "catalog.db"))
+        seed_products(db, args.productos)
+
+        # Antes cada pantalla tenía su lista de tuplas y su índice de búsqueda
+        tracemalloc.start()
+        rows = db.get_products()
+        sales_rows = [SalesModule.sales_product(row) for row in rows]
+        indexes = (SearchIndex(row[1] for row in sales_rows),
+                   SearchIndex(f"{row[2]} {row[1] or ''}" for row in rows))
+        per_module_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del rows, sales_rows, indexes
+
+        tracemalloc.start()
+        db.catalog.load()
+        catalog_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        db.catalog.load()
+        load_ms = (time.perf_counter() - started) * 1000
+        print(f"{args.productos} productos: carga {load_ms:.0f} ms, "
+              f"{per_module_bytes / 2**20:.1f} MB con una copia por pantalla, "
+              f"{catalog_bytes / 2**20:.1f} MB el catálogo compartido")
+
+        sales = SalesModule(db)
+        inventory = ProductsModule(db)
+        for module in (sales, inventory):
+            module.widget.resize(1280, 800)
+            module.widget.show()
+        started = time.perf_counter()
+        db.catalog.load()
+        app.processEvents()
+        reload_ms = (time.perf_counter() - started) * 1000
+
+        def shown(module, slot, column):
+            """Texto de una celda de la grilla del módulo para un producto (None si no está visible)"""
+            row = module.products_proxy.proxy_rows().get(slot)
+            return None if row is None else module.products_proxy.index(row, column).data()
+
+        # Ventas muestra precio y stock en las columnas 1 y 2; Productos en la 5 y la 6
+        timings = []
+        for n in range(args.cambios):
+            product_id = rng.randrange(1, args.productos + 1)
+            if n % 2:
+                new_stock = rng.randrange(100, 1000)
+                started = time.perf_counter()
+                db.catalog.update_product_stock(product_id, new_stock)
+                app.processEvents()
+                timings.append((time.perf_counter() - started) * 1000)
+                expected = (f"✅ {new_stock}", 2, 6)
+            else:
+                new_price = rng.randrange(100, 100000)
+                with db.transaction() as cursor:
+                    cursor.execute('UPDATE products SET sell_price = ? WHERE id = ?', (new_price, product_id))
+                started = time.perf_counter()
+                db.catalog.refresh()
+                app.processEvents()
+                timings.append((time.perf_counter() - started) * 1000)
+                expected = (format_currency(Money.from_cents(new_price)), 1, 5)
+            slot = db.catalog.slot_of(product_id)
+            text, sales_column, inventory_column = expected
+            if shown(sales, slot, sales_column) != text or shown(inventory, slot, inventory_column) != text:
+                print(f"❌ El cambio del producto {product_id} no se ve en las dos grillas")
+                failures += 1
+
+        # Renombrar, dar de alta y borrar mueven filas: también sin recargar el catálogo
+        renamed_id = rng.randrange(1, args.productos + 1)
+        with db.transaction() as cursor:
+            cursor.execute("UPDATE products SET name = 'Aaa renombrado' WHERE id = ?", (renamed_id,))
+        db.catalog.add_product({'code': "ALTA-CATALOGO", 'name': "Producto agregado", 'sell_price': 10, 'stock': 5})
+        deleted_id = renamed_id % args.productos + 1
+        db.catalog.delete_product(deleted_id)
+        app.processEvents()
+        for module, column in ((sales, 0), (inventory, 2)):
+            names = [module.products_proxy.index(row, column).data()
+                     for row in range(module.products_proxy.rowCount())]
+            if names[0] != "Aaa renombrado" or "Producto agregado" not in names \
+                    or len(names) != args.productos:
+                print("❌ El alta, la baja o el nombre nuevo no se ven en las dos grillas")
+                failures += 1
+        in_memory = sorted(db.catalog.product(slot) for slot in range(len(db.catalog)))
+        if in_memory != sorted(products_in_money(db.get_products())) or db.catalog.slot_of(deleted_id) is not None \
+                or db.catalog.search_index.search("renombrado") != {3: {db.catalog.slot_of(renamed_id)}}:
+            print("❌ El catálogo en memoria no coincide con la base")
+            failures += 1
+
+        ordered = sorted(timings)
+        print(f"cambio de precio o stock visible en las dos grillas: p50 {percentile(ordered, 50):.2f} ms, "
+              f"p95 {percentile(ordered, 95):.2f} ms (recarga completa {reload_ms:.0f} ms)")
+        for module in (sales, inventory):
+            module.widget.hide()
+        inventory.executor.shutdown()
+        db.close_connection()
+
+    if failures:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de la base de datos del POS")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    connections_parser = subparsers.add_parser("conexiones", help=bench_connections.__doc__)
+    connections_parser.add_argument("--productos", type=int, default=20000)
+    connections_parser.add_argument("--repeticiones", type=int, default=200)
+    connections_parser.set_defaults(func=bench_connections)
+
+    plans_parser = subparsers.add_parser("planes", help=check_query_plans.__doc__)
+    plans_parser.add_argument("--items", type=int, default=1000000)
+    plans_parser.add_argument("--dias", type=int, default=365)
+    plans_parser.set_defaults(func=check_query_plans)
+
+    ranges_parser = subparsers.add_parser("rangos", help=bench_date_ranges.__doc__)
+    ranges_parser.add_argument("--items", type=int, default=1000000)
+    ranges_parser.add_argument("--anios", type=int, default=5)
+    ranges_parser.add_argument("--repeticiones", type=int, default=20)
+    ranges_parser.set_defaults(func=bench_date_ranges)
+
+    sales_parser = subparsers.add_parser("ventas", help=bench_sales.__doc__)
+    sales_parser.add_argument("--repeticiones", type=int, default=200)
+    sales_parser.set_defaults(func=bench_sales)
+
+    summary_parser = subparsers.add_parser("resumen", help=bench_daily_summary.__doc__)
+    summary_parser.add_argument("--items", type=int, default=1000000)
+    summary_parser.add_argument("--anios", type=int, default=3)
+    summary_parser.add_argument("--repeticiones", type=int, default=20)
+    summary_parser.set_defaults(func=bench_daily_summary)
+
+    hourly_parser = subparsers.add_parser("horarios", help=bench_hourly_sales.__doc__)
+    hourly_parser.add_argument("--items", type=int, default=1000000)
+    hourly_parser.add_argument("--anios", type=int, default=3)
+    hourly_parser.add_argument("--repeticiones", type=int, default=10)
+    hourly_parser.set_defaults(func=bench_hourly_sales)
+
+    products_parser = subparsers.add_parser("productos", help=bench_product_sales.__doc__)
+    products_parser.add_argument("--items", type=int, default=1000000)
+    products_parser.add_argument("--anios", type=int, default=1)
+    # Un kiosco vende muchas veces por día los mismos pocos cientos de productos
+    products_parser.add_argument("--productos", type=int, default=300)
+    products_parser.add_argument("--repeticiones", type=int, default=10)
+    products_parser.set_defaults(func=bench_product_sales)
+
+    cash_close_parser = subparsers.add_parser("cierre", help=bench_cash_close.__doc__)
+    cash_close_parser.add_argument("--items", type=int, default=1000000)
+    cash_close_parser.add_argument("--productos", type=int, default=20000)
+    cash_close_parser.add_argument("--repeticiones", type=int, default=50)
+    cash_close_parser.set_defaults(func=bench_cash_close)
+
+    inventory_parser = subparsers.add_parser("inventario", help=bench_inventory_stats.__doc__)
+    inventory_parser.add_argument("--productos", type=int, default=20000)
+    inventory_parser.add_argument("--repeticiones", type=int, default=200)
+    inventory_parser.set_defaults(func=bench_inventory_stats)
+
+    migrations_parser = subparsers.add_parser("migraciones", help=check_migrations.__doc__)
+    migrations_parser.add_argument("--repeticiones", type=int, default=50)
+    migrations_parser.set_defaults(func=check_migrations)
+
+    concurrency_parser = subparsers.add_parser("concurrencia", help=bench_concurrency.__doc__)
+    concurrency_parser.add_argument("--items", type=int, default=1000000)
+    concurrency_parser.add_argument("--segundos", type=int, default=5)
+    concurrency_parser.set_defaults(func=bench_concurrency)
+
+    profiler_parser = subparsers.add_parser("perfilado", help=bench_profiler.__doc__)
+    profiler_parser.add_argument("--items", type=int, default=100000)
+    profiler_parser.add_argument("--umbral", type=float, default=5)
+    profiler_parser.add_argument("--repeticiones", type=int, default=50)
+    profiler_parser.set_defaults(func=bench_profiler)
+
+    archive_parser = subparsers.add_parser("archivo", help=bench_archive.__doc__)
+    archive_parser.add_argument("--items", type=int, default=300000)
+    archive_parser.add_argument("--anios", type=int, default=3)
+    archive_parser.add_argument("--dias", type=int, default=365, help="antigüedad a archivar")
+    archive_parser.add_argument("--repeticiones", type=int, default=20)
+    archive_parser.set_defaults(func=bench_archive)
+
+    backup_parser = subparsers.add_parser("respaldo", help=bench_backup.__doc__)
+    backup_parser.add_argument("--items", default="100000,300000,1000000",
+                               help="tamaños a probar, en items de venta separados por coma")
+    backup_parser.add_argument("--compresion", choices=("zst", "gz"), default=None)
+    backup_parser.set_defaults(func=bench_backup)
+
+    journal_parser = subparsers.add_parser("diario", help=bench_change_journal.__doc__)
+    journal_parser.add_argument("--items", type=int, default=100000)
+    journal_parser.add_argument("--rondas", type=int, default=6)
+    journal_parser.add_argument("--ventas", type=int, default=200, help="ventas por ronda")
+    journal_parser.add_argument("--repeticiones", type=int, default=200)
+    journal_parser.set_defaults(func=bench_change_journal)
+
+    scan_parser = subparsers.add_parser("escaneo", help=bench_barcode_scan.__doc__)
+    scan_parser.add_argument("--productos", default="1000,10000,30000,100000")
+    scan_parser.add_argument("--escaneos", type=int, default=300)
+    scan_parser.set_defaults(func=bench_barcode_scan)
+
+    refresh_parser = subparsers.add_parser("refresco", help=bench_catalog_refresh.__doc__)
+    refresh_parser.add_argument("--productos", default="30,3000,30000")
+    refresh_parser.add_argument("--ventas", type=int, default=50)
+    refresh_parser.set_defaults(func=bench_catalog_refresh)
+
+    grid_parser = subparsers.add_parser("grilla", help=bench_product_grid.__doc__)
+    grid_parser.add_argument("--productos", type=int, default=50000)
+    grid_parser.add_argument("--busqueda", default="producto 123")
+    grid_parser.set_defaults(func=bench_product_grid)
+
+    cart_parser = subparsers.add_parser("carrito", help=bench_cart.__doc__)
+    cart_parser.add_argument("--lineas", default="10,100,500")
+    cart_parser.add_argument("--repeticiones", type=int, default=20)
+    cart_parser.set_defaults(func=bench_cart)
+
+    search_parser = subparsers.add_parser("busqueda", help=bench_search_index.__doc__)
+    search_parser.add_argument("--productos", type=int, default=50000)
+    search_parser.add_argument("--busquedas", default="coca 2.25;coca;c;cafe;aguila;zero 500;xyz;00123",
+                               help="búsquedas separadas por ;")
+    search_parser.add_argument("--repeticiones", type=int, default=20)
+    search_parser.set_defaults(func=bench_search_index)
+
+    shared_parser = subparsers.add_parser("catalogo", help=bench_shared_catalog.__doc__)
+    shared_parser.add_argument("--productos", type=int, default=50000)
+    shared_parser.add_argument("--cambios", type=int, default=50)
+    shared_parser.set_defaults(func=bench_shared_catalog)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,144 @@
+import re
 import sqlite3
-from datetime import datetime
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 import os
 
+from db_backup import BackupService, clean_old_backups
+from db_catalog import CatalogService
+from db_journal import create_change_journal, journal_archived_month, journal_dir, write_segment
+from db_profiler import QueryProfiler
+from utils.money import Money
+
+# Perfiles de ejecución de SQLite. Se aplican a CADA conexión al abrirla.
+#
+# - "rendimiento" (por defecto): journal WAL + synchronous=NORMAL. Los reportes
+#   pueden leer mientras se guarda una venta y cada COMMIT no espera al disco.
+#   Compromiso de durabilidad: ante un corte de luz o una caída del sistema
+#   operativo se pueden perder las últimas ventas confirmadas (la base NUNCA
+#   queda corrupta). Si solo se cierra/cuelga el programa no se pierde nada.
+# - "seguro": WAL + synchronous=FULL. Cada COMMIT espera la confirmación del
+#   disco; más lento pero sin pérdidas ante cortes de luz.
+# - "compatible": los valores por defecto de SQLite (journal DELETE). Usar si la
+#   base está en una carpeta de red, donde WAL no es soportado.
+#
+# El perfil se elige con Database(profile=...) o con la variable de entorno
+# POS_SQLITE_PROFILE.
+PERFORMANCE_PROFILES = {
+    "rendimiento": {
+        "journal_mode": "wal",
+        "synchronous": "NORMAL",
+        "cache_size": -20000,       # en KiB (negativo) => ~20 MB de caché de páginas
+        "mmap_size": 268435456,     # 256 MB mapeados en memoria
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,       # ms de espera si otra conexión está escribiendo
+    },
+    "seguro": {
+        "journal_mode": "wal",
+        "synchronous": "FULL",
+        "cache_size": -20000,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    "compatible": {
+        "journal_mode": "delete",
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,
+    },
+}
+
+DEFAULT_PROFILE = "rendimiento"
+
+# Valores numéricos que devuelve SQLite al consultar cada PRAGMA
+_SYNCHRONOUS_NAMES = {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"}
+_TEMP_STORE_NAMES = {0: "DEFAULT", 1: "FILE", 2: "MEMORY"}
+
+
+def date_range_bounds(start_date, end_date):
+    """
+    Convierte un rango de fechas 'YYYY-MM-DD' (ambas inclusive) en límites
+    semiabiertos [desde, hasta) para comparar directamente contra created_at.
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+
+def date_range_filter(column, start_date, end_date):
+    """
+    Filtro SQL por rango de fechas sobre una columna de timestamp.
+
+    Reemplaza a `DATE(column) BETWEEN ? AND ?`: al no envolver la columna en
+    una función, SQLite puede usar el índice sobre ella. Los timestamps se
+    guardan como texto 'YYYY-MM-DD HH:MM:SS', así que compararlos contra
+    'YYYY-MM-DD' respeta el orden cronológico.
+
+    Devuelve (sql, params).
+    """
+    return f"{column} >= ? AND {column} < ?", list(date_range_bounds(start_date, end_date))
+
+
+def rename_create_table(create_sql, table, prefix):
+    """Reemplazar el `CREATE TABLE <table>` inicial de un SQL de sqlite_master por `prefix`"""
+    return re.sub(rf'^\s*CREATE\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?["`\[]?{table}["`\]]?', prefix,
+                  create_sql, count=1, flags=re.IGNORECASE)
+
+
 class Database:
-    def __init__(self, db_name="kiosco_pos.db"):
+    def __init__(self, db_name="kiosco_pos.db", profile=None, profiler=None):
         self.db_name = db_name
+        self.profile = profile or os.environ.get("POS_SQLITE_PROFILE", DEFAULT_PROFILE)
+        if self.profile not in PERFORMANCE_PROFILES:
+            raise ValueError(f"Perfil de SQLite desconocido: {self.profile}")
+        # Una conexión persistente por hilo: sqlite3 no permite compartir
+        # una misma conexión entre hilos, pero abrirla en cada llamada es caro
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        # Las escrituras (ventas incluidas) se serializan entre hilos; las lecturas
+        # corren en paralelo, cada una en la conexión de su hilo (WAL)
+        self._write_lock = threading.RLock()
+        # Respaldos en segundo plano, con su propia conexión (ver db_backup.py)
+        self.backup_service = BackupService(db_name)
+        # Catálogo de productos en memoria que comparten los módulos (ver db_catalog.py)
+        self.catalog = CatalogService(self)
+        self._journal_lock = threading.Lock()
+        # Instrumentación opcional (POS_DB_SLOW_MS): tiempos, SQL y planes de los métodos lentos
+        self.profiler = profiler or QueryProfiler.from_env(db_name)
+        if self.profiler:
+            self.profiler.attach(self)
         self.init_database()
         
     def init_database(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
+        """
+        Crear o actualizar el esquema. Si la base ya está en la última versión
+        (PRAGMA user_version) no se hace ninguna otra verificación: el inicio
+        cuesta una sola lectura.
+        """
+        current_version = self.get_schema_version()
+        # La versión 0 es una base nueva o anterior a las migraciones: siempre se revisa
+        if current_version and current_version == self.latest_schema_version():
+            return
+        if current_version > self.latest_schema_version():
+            print(f"⚠️ La base {self.db_name} tiene el esquema v{current_version}, "
+                  f"más nuevo que esta versión del programa (v{self.latest_schema_version()})")
+            return
+
+        with self.transaction() as cursor:
+            # Releer dentro del lock de escritura: otra instancia pudo migrar recién
+            if self.get_schema_version(cursor) == 0:
+                # Base nueva o anterior a las migraciones numeradas
+                self._create_schema(cursor)
+            self.apply_migrations(cursor)
+
+    def _create_schema(self, cursor):
+        # Esquema base (versión 0). Los importes REAL pasan a centavos INTEGER
+        # en la migración 6
         # Tabla de Clientes
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS customers (
@@ -126,9 +254,22 @@ class Database:
             
         # NO insertar productos de ejemplo - base de datos vacía para que el usuario cargue sus productos
         
-        conn.commit()
-        conn.close()
-        
+    # Columnas que no existían en esquemas anteriores a las migraciones numeradas:
+    # (tabla, columna, definición, expresión para completar las filas existentes)
+    LEGACY_COLUMNS = [
+        ('products', 'category_id', 'INTEGER', None),
+        ('products', 'buy_price', 'REAL NOT NULL DEFAULT 0', None),
+        ('products', 'sell_price', 'REAL NOT NULL DEFAULT 0', 'price'),
+        ('products', 'min_stock', 'INTEGER DEFAULT 5', None),
+        ('customers', 'current_credit', 'REAL DEFAULT 0.00', None),
+        ('sales', 'payment_status', "TEXT NOT NULL DEFAULT 'pagado'",
+         "CASE WHEN payment_method = 'Cuenta Corriente' THEN 'cuenta_corriente' ELSE 'pagado' END"),
+        ('sales', 'customer_type', "TEXT NOT NULL DEFAULT 'Consumidor Final'", None),
+        ('sale_items', 'product_name', "TEXT NOT NULL DEFAULT ''",
+         "(SELECT name FROM products WHERE products.id = sale_items.product_id)"),
+        ('sale_items', 'subtotal', 'REAL NOT NULL DEFAULT 0', 'quantity * price'),
+    ]
+
     def update_schema(self, cursor):
         """Actualizar el esquema si hay cambios"""
         try:
@@ -145,16 +286,583 @@ class Database:
                     )
                 ''')
                 
-            # Verificar si products tiene category_id
-            cursor.execute("PRAGMA table_info(products)")
-            columns = [column[1] for column in cursor.fetchall()]
-            
-            if 'category_id' not in columns:
-                cursor.execute('ALTER TABLE products ADD COLUMN category_id INTEGER')
+            # Agregar las columnas que falten (por ejemplo category_id en products)
+            for table, column, definition, fill_expression in self.LEGACY_COLUMNS:
+                cursor.execute(f"PRAGMA table_info({table})")
+                columns = [info[1] for info in cursor.fetchall()]
+
+                if column not in columns:
+                    cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+                    if fill_expression:
+                        cursor.execute(f'UPDATE {table} SET {column} = COALESCE({fill_expression}, {column})')
                 
         except Exception as e:
             print(f"Error actualizando esquema: {e}")
         
+    # ===== MIGRACIONES DE ESQUEMA =====
+
+    # Migraciones numeradas, en orden: (versión, descripción, método).
+    # PRAGMA user_version guarda la última versión aplicada, así cada migración
+    # corre una sola vez. Nunca modificar una migración publicada: agregar otra al final.
+    SCHEMA_MIGRATIONS = [
+        (1, "Índices para reportes y búsquedas", "_migration_report_indexes"),
+        (2, "Resumen diario de ventas (sales_daily)", "_migration_sales_daily"),
+        (3, "Resumen de ventas por día y hora (sales_hourly)", "_migration_sales_hourly"),
+        (4, "Resumen de ventas por producto y día (product_sales_daily)", "_migration_product_sales_daily"),
+        (5, "Contadores de inventario (inventory_stats)", "_migration_inventory_stats"),
+        (6, "Importes en centavos enteros", "_migration_money_cents"),
+        (7, "Registro de archivos de ventas (sales_archives)", "_migration_sales_archives"),
+        (8, "Diario de cambios (change_journal)", "_migration_change_journal"),
+        (9, "Registro de cambios del catálogo (catalog_changes)", "_migration_catalog_changes"),
+        (10, "Índice de cobertura de product_sales_daily", "_migration_product_sales_covering_index"),
+    ]
+
+    def latest_schema_version(self):
+        return self.SCHEMA_MIGRATIONS[-1][0] if self.SCHEMA_MIGRATIONS else 0
+
+    def get_schema_version(self, cursor=None):
+        cursor = cursor or self.get_connection().cursor()
+        cursor.execute('PRAGMA user_version')
+        return cursor.fetchone()[0]
+
+    def apply_migrations(self, cursor):
+        """Aplicar las migraciones pendientes (dentro de la transacción de quien llama)"""
+        current_version = self.get_schema_version(cursor)
+
+        for version, description, method_name in self.SCHEMA_MIGRATIONS:
+            if version <= current_version:
+                continue
+            print(f"🔧 Aplicando migración {version}: {description}")
+            getattr(self, method_name)(cursor)
+            # PRAGMA no acepta parámetros; version es siempre un int de la lista
+            cursor.execute(f'PRAGMA user_version = {int(version)}')
+
+    def _migration_report_indexes(self, cursor):
+        """Índices que usan los reportes, el guardado de ventas y las búsquedas"""
+        # Join ventas -> items; cubre también quantity/subtotal para no leer la tabla
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_sale_items_sale
+            ON sale_items (sale_id, product_id, quantity, subtotal)
+        ''')
+        # Historial de un producto (y borrado de productos)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sale_items_product ON sale_items (product_id)')
+        # Filtros por rango de fechas
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_sales_created_at ON sales (created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_credit_payments_created_at ON credit_payments (created_at)')
+        # save_sale busca por nombre; get_products ordena por nombre
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_name ON products (name)')
+
+    def _migration_sales_daily(self, cursor):
+        """
+        Tablas de resumen diario de ventas, mantenidas por triggers sobre sales.
+
+        - sales_daily: cantidad, total, pagado y cuenta corriente por día.
+        - sales_daily_customers: ventas por día y tipo de cliente, para poder
+          contar tipos distintos en cualquier rango sin leer sales.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sales_daily (
+                date TEXT PRIMARY KEY,
+                sales_count INTEGER NOT NULL DEFAULT 0,
+                total_amount REAL NOT NULL DEFAULT 0,
+                paid_amount REAL NOT NULL DEFAULT 0,
+                credit_amount REAL NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sales_daily_customers (
+                date TEXT NOT NULL,
+                customer_type TEXT NOT NULL,
+                sales_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (date, customer_type)
+            )
+        ''')
+
+        # Sumar una venta (NEW) al resumen de su día
+        add_sale = '''
+            INSERT INTO sales_daily (date, sales_count, total_amount, paid_amount, credit_amount)
+            VALUES (
+                DATE(NEW.created_at), 1, COALESCE(NEW.total, 0),
+                CASE WHEN NEW.payment_status = 'pagado' THEN COALESCE(NEW.total, 0) ELSE 0 END,
+                CASE WHEN NEW.payment_status = 'cuenta_corriente' THEN COALESCE(NEW.total, 0) ELSE 0 END
+            )
+            ON CONFLICT (date) DO UPDATE SET
+                sales_count = sales_count + 1,
+                total_amount = total_amount + excluded.total_amount,
+                paid_amount = paid_amount + excluded.paid_amount,
+                credit_amount = credit_amount + excluded.credit_amount;
+            INSERT INTO sales_daily_customers (date, customer_type, sales_count)
+            VALUES (DATE(NEW.created_at), COALESCE(NEW.customer_type, ''), 1)
+            ON CONFLICT (date, customer_type) DO UPDATE SET sales_count = sales_count + 1;
+        '''
+        # Restar una venta (OLD) del resumen de su día
+        remove_sale = '''
+            UPDATE sales_daily SET
+                sales_count = sales_count - 1,
+                total_amount = total_amount - COALESCE(OLD.total, 0),
+                paid_amount = paid_amount - CASE WHEN OLD.payment_status = 'pagado' THEN COALESCE(OLD.total, 0) ELSE 0 END,
+                credit_amount = credit_amount - CASE WHEN OLD.payment_status = 'cuenta_corriente' THEN COALESCE(OLD.total, 0) ELSE 0 END
+            WHERE date = DATE(OLD.created_at);
+            DELETE FROM sales_daily WHERE date = DATE(OLD.created_at) AND sales_count <= 0;
+            UPDATE sales_daily_customers SET sales_count = sales_count - 1
+            WHERE date = DATE(OLD.created_at) AND customer_type = COALESCE(OLD.customer_type, '');
+            DELETE FROM sales_daily_customers
+            WHERE date = DATE(OLD.created_at) AND customer_type = COALESCE(OLD.customer_type, '') AND sales_count <= 0;
+        '''
+
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_sales_daily_insert AFTER INSERT ON sales BEGIN {add_sale} END')
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_sales_daily_delete AFTER DELETE ON sales BEGIN {remove_sale} END')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_sales_daily_update
+            AFTER UPDATE OF total, payment_status, customer_type, created_at ON sales
+            BEGIN {remove_sale} {add_sale} END
+        ''')
+
+        self.rebuild_sales_daily(cursor)
+
+    def rebuild_sales_daily(self, cursor):
+        """Recalcular sales_daily y sales_daily_customers desde cero a partir de sales"""
+        cursor.execute('DELETE FROM sales_daily')
+        cursor.execute('DELETE FROM sales_daily_customers')
+        cursor.execute('''
+            INSERT INTO sales_daily (date, sales_count, total_amount, paid_amount, credit_amount)
+            SELECT
+                DATE(created_at),
+                COUNT(*),
+                COALESCE(SUM(total), 0),
+                COALESCE(SUM(CASE WHEN payment_status = 'pagado' THEN total END), 0),
+                COALESCE(SUM(CASE WHEN payment_status = 'cuenta_corriente' THEN total END), 0)
+            FROM sales
+            GROUP BY DATE(created_at)
+        ''')
+        cursor.execute('''
+            INSERT INTO sales_daily_customers (date, customer_type, sales_count)
+            SELECT DATE(created_at), COALESCE(customer_type, ''), COUNT(*)
+            FROM sales
+            GROUP BY DATE(created_at), COALESCE(customer_type, '')
+        ''')
+
+    def _migration_sales_hourly(self, cursor):
+        """Ventas por (día, hora), mantenidas por triggers sobre sales"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sales_hourly (
+                date TEXT NOT NULL,
+                hour INTEGER NOT NULL,
+                sales_count INTEGER NOT NULL DEFAULT 0,
+                total_amount REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (date, hour)
+            )
+        ''')
+
+        add_sale = '''
+            INSERT INTO sales_hourly (date, hour, sales_count, total_amount)
+            VALUES (DATE(NEW.created_at), CAST(strftime('%H', NEW.created_at) AS INTEGER), 1, COALESCE(NEW.total, 0))
+            ON CONFLICT (date, hour) DO UPDATE SET
+                sales_count = sales_count + 1,
+                total_amount = total_amount + excluded.total_amount;
+        '''
+        remove_sale = '''
+            UPDATE sales_hourly SET
+                sales_count = sales_count - 1,
+                total_amount = total_amount - COALESCE(OLD.total, 0)
+            WHERE date = DATE(OLD.created_at) AND hour = CAST(strftime('%H', OLD.created_at) AS INTEGER);
+            DELETE FROM sales_hourly
+            WHERE date = DATE(OLD.created_at) AND hour = CAST(strftime('%H', OLD.created_at) AS INTEGER)
+              AND sales_count <= 0;
+        '''
+
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_sales_hourly_insert AFTER INSERT ON sales BEGIN {add_sale} END')
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_sales_hourly_delete AFTER DELETE ON sales BEGIN {remove_sale} END')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_sales_hourly_update
+            AFTER UPDATE OF total, created_at ON sales
+            BEGIN {remove_sale} {add_sale} END
+        ''')
+
+        self.rebuild_sales_hourly(cursor)
+
+    def rebuild_sales_hourly(self, cursor):
+        """Recalcular sales_hourly desde cero a partir de sales"""
+        cursor.execute('DELETE FROM sales_hourly')
+        cursor.execute('''
+            INSERT INTO sales_hourly (date, hour, sales_count, total_amount)
+            SELECT DATE(created_at), CAST(strftime('%H', created_at) AS INTEGER), COUNT(*), COALESCE(SUM(total), 0)
+            FROM sales
+            GROUP BY 1, 2
+        ''')
+
+    def _migration_product_sales_daily(self, cursor):
+        """
+        Ventas por (día, producto): unidades, facturación y costo, mantenidas
+        por triggers sobre sale_items y sales.
+
+        Guarda el nombre del producto para que el historial no se pierda si el
+        producto se borra. El costo sale de sale_items.unit_cost (costo al
+        momento de la venta); para ventas anteriores se completa con el costo actual.
+        """
+        cursor.execute("PRAGMA table_info(sale_items)")
+        if 'unit_cost' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE sale_items ADD COLUMN unit_cost REAL')
+        cursor.execute('''
+            UPDATE sale_items
+            SET unit_cost = (SELECT buy_price FROM products WHERE products.id = sale_items.product_id)
+            WHERE unit_cost IS NULL
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS product_sales_daily (
+                date TEXT NOT NULL,
+                product_id INTEGER NOT NULL,
+                product_name TEXT NOT NULL,
+                items_count INTEGER NOT NULL DEFAULT 0,
+                quantity INTEGER NOT NULL DEFAULT 0,
+                revenue REAL NOT NULL DEFAULT 0,
+                cost REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (date, product_id)
+            )
+        ''')
+
+        # Sumar un item (NEW) al día de su venta
+        add_item = '''
+            INSERT INTO product_sales_daily (date, product_id, product_name, items_count, quantity, revenue, cost)
+            SELECT DATE(s.created_at), NEW.product_id, NEW.product_name, 1, NEW.quantity, NEW.subtotal,
+                   NEW.quantity * COALESCE(NEW.unit_cost, 0)
+            FROM sales s WHERE s.id = NEW.sale_id
+            ON CONFLICT (date, product_id) DO UPDATE SET
+                product_name = excluded.product_name,
+                items_count = items_count + 1,
+                quantity = quantity + excluded.quantity,
+                revenue = revenue + excluded.revenue,
+                cost = cost + excluded.cost;
+        '''
+        # Restar un item (OLD) del día de su venta
+        remove_item = '''
+            UPDATE product_sales_daily SET
+                items_count = items_count - 1,
+                quantity = quantity - OLD.quantity,
+                revenue = revenue - OLD.subtotal,
+                cost = cost - OLD.quantity * COALESCE(OLD.unit_cost, 0)
+            WHERE product_id = OLD.product_id
+              AND date = (SELECT DATE(created_at) FROM sales WHERE id = OLD.sale_id);
+            DELETE FROM product_sales_daily
+            WHERE product_id = OLD.product_id
+              AND date = (SELECT DATE(created_at) FROM sales WHERE id = OLD.sale_id)
+              AND items_count <= 0;
+        '''
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_product_sales_insert AFTER INSERT ON sale_items BEGIN {add_item} END')
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS trg_product_sales_delete AFTER DELETE ON sale_items BEGIN {remove_item} END')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_product_sales_update
+            AFTER UPDATE OF sale_id, product_id, product_name, quantity, subtotal, unit_cost ON sale_items
+            BEGIN {remove_item} {add_item} END
+        ''')
+
+        # Los items de una venta borrada se borran con ella (y salen del resumen).
+        # BEFORE: el trigger de sale_items todavía necesita la fecha de la venta
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_sales_delete_items BEFORE DELETE ON sales
+            BEGIN
+                DELETE FROM sale_items WHERE sale_id = OLD.id;
+            END
+        ''')
+        # Si cambia la fecha de una venta, sus items pasan al nuevo día
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_product_sales_move
+            AFTER UPDATE OF created_at ON sales
+            WHEN DATE(OLD.created_at) IS NOT DATE(NEW.created_at)
+            BEGIN
+                UPDATE product_sales_daily SET
+                    items_count = items_count - (SELECT COUNT(*) FROM sale_items si
+                        WHERE si.sale_id = OLD.id AND si.product_id = product_sales_daily.product_id),
+                    quantity = quantity - (SELECT SUM(si.quantity) FROM sale_items si
+                        WHERE si.sale_id = OLD.id AND si.product_id = product_sales_daily.product_id),
+                    revenue = revenue - (SELECT SUM(si.subtotal) FROM sale_items si
+                        WHERE si.sale_id = OLD.id AND si.product_id = product_sales_daily.product_id),
+                    cost = cost - (SELECT SUM(si.quantity * COALESCE(si.unit_cost, 0)) FROM sale_items si
+                        WHERE si.sale_id = OLD.id AND si.product_id = product_sales_daily.product_id)
+                WHERE date = DATE(OLD.created_at)
+                  AND product_id IN (SELECT product_id FROM sale_items WHERE sale_id = OLD.id);
+                DELETE FROM product_sales_daily WHERE date = DATE(OLD.created_at) AND items_count <= 0;
+                INSERT INTO product_sales_daily (date, product_id, product_name, items_count, quantity, revenue, cost)
+                SELECT DATE(NEW.created_at), product_id, MAX(product_name), COUNT(*), SUM(quantity), SUM(subtotal),
+                       SUM(quantity * COALESCE(unit_cost, 0))
+                FROM sale_items WHERE sale_id = NEW.id
+                GROUP BY product_id
+                ON CONFLICT (date, product_id) DO UPDATE SET
+                    items_count = items_count + excluded.items_count,
+                    quantity = quantity + excluded.quantity,
+                    revenue = revenue + excluded.revenue,
+                    cost = cost + excluded.cost;
+            END
+        ''')
+
+        # Historial de un producto y nombre de los productos borrados
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_product_sales_daily_product
+            ON product_sales_daily (product_id, date)
+        ''')
+
+        self.rebuild_product_sales_daily(cursor)
+
+    def rebuild_product_sales_daily(self, cursor):
+        """Recalcular product_sales_daily desde cero a partir de sale_items y sales"""
+        cursor.execute('DELETE FROM product_sales_daily')
+        cursor.execute('''
+            INSERT INTO product_sales_daily (date, product_id, product_name, items_count, quantity, revenue, cost)
+            SELECT DATE(s.created_at), si.product_id, MAX(si.product_name), COUNT(*), SUM(si.quantity),
+                   SUM(si.subtotal), SUM(si.quantity * COALESCE(si.unit_cost, 0))
+            FROM sales s
+            CROSS JOIN sale_items si ON si.sale_id = s.id
+            GROUP BY 1, 2
+        ''')
+
+    def _migration_inventory_stats(self, cursor):
+        """
+        Fila única con los contadores del inventario, mantenida exacta por
+        triggers sobre products (las tarjetas y alertas ya no recorren la tabla).
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS inventory_stats (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                total_products INTEGER NOT NULL DEFAULT 0,
+                low_stock_count INTEGER NOT NULL DEFAULT 0,
+                out_of_stock_count INTEGER NOT NULL DEFAULT 0,
+                inventory_value REAL NOT NULL DEFAULT 0
+            )
+        ''')
+
+        # Aporte de un producto a cada contador. Mismos criterios que
+        # INVENTORY_STATS_QUERY: un NULL nunca cuenta (COALESCE(..., 0))
+        def contribution(row):
+            return {
+                'low_stock_count': f"COALESCE({row}.stock > 0 AND {row}.stock <= {row}.min_stock, 0)",
+                'out_of_stock_count': f"COALESCE({row}.stock = 0, 0)",
+                'inventory_value': f"COALESCE(CASE WHEN {row}.stock > 0 THEN {row}.stock * {row}.buy_price END, 0)",
+            }
+        new, old = contribution('NEW'), contribution('OLD')
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_inventory_stats_insert AFTER INSERT ON products
+            BEGIN
+                UPDATE inventory_stats SET
+                    total_products = total_products + 1,
+                    low_stock_count = low_stock_count + {new['low_stock_count']},
+                    out_of_stock_count = out_of_stock_count + {new['out_of_stock_count']},
+                    inventory_value = inventory_value + {new['inventory_value']}
+                WHERE id = 1;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_inventory_stats_delete AFTER DELETE ON products
+            BEGIN
+                UPDATE inventory_stats SET
+                    total_products = total_products - 1,
+                    low_stock_count = low_stock_count - {old['low_stock_count']},
+                    out_of_stock_count = out_of_stock_count - {old['out_of_stock_count']},
+                    inventory_value = inventory_value - {old['inventory_value']}
+                WHERE id = 1;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_inventory_stats_update
+            AFTER UPDATE OF stock, min_stock, buy_price ON products
+            BEGIN
+                UPDATE inventory_stats SET
+                    low_stock_count = low_stock_count + {new['low_stock_count']} - {old['low_stock_count']},
+                    out_of_stock_count = out_of_stock_count + {new['out_of_stock_count']} - {old['out_of_stock_count']},
+                    inventory_value = inventory_value + {new['inventory_value']} - {old['inventory_value']}
+                WHERE id = 1;
+            END
+        ''')
+
+        self.rebuild_inventory_stats(cursor)
+
+    # Contadores de inventario calculados recorriendo products
+    INVENTORY_STATS_QUERY = '''
+        SELECT
+            COUNT(*),
+            COUNT(CASE WHEN stock > 0 AND stock <= min_stock THEN 1 END),
+            COUNT(CASE WHEN stock = 0 THEN 1 END),
+            COALESCE(SUM(CASE WHEN stock > 0 THEN stock * buy_price END), 0)
+        FROM products
+    '''
+
+    def rebuild_inventory_stats(self, cursor):
+        """Recalcular inventory_stats desde cero a partir de products"""
+        cursor.execute('''
+            INSERT OR REPLACE INTO inventory_stats
+                (id, total_products, low_stock_count, out_of_stock_count, inventory_value)
+            SELECT 1, * FROM (''' + self.INVENTORY_STATS_QUERY + ')')
+
+    # Columnas de importes, guardadas en centavos INTEGER desde la migración 6
+    MONEY_COLUMNS = {
+        'products': ('buy_price', 'sell_price'),
+        'customers': ('current_credit',),
+        'sales': ('total',),
+        'sale_items': ('price', 'subtotal', 'unit_cost'),
+        'credit_payments': ('amount',),
+        'cash_closes': ('total_income',),
+        'cash_opens': ('opening_amount',),
+        'sales_daily': ('total_amount', 'paid_amount', 'credit_amount'),
+        'sales_hourly': ('total_amount',),
+        'product_sales_daily': ('revenue', 'cost'),
+        'inventory_stats': ('inventory_value',),
+    }
+
+    def _migration_money_cents(self, cursor):
+        """
+        Pasar los importes de pesos REAL a centavos INTEGER: las sumas de un
+        año de ventas son exactas y se hacen con aritmética entera.
+
+        SQLite no permite cambiar el tipo de una columna: cada tabla se recrea
+        con su mismo CREATE TABLE (solo cambia el tipo de los importes) y se
+        vuelven a crear sus índices y triggers. Las tablas de resumen se
+        recalculan al final desde los datos ya convertidos.
+        """
+        # En el modo moderno RENAME revalida todos los triggers del esquema y
+        # falla por los que nombran a la tabla que se está reemplazando
+        cursor.execute('PRAGMA legacy_alter_table = ON')
+        try:
+            for table, columns in self.MONEY_COLUMNS.items():
+                self._convert_money_columns(cursor, table, columns)
+        finally:
+            cursor.execute('PRAGMA legacy_alter_table = OFF')
+
+        self.rebuild_sales_daily(cursor)
+        self.rebuild_sales_hourly(cursor)
+        self.rebuild_product_sales_daily(cursor)
+        self.rebuild_inventory_stats(cursor)
+
+    def _convert_money_columns(self, cursor, table, columns):
+        """Recrear `table` con `columns` como INTEGER, pasando los valores a centavos"""
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        row = cursor.fetchone()
+        if not row:
+            return
+        cursor.execute(f'PRAGMA table_info({table})')
+        declared = {info[1]: (info[2] or '').upper() for info in cursor.fetchall()}
+        pending = [column for column in columns if column in declared and declared[column] != 'INTEGER']
+        if not pending:
+            return
+
+        create_sql = row[0]
+        for column in pending:
+            create_sql, replaced = re.subn(rf'(\b{column}\s+)REAL\b', r'\1INTEGER', create_sql, count=1,
+                                           flags=re.IGNORECASE)
+            if not replaced:
+                raise Exception(f"No se encontró la columna {table}.{column} en su CREATE TABLE")
+        temp_table = f"{table}__centavos"
+        create_sql = rename_create_table(create_sql, table, f'CREATE TABLE {temp_table}')
+
+        # Índices y triggers de la tabla: DROP TABLE los borra
+        cursor.execute('''
+            SELECT sql FROM sqlite_master
+            WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL
+        ''', (table,))
+        dependents = [dependent[0] for dependent in cursor.fetchall()]
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'")
+        sequence = None
+        if cursor.fetchone():
+            cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,))
+            sequence = cursor.fetchone()
+
+        names = ', '.join(declared)
+        values = ', '.join(
+            f'CAST(ROUND({column} * 100) AS INTEGER)' if column in pending else column
+            for column in declared
+        )
+        cursor.execute(create_sql)
+        cursor.execute(f'INSERT INTO {temp_table} ({names}) SELECT {values} FROM {table}')
+        cursor.execute(f'DROP TABLE {table}')
+        cursor.execute(f'ALTER TABLE {temp_table} RENAME TO {table}')
+        for sql in dependents:
+            cursor.execute(sql)
+        if sequence:
+            # Conservar el contador de AUTOINCREMENT aunque se hayan borrado las últimas filas
+            cursor.execute('UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?', (sequence[0], table))
+
+    def _migration_sales_archives(self, cursor):
+        """
+        Registro de los archivos anuales de ventas (archive_AAAA.db). En cada
+        año, las ventas anteriores a archived_until están solo en el archivo y
+        las posteriores siguen en la base viva.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sales_archives (
+                year INTEGER PRIMARY KEY,
+                file TEXT NOT NULL,
+                archived_until TEXT NOT NULL,
+                sales_count INTEGER NOT NULL DEFAULT 0,
+                items_count INTEGER NOT NULL DEFAULT 0,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+    def _migration_change_journal(self, cursor):
+        """
+        Diario de cambios: cada alta, modificación o baja en las tablas que no se
+        pueden recalcular queda en change_journal hasta que ship_change_journal
+        la envía junto a los backups (ver db_journal.py).
+        """
+        create_change_journal(cursor)
+
+    def _migration_catalog_changes(self, cursor):
+        """
+        Registro de cambios del catálogo: una fila por producto con la versión
+        de su último alta, modificación o baja. Las pantallas guardan la versión
+        que ya tienen y piden solo lo posterior (get_product_changes), en lugar
+        de volver a leer todos los productos.
+
+        INSERT OR REPLACE borra la fila anterior del producto y la vuelve a crear
+        con la siguiente versión (AUTOINCREMENT), así la tabla tiene a lo sumo
+        una fila por producto. Los productos borrados quedan con su versión pero
+        ya no están en products: así se informa la baja.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS catalog_changes (
+                version INTEGER PRIMARY KEY AUTOINCREMENT,
+                product_id INTEGER NOT NULL UNIQUE
+            )
+        ''')
+        mark_changed = 'INSERT OR REPLACE INTO catalog_changes (product_id) VALUES ({row}.id);'
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_catalog_changes_insert AFTER INSERT ON products
+            BEGIN {mark_changed.format(row='NEW')} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_catalog_changes_update AFTER UPDATE ON products
+            BEGIN {mark_changed.format(row='NEW')} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_catalog_changes_delete AFTER DELETE ON products
+            BEGIN {mark_changed.format(row='OLD')} END
+        ''')
+        # Las pantallas muestran el nombre de la categoría de cada producto
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_catalog_changes_category
+            AFTER UPDATE OF name ON categories
+            BEGIN
+                INSERT OR REPLACE INTO catalog_changes (product_id)
+                SELECT id FROM products WHERE category_id = NEW.id;
+            END
+        ''')
+
+    def _migration_product_sales_covering_index(self, cursor):
+        """
+        Índice de cobertura para los rangos de fechas de product_sales_daily
+        (get_top_products, get_total_products_sold): las sumas se leen del
+        índice sin ir a cada fila de la tabla.
+
+        Cuando casi todos los productos se venden pocas veces por día, la
+        tabla tiene casi tantas filas como sale_items. Sin este índice, un año
+        de ranking tardaba más que el join sobre sale_items (unos 32 ms contra
+        28 ms con 30.000 items); con él, unos 22 ms. Ver benchmark_db.py productos.
+        """
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_product_sales_daily_covering
+            ON product_sales_daily (date, product_id, quantity, revenue)
+        ''')
+
     def insert_default_categories(self, cursor):
         """Insertar categorías por defecto"""
         default_categories = [
@@ -175,101 +883,169 @@ class Database:
                 continue
         
     def get_connection(self):
-        return sqlite3.connect(self.db_name)
+        """Obtener la conexión del hilo actual (se abre una sola vez y se reutiliza)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _open_connection(self):
+        # isolation_level=None: las transacciones se abren explícitamente con transaction()
+        # check_same_thread=False: solo para poder cerrarla desde close_connection()
+        conn = sqlite3.connect(self.db_name, isolation_level=None, check_same_thread=False)
+        self._apply_profile(conn)
+        if self.profiler:
+            self.profiler.watch_connection(conn)
+        return conn
+
+    def _apply_profile(self, conn):
+        """Aplicar los PRAGMA del perfil activo a una conexión recién abierta"""
+        settings = PERFORMANCE_PROFILES[self.profile]
+        # busy_timeout primero: cambiar journal_mode puede tener que esperar a otra conexión
+        conn.execute(f"PRAGMA busy_timeout = {int(settings['busy_timeout'])}")
+        conn.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+        conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+        conn.execute(f"PRAGMA cache_size = {int(settings['cache_size'])}")
+        conn.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])}")
+        conn.execute(f"PRAGMA temp_store = {settings['temp_store']}")
+
+    def get_runtime_profile(self):
+        """Leer de SQLite los valores realmente activos y compararlos con el perfil pedido"""
+        conn = self.get_connection()
+        active = {
+            "journal_mode": conn.execute("PRAGMA journal_mode").fetchone()[0].lower(),
+            "synchronous": _SYNCHRONOUS_NAMES.get(conn.execute("PRAGMA synchronous").fetchone()[0]),
+            "cache_size": conn.execute("PRAGMA cache_size").fetchone()[0],
+            # mmap_size no devuelve fila si SQLite fue compilado sin soporte mmap
+            "mmap_size": (conn.execute("PRAGMA mmap_size").fetchone() or (0,))[0],
+            "temp_store": _TEMP_STORE_NAMES.get(conn.execute("PRAGMA temp_store").fetchone()[0]),
+            "busy_timeout": conn.execute("PRAGMA busy_timeout").fetchone()[0],
+        }
+        expected = PERFORMANCE_PROFILES[self.profile]
+        mismatches = {key: (expected[key], value) for key, value in active.items()
+                      if str(expected[key]).lower() != str(value).lower()}
+        return {"profile": self.profile, "settings": active, "mismatches": mismatches}
+
+    def report_runtime_profile(self):
+        """Chequeo de arranque: informar por consola qué perfil de SQLite quedó activo"""
+        runtime = self.get_runtime_profile()
+        settings = runtime["settings"]
+        print(f"🗄️ SQLite perfil '{runtime['profile']}': journal={settings['journal_mode']}, "
+              f"synchronous={settings['synchronous']}, cache={settings['cache_size']}, "
+              f"mmap={settings['mmap_size']}, temp_store={settings['temp_store']}, "
+              f"busy_timeout={settings['busy_timeout']} ms")
+        for key, (expected, actual) in runtime["mismatches"].items():
+            print(f"⚠️ PRAGMA {key}: se pidió {expected} pero SQLite usa {actual}")
+        return runtime
+
+    @contextmanager
+    def transaction(self, mode="IMMEDIATE"):
+        """
+        Transacción sobre la conexión del hilo: COMMIT al salir, ROLLBACK si hay excepción.
+        Si ya hay una transacción abierta en el hilo se reutiliza (no se anida).
+        Las transacciones de escritura (IMMEDIATE/EXCLUSIVE) se serializan entre hilos.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        if conn.in_transaction:
+            yield cursor
+            return
+
+        if mode.upper() == "DEFERRED":
+            # Solo lectura: no toma el lock de escritura
+            with self._run_transaction(conn, cursor, mode):
+                yield cursor
+            return
+
+        with self._write_lock:
+            with self._run_transaction(conn, cursor, mode):
+                yield cursor
+
+    @contextmanager
+    def _run_transaction(self, conn, cursor, mode):
+        cursor.execute(f'BEGIN {mode}')
+        try:
+            yield cursor
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
         
     # ===== MÉTODOS PARA CATEGORÍAS =====
     
     def get_categories(self):
         """Obtener todas las categorías"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('SELECT id, name, description FROM categories ORDER BY name')
-            return cursor.fetchall()
-        finally:
-            conn.close()
+        cursor = self.get_connection().cursor()
+        cursor.execute('SELECT id, name, description FROM categories ORDER BY name')
+        return cursor.fetchall()
             
     def add_category(self, name, description=""):
         """Agregar nueva categoría"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute('INSERT INTO categories (name, description) VALUES (?, ?)', (name, description))
-            conn.commit()
+            with self.transaction() as cursor:
+                cursor.execute('INSERT INTO categories (name, description) VALUES (?, ?)', (name, description))
+            self.catalog.invalidate_categories()
             return True
         except sqlite3.IntegrityError:
-            conn.rollback()
             raise Exception(f"Ya existe una categoría con el nombre: {name}")
         except Exception as e:
-            conn.rollback()
             raise Exception(f"Error al agregar categoría: {str(e)}")
-        finally:
-            conn.close()
             
     def delete_category(self, category_id):
         """Eliminar categoría (solo si no tiene productos)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         try:
-            # Verificar si la categoría tiene productos
-            cursor.execute('SELECT COUNT(*) FROM products WHERE category_id = ?', (category_id,))
-            product_count = cursor.fetchone()[0]
-            
-            if product_count > 0:
-                raise Exception(f"No se puede eliminar la categoría porque tiene {product_count} productos asociados")
+            with self.transaction() as cursor:
+                # Verificar si la categoría tiene productos
+                cursor.execute('SELECT COUNT(*) FROM products WHERE category_id = ?', (category_id,))
+                product_count = cursor.fetchone()[0]
                 
-            cursor.execute('DELETE FROM categories WHERE id = ?', (category_id,))
-            conn.commit()
+                if product_count > 0:
+                    raise Exception(f"No se puede eliminar la categoría porque tiene {product_count} productos asociados")
+                    
+                cursor.execute('DELETE FROM categories WHERE id = ?', (category_id,))
+            self.catalog.invalidate_categories()
             return True
         except Exception as e:
-            conn.rollback()
             raise Exception(f"Error al eliminar categoría: {str(e)}")
-        finally:
-            conn.close()
     
     # ===== MÉTODOS PARA PRODUCTOS =====
         
     def add_product(self, product_data):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute('''
-                INSERT INTO products (code, name, category_id, description, buy_price, sell_price, stock, min_stock)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                product_data.get('code', '').strip(),
-                product_data.get('name', '').strip(),
-                product_data.get('category_id'),
-                product_data.get('description', ''),
-                product_data.get('buy_price', 0),
-                product_data.get('sell_price', 0),
-                product_data.get('stock', 0),
-                product_data.get('min_stock', 5)
-            ))
+            with self.transaction() as cursor:
+                cursor.execute('''
+                    INSERT INTO products (code, name, category_id, description, buy_price, sell_price, stock, min_stock)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    product_data.get('code', '').strip(),
+                    product_data.get('name', '').strip(),
+                    product_data.get('category_id'),
+                    product_data.get('description', ''),
+                    Money.to_cents(product_data.get('buy_price', 0)),
+                    Money.to_cents(product_data.get('sell_price', 0)),
+                    product_data.get('stock', 0),
+                    product_data.get('min_stock', 5)
+                ))
             
-            conn.commit()
             return True
             
         except sqlite3.IntegrityError as e:
-            conn.rollback()
             raise Exception(f"❌ Ya existe un producto con el código: {product_data.get('code', '')}")
         except Exception as e:
-            conn.rollback()
             raise Exception(f"❌ Error al guardar producto: {str(e)}")
-        finally:
-            conn.close()
         
     def get_products(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
         
         try:
             cursor.execute('''
-                SELECT p.id, p.code, p.name, c.name as category_name, p.buy_price, p.sell_price, p.stock, p.min_stock
+                SELECT p.id, p.code, p.name, c.name as category_name,
+                       p.buy_price / 100.0, p.sell_price / 100.0, p.stock, p.min_stock
                 FROM products p
                 LEFT JOIN categories c ON p.category_id = c.id
                 ORDER BY p.name
@@ -279,241 +1055,294 @@ class Database:
         except Exception as e:
             print(f"Error getting products: {e}")
             return []
-        finally:
-            conn.close()
         
     def get_product_by_id(self, product_id):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('SELECT * FROM products WHERE id = ?', (product_id,))
-            return cursor.fetchone()
-        finally:
-            conn.close()
+        cursor = self.get_connection().cursor()
+        cursor.execute('SELECT * FROM products WHERE id = ?', (product_id,))
+        return self._product_in_pesos(cursor, cursor.fetchone())
             
     def get_product_by_code(self, code):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('SELECT * FROM products WHERE code = ?', (code,))
-            return cursor.fetchone()
-        finally:
-            conn.close()
+        cursor = self.get_connection().cursor()
+        cursor.execute('SELECT * FROM products WHERE code = ?', (code,))
+        return self._product_in_pesos(cursor, cursor.fetchone())
+
+    def _product_in_pesos(self, cursor, row):
+        """Fila de SELECT * FROM products con los precios en pesos (la base los guarda en centavos)"""
+        if row is None:
+            return None
+        columns = [description[0] for description in cursor.description]
+        return tuple(
+            value / 100 if name in self.MONEY_COLUMNS['products'] and value is not None else value
+            for name, value in zip(columns, row)
+        )
         
     def update_product_stock(self, product_id, new_stock):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        try:
+        with self.transaction() as cursor:
             cursor.execute('UPDATE products SET stock = ? WHERE id = ?', (new_stock, product_id))
-            conn.commit()
-        finally:
-            conn.close()
             
     def delete_product(self, product_id):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute('DELETE FROM products WHERE id = ?', (product_id,))
-            conn.commit()
+            with self.transaction() as cursor:
+                cursor.execute('DELETE FROM products WHERE id = ?', (product_id,))
             return cursor.rowcount > 0
         except Exception as e:
-            conn.rollback()
             raise Exception(f"Error al eliminar producto: {str(e)}")
-        finally:
-            conn.close()
     
+    def get_catalog_version(self):
+        """Versión actual del catálogo (crece con cada alta, modificación o baja de un producto)"""
+        cursor = self.get_connection().cursor()
+        cursor.execute('SELECT COALESCE(MAX(version), 0) FROM catalog_changes')
+        return cursor.fetchone()[0]
+
+    def get_product_changes(self, since_version):
+        """
+        Productos que cambiaron después de since_version. Devuelve (versión,
+        productos, ids borrados): productos con las mismas columnas que
+        get_products y la versión hasta la que llega la respuesta, para pasarla
+        en la próxima llamada.
+        """
+        cursor = self.get_connection().cursor()
+        cursor.execute('''
+            SELECT cc.version, cc.product_id, p.id, p.code, p.name, c.name as category_name,
+                   p.buy_price / 100.0, p.sell_price / 100.0, p.stock, p.min_stock
+            FROM catalog_changes cc
+            LEFT JOIN products p ON p.id = cc.product_id
+            LEFT JOIN categories c ON p.category_id = c.id
+            WHERE cc.version > ?
+            ORDER BY cc.version
+        ''', (since_version,))
+
+        version = since_version
+        products = []
+        deleted_ids = []
+        for row in cursor.fetchall():
+            version = row[0]
+            if row[2] is None:
+                deleted_ids.append(row[1])
+            else:
+                products.append(row[2:])
+        return version, products, deleted_ids
+
     # ===== MÉTODOS PARA VENTAS =====
         
     def save_sale(self, sale_data, items):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-    
+        """
+        Guardar una venta con sus items y descontar el stock.
+
+        Todo ocurre en una sola transacción con un número fijo de sentencias
+        (no una por item). Si algún producto no tiene stock suficiente la venta
+        completa se cancela y no se descuenta nada.
+        """
         try:
-            # Determinar payment_status basado en payment_method
-            payment_method = sale_data.get('payment_method', 'Efectivo')
-            payment_status = 'cuenta_corriente' if payment_method == 'Cuenta Corriente' else 'pagado'
+            with self.transaction() as cursor:
+                # Determinar payment_status basado en payment_method
+                payment_method = sale_data.get('payment_method', 'Efectivo')
+                payment_status = 'cuenta_corriente' if payment_method == 'Cuenta Corriente' else 'pagado'
 
-            # Insertar venta
-            cursor.execute('''
-                INSERT INTO sales (customer_id, total, payment_method, payment_status, customer_type, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                sale_data.get('customer_id'),  # Puede ser None
-                sale_data['total'],
-                payment_method,
-                payment_status,
-                sale_data.get('customer_type', 'Consumidor Final'),
-                self.get_current_local_time()  # Usar hora local de Argentina
-            ))
-        
-            sale_id = cursor.lastrowid
-        
-            # Insertar items de la venta
-            for item in items:
-                # Buscar el ID del producto por nombre
-                product_id = None
-                if item.get('product_id'):
-                    product_id = item['product_id']
-                else:
-                    # Si no tenemos product_id, buscar por nombre
-                    cursor.execute('SELECT id FROM products WHERE name = ?', (item['name'],))
-                    result = cursor.fetchone()
-                    if result:
-                        product_id = result[0]
-            
+                # Insertar venta
                 cursor.execute('''
-                    INSERT INTO sale_items (sale_id, product_id, product_name, quantity, price, subtotal)
+                    INSERT INTO sales (customer_id, total, payment_method, payment_status, customer_type, created_at)
                     VALUES (?, ?, ?, ?, ?, ?)
                 ''', (
-                    sale_id,
-                    product_id,
-                    item['name'],
-                    item['quantity'],
-                    item['price'],
-                    item['subtotal']
+                    sale_data.get('customer_id'),  # Puede ser None
+                    Money.to_cents(sale_data['total']),
+                    payment_method,
+                    payment_status,
+                    sale_data.get('customer_type', 'Consumidor Final'),
+                    self.get_current_local_time()  # Usar hora local de Argentina
                 ))
             
-                # Actualizar stock si tenemos product_id
-                if product_id:
-                    cursor.execute('UPDATE products SET stock = stock - ? WHERE id = ?', 
-                                 (item['quantity'], product_id))
-        
-            conn.commit()
+                sale_id = cursor.lastrowid
+
+                # Una sola consulta para los productos de todos los items
+                product_ids, products = self._load_sale_products(cursor, items)
+
+                # Insertar todos los items de la venta
+                cursor.executemany('''
+                    INSERT INTO sale_items (sale_id, product_id, product_name, quantity, price, subtotal, unit_cost)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', [
+                    (sale_id, product_id, item['name'], item['quantity'],
+                     Money.to_cents(item['price']), Money.to_cents(item['subtotal']),
+                     products[product_id][2] if product_id in products else None)
+                    for item, product_id in zip(items, product_ids)
+                ])
+
+                # Descontar stock (un mismo producto puede venir en varias líneas)
+                quantities = {}
+                for item, product_id in zip(items, product_ids):
+                    if product_id in products:
+                        quantities[product_id] = quantities.get(product_id, 0) + item['quantity']
+                self._decrement_stock(cursor, quantities, products)
+            
             return sale_id
         
         except Exception as e:
-            conn.rollback()
             raise Exception(f"Error al guardar venta: {str(e)}")
-        finally:
-            conn.close()
+
+    def _load_sale_products(self, cursor, items):
+        """
+        Devuelve el product_id de cada item (buscando por nombre los que no lo
+        traen) y un diccionario {id: (nombre, stock, costo en centavos)} de los productos existentes.
+        """
+        ids = list({item['product_id'] for item in items if item.get('product_id')})
+        names = list({item['name'] for item in items if not item.get('product_id')})
+        if not ids and not names:
+            return [None] * len(items), {}
+
+        cursor.execute(f'''
+            SELECT id, name, stock, buy_price FROM products
+            WHERE id IN ({', '.join('?' * len(ids))}) OR name IN ({', '.join('?' * len(names))})
+            ORDER BY id
+        ''', ids + names)
+
+        products = {}
+        ids_by_name = {}
+        for product_id, name, stock, buy_price in cursor.fetchall():
+            products[product_id] = (name, stock, buy_price)
+            ids_by_name.setdefault(name, product_id)
+
+        product_ids = [item.get('product_id') or ids_by_name.get(item['name']) for item in items]
+        return product_ids, products
+
+    def _decrement_stock(self, cursor, quantities, products):
+        """
+        Descontar stock solo si alcanza (`WHERE stock >= ?`). Si algún producto
+        no tiene stock suficiente lanza una excepción y la transacción se revierte.
+        Los productos borrados mientras estaban en el carrito no descuentan stock.
+        """
+        shortages = [
+            f"{products[product_id][0]} (disponible: {products[product_id][1]}, pedido: {quantity})"
+            for product_id, quantity in quantities.items()
+            if products[product_id][1] < quantity
+        ]
+        if shortages:
+            raise Exception("Stock insuficiente para: " + ", ".join(shortages))
+
+        cursor.executemany(
+            'UPDATE products SET stock = stock - ? WHERE id = ? AND stock >= ?',
+            [(quantity, product_id, quantity) for product_id, quantity in quantities.items()]
+        )
+        # Otra terminal pudo vender el último stock entre la consulta y el descuento
+        if quantities and cursor.rowcount != len(quantities):
+            raise Exception("El stock cambió mientras se guardaba la venta, intente nuevamente")
             
     def get_sales_report(self, start_date=None, end_date=None):
         """Obtener reporte de ventas para el módulo de reportes - MEJORADO"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
     
         try:
+            # Con GROUP BY s.id solo, SQLite prefiere recorrer toda la tabla en orden
+            # de id; agrupando también por created_at recorre solo el rango del índice
             query = '''
                 SELECT 
                     s.id,
-                    s.total,
+                    s.total / 100.0,
                     s.payment_method,
                     s.customer_type,
                     s.created_at,
                     COUNT(si.id) as items_count,
                     GROUP_CONCAT(si.product_name || ' x' || si.quantity, ', ') as items_description
-                FROM sales s
-                LEFT JOIN sale_items si ON s.id = si.sale_id
+                FROM {schema}.sales s
+                LEFT JOIN {schema}.sale_items si ON s.id = si.sale_id{where}
+                GROUP BY s.created_at, s.id ORDER BY s.created_at DESC LIMIT 100
             '''
-        
-            params = []
-            if start_date and end_date:
-                query += ' WHERE DATE(s.created_at) BETWEEN ? AND ?'
-                params.extend([start_date, end_date])
-            
-            query += ' GROUP BY s.id ORDER BY s.created_at DESC LIMIT 100'
-        
-            cursor.execute(query, params)
-            return cursor.fetchall()
+            return self._query_sales(cursor, query, 's.created_at', start_date, end_date,
+                                     sort_index=4, limit=100)
         except Exception as e:
             print(f"Error en get_sales_report: {e}")
             return []
-        finally:
-            conn.close()
             
     def get_top_products(self, start_date=None, end_date=None, limit=10):
-        """Obtener productos más vendidos - VERSIÓN CORREGIDA"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-    
+        """
+        Obtener productos más vendidos: [(nombre, unidades, total)].
+        Lee product_sales_daily, así incluye productos que ya fueron borrados.
+        """
         try:
-            query = '''
+            where, params = self._rollup_date_range(start_date, end_date, 'r.date')
+            cursor = self.get_connection().cursor()
+            # Agrupar y cortar el ranking antes del join: solo se busca el nombre
+            # de los `limit` productos del resultado (el último vendido si se borró)
+            cursor.execute(f'''
                 SELECT 
-                    p.name,
-                    COALESCE(SUM(si.quantity), 0) as total_quantity,
-                    COALESCE(SUM(si.subtotal), 0) as total_amount
-                FROM sale_items si
-                JOIN products p ON si.product_id = p.id
-                JOIN sales s ON si.sale_id = s.id
-            '''
-        
-            params = []
-            if start_date and end_date:
-                query += ' WHERE DATE(s.created_at) BETWEEN ? AND ?'
-                params.extend([start_date, end_date])
-            
-            query += '''
-                GROUP BY p.id, p.name
-                ORDER BY total_quantity DESC
-                LIMIT ?
-            '''
-            params.append(limit)
-        
-            cursor.execute(query, params)
+                    COALESCE(p.name, (
+                        SELECT product_name FROM product_sales_daily
+                        WHERE product_id = top.product_id
+                        ORDER BY date DESC LIMIT 1
+                    )) as name,
+                    top.total_quantity,
+                    top.total_amount / 100.0
+                FROM (
+                    SELECT
+                        r.product_id,
+                        SUM(r.quantity) as total_quantity,
+                        SUM(r.revenue) as total_amount
+                    FROM product_sales_daily r{where}
+                    GROUP BY r.product_id
+                    ORDER BY total_quantity DESC, r.product_id
+                    LIMIT ?
+                ) top
+                LEFT JOIN products p ON p.id = top.product_id
+                ORDER BY top.total_quantity DESC, top.product_id
+            ''', params + [limit])
             return cursor.fetchall()
         except Exception as e:
             print(f"Error en get_top_products: {e}")
             return []
-        finally:
-            conn.close()
             
     def get_sales_summary(self, start_date=None, end_date=None):
-        """Obtener resumen de ventas - VERSIÓN CORREGIDA"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-    
+        """Obtener resumen de ventas (cantidad, total, ticket promedio, tipos de cliente)"""
         try:
-            query = '''
-                SELECT 
-                    COUNT(*) as total_sales,
-                    COALESCE(SUM(total), 0) as total_amount,
-                    COALESCE(AVG(total), 0) as average_ticket,
-                    COUNT(DISTINCT customer_type) as unique_customers
-                FROM sales
-            '''
-        
-            params = []
-            if start_date and end_date:
-                query += ' WHERE DATE(created_at) BETWEEN ? AND ?'
-                params.extend([start_date, end_date])
-            
-            cursor.execute(query, params)
-            result = cursor.fetchone()
-        
-            # Asegurarnos de que no haya None
-            if result:
-                return (
-                    result[0] or 0,  # total_sales
-                    result[1] or 0.0,  # total_amount
-                    result[2] or 0.0,  # average_ticket
-                    result[3] or 0  # unique_customers
-                )
-            else:
-                return (0, 0.0, 0.0, 0)
-            
+            return self._read_sales_daily(start_date, end_date)
         except Exception as e:
             print(f"Error en get_sales_summary: {e}")
             return (0, 0.0, 0.0, 0)
-        finally:
-            conn.close()
+
+    def _read_sales_daily(self, start_date=None, end_date=None):
+        """
+        Resumen de ventas leído de sales_daily: una fila por día del rango en
+        lugar de recorrer cada ticket. Devuelve
+        (total_sales, total_amount, average_ticket, unique_customers).
+        """
+        cursor = self.get_connection().cursor()
+        where, params = self._rollup_date_range(start_date, end_date)
+
+        cursor.execute(f'SELECT COALESCE(SUM(sales_count), 0), COALESCE(SUM(total_amount), 0) FROM sales_daily{where}',
+                       params)
+        total_sales, total_cents = cursor.fetchone()
+        cursor.execute(f'SELECT COUNT(DISTINCT customer_type) FROM sales_daily_customers{where}', params)
+        unique_customers = cursor.fetchone()[0]
+
+        # Se suma en centavos; a pesos solo al devolver
+        total_amount = Money.from_cents(total_cents)
+        average_ticket = total_amount / total_sales if total_sales else Money(0)
+        return (total_sales, float(total_amount), float(average_ticket), unique_customers)
         
     def close_connection(self):
-        pass
+        """Cerrar todas las conexiones abiertas (de todos los hilos)"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            # Un nuevo threading.local invalida la conexión cacheada en cada hilo
+            self._local = threading.local()
+
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"Error cerrando conexión: {e}")
         
     def reset_database(self):
         """Método para resetear completamente la base de datos"""
-        if os.path.exists(self.db_name):
-            os.remove(self.db_name)
+        self.close_connection()
+        # En modo WAL también quedan los archivos -wal y -shm junto a la base
+        for path in (self.db_name, f"{self.db_name}-wal", f"{self.db_name}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
         self.init_database()
 
     def debug_sales(self):
         """Método para debug - verificar ventas en la base de datos"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
     
         try:
             # Verificar ventas
@@ -526,7 +1355,7 @@ class Database:
         
             # Verificar últimas ventas
             cursor.execute('''
-                SELECT s.id, s.total, s.created_at, COUNT(si.id) as items_count
+                SELECT s.id, s.total / 100.0, s.created_at, COUNT(si.id) as items_count
                 FROM sales s 
                 LEFT JOIN sale_items si ON s.id = si.sale_id 
                 GROUP BY s.id 
@@ -549,58 +1378,53 @@ class Database:
         except Exception as e:
             print(f"Error en debug: {e}")
             return None
-        finally:
-            conn.close()
 
     def get_detailed_movements(self, date):
         """Obtiene una lista detallada de ventas (movimientos) para una fecha."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
         
+        # CROSS JOIN: recorrer ventas y buscar sus items por índice. Agrupar por
+        # created_at (además de id) permite usar idx_sales_created_at
         query = '''
             SELECT 
                 s.id,
                 TIME(s.created_at) as hora,
                 COALESCE(c.name, 'Consumidor Final') as cliente,
                 GROUP_CONCAT(p.name || ' (' || si.quantity || ')', ', ') as productos,
-                s.total,
+                s.total / 100.0 as total,
                 s.payment_method,
                 s.payment_status
-            FROM sales s
-            LEFT JOIN customers c ON s.customer_id = c.id
-            JOIN sale_items si ON s.id = si.sale_id
-            JOIN products p ON si.product_id = p.id
-            WHERE DATE(s.created_at) = ?
-            GROUP BY s.id
+            FROM {schema}.sales s
+            LEFT JOIN main.customers c ON s.customer_id = c.id
+            CROSS JOIN {schema}.sale_items si ON s.id = si.sale_id
+            JOIN main.products p ON si.product_id = p.id{where}
+            GROUP BY s.created_at, s.id
             ORDER BY s.created_at DESC
         '''
-        cursor.execute(query, (date,))
-        movements = cursor.fetchall()
-        conn.close()
+        movements = self._query_sales(cursor, query, 's.created_at', date, date, sort_index=1)
         return movements
 
     def get_credit_payments_by_date(self, date):
         """Obtiene abonos a cuentas corrientes para una fecha específica, incluyendo el método de pago."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
         
-        query = '''
+        date_filter, date_params = date_range_filter('cp.created_at', date, date)
+        query = f'''
             SELECT 
                 cp.id,
                 TIME(cp.created_at) as hora,
                 c.name as cliente,
                 'Abono Cuenta Corriente' as productos,
-                cp.amount as total,
+                cp.amount / 100.0 as total,
                 cp.payment_method as metodo_pago,  -- <<-- Método de pago real del abono
                 'pagado' as estado
             FROM credit_payments cp
             JOIN customers c ON cp.customer_id = c.id
-            WHERE DATE(cp.created_at) = ?
+            WHERE {date_filter}
             ORDER BY cp.created_at DESC
         '''
-        cursor.execute(query, (date,))
+        cursor.execute(query, date_params)
         payments = cursor.fetchall()
-        conn.close()
         return payments
         
         """"
@@ -620,9 +1444,6 @@ class Database:
 
     def get_previous_period_sales(self, start_date, end_date):
         """Obtener ventas del período anterior para comparación"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-    
         try:
             # Calcular período anterior (misma duración)
             from datetime import datetime, timedelta
@@ -637,382 +1458,392 @@ class Database:
             previous_end_str = previous_end.strftime("%Y-%m-%d")
         
             # Obtener datos del período anterior
-            query = '''
-                SELECT 
-                    COUNT(*) as total_sales,
-                    COALESCE(SUM(total), 0) as total_amount,
-                    COALESCE(AVG(total), 0) as average_ticket,
-                    COUNT(DISTINCT customer_type) as unique_customers
-                FROM sales
-                WHERE DATE(created_at) BETWEEN ? AND ?
-            '''
-        
-            cursor.execute(query, (previous_start_str, previous_end_str))
-            result = cursor.fetchone()
-        
-            if result:
-                return (
-                    result[0] or 0,  # total_sales
-                    result[1] or 0.0,  # total_amount
-                    result[2] or 0.0,  # average_ticket
-                    result[3] or 0  # unique_customers
-                )
-            else:
-                return (0, 0.0, 0.0, 0)
+            return self._read_sales_daily(previous_start_str, previous_end_str)
             
         except Exception as e:
             print(f"Error en get_previous_period_sales: {e}")
             return (0, 0.0, 0.0, 0)
-        finally:
-            conn.close()
 
     def get_total_products_sold(self, start_date=None, end_date=None):
-        """Obtener total de productos vendidos"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
+        """Obtener total de productos vendidos (desde product_sales_daily)"""
         try:
-            query = '''
-                SELECT COALESCE(SUM(quantity), 0) as total_products
-                FROM sale_items si
-                JOIN sales s ON si.sale_id = s.id
-            '''
-
-            params = []
-            if start_date and end_date:
-                query += ' WHERE DATE(s.created_at) BETWEEN ? AND ?'
-                params.extend([start_date, end_date])
-
-            cursor.execute(query, params)
-            result = cursor.fetchone()
-            return result[0] if result else 0
+            where, params = self._rollup_date_range(start_date, end_date)
+            cursor = self.get_connection().cursor()
+            cursor.execute(f'SELECT COALESCE(SUM(quantity), 0) FROM product_sales_daily{where}', params)
+            return cursor.fetchone()[0]
 
         except Exception as e:
             print(f"Error en get_total_products_sold: {e}")
             return 0
-        finally:
-            conn.close()
 
     def get_hourly_sales(self, start_date=None, end_date=None):
-        """Obtener ventas agrupadas por hora"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
+        """Obtener ventas agrupadas por hora: [(hora 'HH', cantidad, total)]"""
         try:
-            query = '''
+            where, params = self._rollup_date_range(start_date, end_date)
+            cursor = self.get_connection().cursor()
+            cursor.execute(f'''
                 SELECT
-                    strftime('%H', s.created_at) as hour,
-                    COUNT(*) as sales_count,
-                    COALESCE(SUM(s.total), 0) as total_amount
-                FROM sales s
-            '''
-
-            params = []
-            if start_date and end_date:
-                query += ' WHERE DATE(s.created_at) BETWEEN ? AND ?'
-                params.extend([start_date, end_date])
+                    printf('%02d', hour) as hour,
+                    SUM(sales_count) as sales_count,
+                    SUM(total_amount) / 100.0 as total_amount
+                FROM sales_hourly{where}
+                GROUP BY sales_hourly.hour
+                ORDER BY sales_hourly.hour
+            ''', params)
+            return cursor.fetchall()
 
-            query += ' GROUP BY strftime(\'%H\', s.created_at) ORDER BY hour'
+        except Exception as e:
+            print(f"Error en get_hourly_sales: {e}")
+            return []
 
-            cursor.execute(query, params)
+    def get_weekday_sales(self, start_date=None, end_date=None):
+        """
+        Obtener ventas agrupadas por día de la semana:
+        [(día 0-6, cantidad, total)], con 0 = domingo como en strftime('%w').
+        """
+        try:
+            where, params = self._rollup_date_range(start_date, end_date)
+            cursor = self.get_connection().cursor()
+            cursor.execute(f'''
+                SELECT
+                    CAST(strftime('%w', date) AS INTEGER) as weekday,
+                    SUM(sales_count) as sales_count,
+                    SUM(total_amount) / 100.0 as total_amount
+                FROM sales_hourly{where}
+                GROUP BY weekday
+                ORDER BY weekday
+            ''', params)
             return cursor.fetchall()
 
         except Exception as e:
-            print(f"Error en get_hourly_sales: {e}")
+            print(f"Error en get_weekday_sales: {e}")
             return []
-        finally:
-            conn.close()
+
+    def get_sales_heatmap(self, start_date=None, end_date=None):
+        """
+        Mapa de calor día de la semana x hora, para planificar turnos.
+        Devuelve {'sales_count': [[...24] x 7], 'total_amount': [[...24] x 7]},
+        con la fila 0 = domingo.
+        """
+        heatmap = {
+            'sales_count': [[0] * 24 for _ in range(7)],
+            'total_amount': [[0.0] * 24 for _ in range(7)],
+        }
+        try:
+            where, params = self._rollup_date_range(start_date, end_date)
+            cursor = self.get_connection().cursor()
+            cursor.execute(f'''
+                SELECT
+                    CAST(strftime('%w', date) AS INTEGER) as weekday,
+                    hour,
+                    SUM(sales_count),
+                    SUM(total_amount) / 100.0
+                FROM sales_hourly{where}
+                GROUP BY weekday, hour
+            ''', params)
+            for weekday, hour, sales_count, total_amount in cursor.fetchall():
+                heatmap['sales_count'][weekday][hour] = sales_count
+                heatmap['total_amount'][weekday][hour] = total_amount
+        except Exception as e:
+            print(f"Error en get_sales_heatmap: {e}")
+        return heatmap
+
+    def _rollup_date_range(self, start_date, end_date, column='date'):
+        """Filtro (where, params) por rango sobre la columna date de las tablas de resumen"""
+        if start_date and end_date:
+            return f' WHERE {column} BETWEEN ? AND ?', [start_date, end_date]
+        return '', []
 
     def get_payment_methods_distribution(self, start_date=None, end_date=None):
         """Obtener distribución de métodos de pago"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
 
         try:
             query = '''
-                SELECT
-                    payment_method,
-                    COUNT(*) as count,
-                    COALESCE(SUM(total), 0) as total_amount
-                FROM sales
+                SELECT payment_method, COUNT(*), COALESCE(SUM(total), 0)
+                FROM {schema}.sales{where}
+                GROUP BY payment_method
             '''
+            # Se suman los centavos de la base viva y de los archivos del rango
+            methods = {}
+            for method, count, cents in self._query_sales(cursor, query, 'created_at', start_date, end_date):
+                previous_count, previous_cents = methods.get(method, (0, 0))
+                methods[method] = (previous_count + count, previous_cents + cents)
 
-            params = []
-            if start_date and end_date:
-                query += ' WHERE DATE(created_at) BETWEEN ? AND ?'
-                params.extend([start_date, end_date])
-
-            query += ' GROUP BY payment_method ORDER BY total_amount DESC'
-
-            cursor.execute(query, params)
-            return cursor.fetchall()
+            distribution = [(method, count, float(Money.from_cents(cents)))
+                            for method, (count, cents) in methods.items()]
+            distribution.sort(key=lambda row: row[2], reverse=True)
+            return distribution
 
         except Exception as e:
             print(f"Error en get_payment_methods_distribution: {e}")
             return []
-        finally:
-            conn.close()
 
     def get_detailed_sales_report(self, start_date=None, end_date=None):
         """Obtener reporte DETALLADO de ventas con todos los productos"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
     
         try:
+            # Agrupar por created_at (además de id) permite usar idx_sales_created_at
             query = '''
                 SELECT 
                     s.id,
-                    s.total,
+                    s.total / 100.0,
                     s.payment_method,
                     s.customer_type,
                     s.created_at,
                     s.payment_status,
                     GROUP_CONCAT(
-                        si.product_name || ' x' || si.quantity || ' = $' || si.subtotal, 
+                        si.product_name || ' x' || si.quantity || ' = $' || printf('%.2f', si.subtotal / 100.0), 
                         '\n'
                     ) as items_detail,
                     COUNT(si.id) as items_count
-                FROM sales s
-                LEFT JOIN sale_items si ON s.id = si.sale_id
+                FROM {schema}.sales s
+                LEFT JOIN {schema}.sale_items si ON s.id = si.sale_id{where}
+                GROUP BY s.created_at, s.id ORDER BY s.created_at DESC
             '''
-        
-            params = []
-            if start_date and end_date:
-                query += ' WHERE DATE(s.created_at) BETWEEN ? AND ?'
-                params.extend([start_date, end_date])
-        
-            query += ' GROUP BY s.id ORDER BY s.created_at DESC'
-        
-            cursor.execute(query, params)
-            return cursor.fetchall()
+            return self._query_sales(cursor, query, 's.created_at', start_date, end_date, sort_index=4)
         except Exception as e:
             print(f"Error en get_detailed_sales_report: {e}")
             return []
-        finally:
-            conn.close()
 
     def add_credit_payment_detailed(self, customer_id, payments_data):
         """Agregar abono a cuenta corriente con detalle de métodos de pago"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-    
         try:
-            cursor.execute('BEGIN TRANSACTION')
-        
-            # Insertar pago principal
-            total_amount = sum(payment['amount'] for payment in payments_data)
-            cursor.execute('''
-                INSERT INTO credit_payments (customer_id, amount, notes)
-                VALUES (?, ?, ?)
-            ''', (customer_id, total_amount, f"Abono con {len(payments_data)} métodos"))
-        
-            payment_id = cursor.lastrowid
-        
-            # Insertar detalles de métodos de pago
-            for payment in payments_data:
+            with self.transaction() as cursor:
+                # Insertar pago principal
+                total_amount = sum(Money.to_cents(payment['amount']) for payment in payments_data)
                 cursor.execute('''
-                    INSERT INTO credit_payments_detail (credit_payment_id, payment_method, amount)
+                    INSERT INTO credit_payments (customer_id, amount, notes)
                     VALUES (?, ?, ?)
-                ''', (payment_id, payment['method'], payment['amount']))
-        
-            # Actualizar saldo del cliente
-            cursor.execute('''
-                UPDATE customers 
-                SET current_balance = current_balance - ? 
-                WHERE id = ?
-            ''', (total_amount, customer_id))
-        
-            conn.commit()
+                ''', (customer_id, total_amount, f"Abono con {len(payments_data)} métodos"))
+            
+                payment_id = cursor.lastrowid
+            
+                # Insertar detalles de métodos de pago
+                for payment in payments_data:
+                    cursor.execute('''
+                        INSERT INTO credit_payments_detail (credit_payment_id, payment_method, amount)
+                        VALUES (?, ?, ?)
+                    ''', (payment_id, payment['method'], Money.to_cents(payment['amount'])))
+            
+                # Actualizar saldo del cliente
+                cursor.execute('''
+                    UPDATE customers 
+                    SET current_balance = current_balance - ? 
+                    WHERE id = ?
+                ''', (total_amount, customer_id))
+            
             return payment_id
         
         except Exception as e:
-            conn.rollback()
             raise Exception(f"Error al registrar abono: {str(e)}")
-        finally:
-            conn.close()
-
-    def create_automatic_backup(self):
-        """Crea una copia de seguridad con la fecha actual."""
-        # Evitamos la ruta absoluta aquí para que el backup quede en el mismo directorio
-        backup_dir = 'backups'
-        if not os.path.exists(backup_dir):
-            os.makedirs(backup_dir)
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_filename = os.path.join(backup_dir, f'backup_{timestamp}_{self.db_name}')
-        
-        conn_src = self.get_connection()
-        conn_bck = sqlite3.connect(backup_filename)
-        
-        conn_src.backup(conn_bck)
-        
-        conn_bck.close()
-        conn_src.close()
-        print(f"Backup creado exitosamente en: {backup_filename}")
+    def create_automatic_backup(self, wait=False, on_finished=None):
+        """
+        Crea una copia de seguridad comprimida con la fecha actual, en un hilo
+        aparte: las ventas se siguen guardando mientras se copia. Al terminar se
+        verifica y queda en el catálogo de backups/. Devuelve el BackupJob
+        (progreso, entrada del catálogo o error); con wait=True espera a que termine.
+        """
+        job = self.backup_service.start(on_finished)
+        if wait:
+            job.wait()
+        return job
 
     def clean_old_backups(self, backup_dir, max_backups=10):
-        """Limpiar backups antiguos"""
+        """Limpiar backups antiguos de esta base (según el catálogo, ver db_backup.py)"""
+        clean_old_backups(backup_dir, max_backups, os.path.splitext(os.path.basename(self.db_name))[0])
+
+    # ===== CONTADORES DE INVENTARIO =====
+
+    INVENTORY_STATS_FIELDS = ('total_products', 'low_stock_count', 'out_of_stock_count', 'inventory_value')
+
+    def get_inventory_stats(self):
+        """
+        Contadores del inventario en una sola lectura de inventory_stats:
+        {'total_products', 'low_stock_count', 'out_of_stock_count', 'inventory_value'}
+        """
         try:
-            backups = []
-            for f in os.listdir(backup_dir):
-                if f.startswith("backup_") and f.endswith(".db"):
-                    file_path = os.path.join(backup_dir, f)
-                    backups.append((file_path, os.path.getctime(file_path)))
-        
-            # Ordenar por fecha de creación (más antiguos primero)
-            backups.sort(key=lambda x: x[1])
-        
-            # Eliminar los más antiguos si excedemos el límite
-            while len(backups) > max_backups:
-                old_backup = backups.pop(0)
-                os.remove(old_backup[0])
-                print(f"🗑️ Backup antiguo eliminado: {old_backup[0]}")
-            
+            cursor = self.get_connection().cursor()
+            cursor.execute('''
+                SELECT total_products, low_stock_count, out_of_stock_count, inventory_value / 100.0
+                FROM inventory_stats WHERE id = 1
+            ''')
+            row = cursor.fetchone() or (0, 0, 0, 0.0)
+            return dict(zip(self.INVENTORY_STATS_FIELDS, row))
         except Exception as e:
-            print(f"Error limpiando backups: {e}")
+            print(f"Error en get_inventory_stats: {e}")
+            return dict(zip(self.INVENTORY_STATS_FIELDS, (0, 0, 0, 0.0)))
+
+    def check_inventory_stats(self, repair=False):
+        """
+        Verificar inventory_stats contra un recálculo desde cero de products.
+        Devuelve {campo: (guardado, real)} con las diferencias encontradas
+        (vacío si está consistente). Con repair=True corrige la fila.
+        """
+        with self.transaction("DEFERRED" if not repair else "IMMEDIATE") as cursor:
+            cursor.execute('''
+                SELECT total_products, low_stock_count, out_of_stock_count, inventory_value
+                FROM inventory_stats WHERE id = 1
+            ''')
+            stored = cursor.fetchone() or (None, None, None, None)
+            cursor.execute(self.INVENTORY_STATS_QUERY)
+            actual = cursor.fetchone()
+
+            drift = {}
+            # Todos los contadores son enteros (el valor del inventario en centavos): comparación exacta
+            for field, stored_value, actual_value in zip(self.INVENTORY_STATS_FIELDS, stored, actual):
+                if stored_value != actual_value:
+                    drift[field] = (stored_value, actual_value)
+
+            if drift:
+                print(f"⚠️ inventory_stats desincronizado: {drift}")
+                if repair:
+                    self.rebuild_inventory_stats(cursor)
+        return drift
 
     def get_total_products(self):
         """Obtener total de productos"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-    
-        try:
-            cursor.execute('SELECT COUNT(*) FROM products')
-            return cursor.fetchone()[0] or 0
-        except Exception as e:
-            print(f"Error en get_total_products: {e}")
-            return 0
-        finally:
-            conn.close()
+        return self.get_inventory_stats()['total_products']
 
     def get_low_stock_count(self):
         """Obtener cantidad de productos con stock bajo"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-    
-        try:
-            cursor.execute('SELECT COUNT(*) FROM products WHERE stock > 0 AND stock <= min_stock')
-            return cursor.fetchone()[0] or 0
-        except Exception as e:
-            print(f"Error en get_low_stock_count: {e}")
-            return 0
-        finally:
-            conn.close()
+        return self.get_inventory_stats()['low_stock_count']
 
     def get_out_of_stock_count(self):
         """Obtener cantidad de productos sin stock"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-    
-        try:
-            cursor.execute('SELECT COUNT(*) FROM products WHERE stock = 0')
-            return cursor.fetchone()[0] or 0
-        except Exception as e:
-            print(f"Error en get_out_of_stock_count: {e}")
-            return 0
-        finally:
-            conn.close()
+        return self.get_inventory_stats()['out_of_stock_count']
 
     def get_inventory_value(self):
         """Calcular valor total del inventario"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-    
-        try:
-            cursor.execute('SELECT COALESCE(SUM(stock * buy_price), 0) FROM products WHERE stock > 0')
-            return cursor.fetchone()[0] or 0.0
-        except Exception as e:
-            print(f"Error en get_inventory_value: {e}")
-            return 0.0
-        finally:
-            conn.close()
+        return self.get_inventory_stats()['inventory_value']
 
     def get_cash_register_income_summary(self, date):
         """
         Calcula el total de INGRESOS MONETARIOS para el cierre de caja.
         Suma ventas pagadas (excluye 'cuenta_corriente') y abonos.
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
         
-        total_income = 0
+        total_income = Money(0)
+        date_filter, date_params = date_range_filter('created_at', date, date)
         
-        # 1. Sumar ventas cuyo estado de pago sea 'pagado'
+        # 1. Sumar ventas cuyo estado de pago sea 'pagado' (también si el día ya se archivó)
         try:
             query_sales = """
-                SELECT SUM(total) FROM sales
-                WHERE DATE(created_at) = ? AND payment_status = 'pagado';
+                SELECT SUM(total) FROM {schema}.sales{where} AND payment_status = 'pagado';
             """
-            cursor.execute(query_sales, (date,))
-            cash_sales = cursor.fetchone()[0] or 0
-            total_income += cash_sales
+            for (cash_sales,) in self._query_sales(cursor, query_sales, 'created_at', date, date):
+                total_income += Money.from_cents(cash_sales)
         except Exception as e:
             print(f"Error al obtener ventas pagadas: {e}")
 
         # 2. Sumar abonos a cuenta corriente
         try:
-            query_payments = """
+            query_payments = f"""
                 SELECT SUM(amount) FROM credit_payments
-                WHERE DATE(created_at) = ?;
+                WHERE {date_filter};
             """
-            cursor.execute(query_payments, (date,))
+            cursor.execute(query_payments, date_params)
             credit_payments = cursor.fetchone()[0] or 0
-            total_income += credit_payments
+            total_income += Money.from_cents(credit_payments)
         except Exception as e:
             print(f"Error al obtener abonos: {e}")
             
-        conn.close()
-        return total_income
+        return float(total_income)
+
+    def get_cash_close_snapshot(self, date, top_limit=5):
+        """
+        Todos los datos del reporte de cierre de caja en una sola transacción
+        de lectura, así los números son consistentes entre sí aunque otra
+        terminal esté vendiendo. Lee solo las tablas de resumen (ventas diarias,
+        ventas por producto e inventory_stats).
+        """
+        try:
+            with self.transaction("DEFERRED") as cursor:
+                cursor.execute('''
+                    SELECT sales_count, total_amount, paid_amount FROM sales_daily WHERE date = ?
+                ''', (date,))
+                total_sales, total_cents, paid_cents = cursor.fetchone() or (0, 0, 0)
+
+                cursor.execute('SELECT COUNT(*) FROM sales_daily_customers WHERE date = ?', (date,))
+                unique_customers = cursor.fetchone()[0]
+
+                date_filter, date_params = date_range_filter('created_at', date, date)
+                cursor.execute(f'SELECT COALESCE(SUM(amount), 0) FROM credit_payments WHERE {date_filter}',
+                               date_params)
+                credit_cents = cursor.fetchone()[0]
+
+                # Productos vendidos en el día: el total y el ranking salen de la misma lectura
+                cursor.execute('''
+                    SELECT COALESCE(p.name, r.product_name), r.quantity, r.revenue / 100.0
+                    FROM product_sales_daily r
+                    LEFT JOIN products p ON p.id = r.product_id
+                    WHERE r.date = ?
+                    ORDER BY r.quantity DESC, r.product_id
+                ''', (date,))
+                products_sold = cursor.fetchall()
+
+                cursor.execute('''
+                    SELECT total_products, inventory_value / 100.0, low_stock_count, out_of_stock_count
+                    FROM inventory_stats WHERE id = 1
+                ''')
+                total_products, inventory_value, low_stock_count, out_of_stock_count = cursor.fetchone()
+
+            # Las sumas son en centavos; a pesos solo al devolver
+            total_amount = Money.from_cents(total_cents)
+            return {
+                'date': date,
+                'total_income': float(Money.from_cents(paid_cents) + Money.from_cents(credit_cents)),
+                'total_sales': total_sales,
+                'total_amount': float(total_amount),
+                'average_ticket': float(total_amount / total_sales) if total_sales else 0.0,
+                'unique_customers': unique_customers,
+                'total_products_sold': sum(quantity for _, quantity, _ in products_sold),
+                'top_products': products_sold[:top_limit],
+                'inventory_value': inventory_value,
+                'total_products': total_products,
+                'low_stock_count': low_stock_count,
+                'out_of_stock_count': out_of_stock_count,
+            }
+        except Exception as e:
+            raise Exception(f"Error al calcular el cierre de caja: {str(e)}")
 
     def insert_cash_close_record(self, date, total_income, notes=""):
         """Insertar registro de cierre de caja"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
         try:
-            cursor.execute('''
-                INSERT INTO cash_closes (date, total_income, notes)
-                VALUES (?, ?, ?)
-            ''', (date, total_income, notes))
-            conn.commit()
+            with self.transaction() as cursor:
+                cursor.execute('''
+                    INSERT INTO cash_closes (date, total_income, notes)
+                    VALUES (?, ?, ?)
+                ''', (date, Money.to_cents(total_income), notes))
             return cursor.lastrowid
         except sqlite3.IntegrityError:
-            conn.rollback()
             raise Exception(f"Ya existe un cierre de caja para la fecha: {date}")
         except Exception as e:
-            conn.rollback()
             raise Exception(f"Error al guardar cierre de caja: {str(e)}")
-        finally:
-            conn.close()
 
     def insert_cash_open_record(self, date, opening_amount, notes=""):
         """Insertar registro de apertura de caja"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
         try:
-            cursor.execute('''
-                INSERT INTO cash_opens (date, opening_amount, notes)
-                VALUES (?, ?, ?)
-            ''', (date, opening_amount, notes))
-            conn.commit()
+            with self.transaction() as cursor:
+                cursor.execute('''
+                    INSERT INTO cash_opens (date, opening_amount, notes)
+                    VALUES (?, ?, ?)
+                ''', (date, Money.to_cents(opening_amount), notes))
             return cursor.lastrowid
         except sqlite3.IntegrityError:
-            conn.rollback()
             raise Exception(f"Ya existe una apertura de caja para la fecha: {date}")
         except Exception as e:
-            conn.rollback()
             raise Exception(f"Error al guardar apertura de caja: {str(e)}")
-        finally:
-            conn.close()
 
     def get_cash_close_records(self, start_date=None, end_date=None):
         """Obtener registros de cierres de caja"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
 
         try:
-            query = 'SELECT id, date, total_income, notes, created_at FROM cash_closes'
+            query = 'SELECT id, date, total_income / 100.0, notes, created_at FROM cash_closes'
             params = []
 
             if start_date and end_date:
@@ -1026,16 +1857,13 @@ class Database:
         except Exception as e:
             print(f"Error en get_cash_close_records: {e}")
             return []
-        finally:
-            conn.close()
 
     def get_cash_open_records(self, start_date=None, end_date=None):
         """Obtener registros de aperturas de caja"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor = self.get_connection().cursor()
 
         try:
-            query = 'SELECT id, date, opening_amount, notes, created_at FROM cash_opens'
+            query = 'SELECT id, date, opening_amount / 100.0, notes, created_at FROM cash_opens'
             params = []
 
             if start_date and end_date:
@@ -1049,5 +1877,244 @@ class Database:
         except Exception as e:
             print(f"Error en get_cash_open_records: {e}")
             return []
-        finally:
-            conn.close()
+
+    # ===== ARCHIVO DE VENTAS ANTIGUAS =====
+
+    # Antigüedad (en días) a partir de la cual archive_old_sales mueve las ventas
+    ARCHIVE_AFTER_DAYS = 730
+    ARCHIVED_TABLES = ('sales', 'sale_items')
+
+    def archive_path(self, year):
+        """Archivo de las ventas de `year`, junto a la base viva"""
+        return os.path.join(os.path.dirname(os.path.abspath(self.db_name)), f"archive_{int(year)}.db")
+
+    def get_sales_archives(self):
+        """Archivos de ventas: [(año, archivo, archivado hasta, ventas, items)]"""
+        try:
+            cursor = self.get_connection().cursor()
+            cursor.execute('''
+                SELECT year, file, archived_until, sales_count, items_count
+                FROM sales_archives ORDER BY year
+            ''')
+            return cursor.fetchall()
+        except Exception as e:
+            print(f"Error en get_sales_archives: {e}")
+            return []
+
+    def _attach_archive(self, conn, year, create=False):
+        """
+        Adjuntar archive_AAAA.db a la conexión (como esquema archive_AAAA) si no
+        lo está. Con create=True se crean sus tablas con las columnas actuales.
+        """
+        schema = f"archive_{int(year)}"
+        attached = [row[1] for row in conn.execute('PRAGMA database_list')]
+        if schema not in attached:
+            # SQLite limita los archivos adjuntos por conexión: soltar los otros archivos
+            limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) if hasattr(conn, 'getlimit') else 10
+            others = [name for name in attached if name.startswith('archive_')]
+            if len(others) >= limit:
+                for name in others:
+                    conn.execute(f'DETACH DATABASE {name}')
+            conn.execute(f'ATTACH DATABASE ? AS {schema}', (self.archive_path(year),))
+
+        if create:
+            cursor = conn.cursor()
+            for table in self.ARCHIVED_TABLES:
+                cursor.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,))
+                cursor.execute(rename_create_table(cursor.fetchone()[0], table,
+                                                   f'CREATE TABLE IF NOT EXISTS {schema}.{table}'))
+                # Los mismos índices que en la base viva; los triggers de resumen no hacen falta
+                cursor.execute('''
+                    SELECT sql FROM main.sqlite_master
+                    WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL
+                ''', (table,))
+                for (index_sql,) in cursor.fetchall():
+                    cursor.execute(re.sub(r'^\s*CREATE\s+(UNIQUE\s+)?INDEX\s+(IF\s+NOT\s+EXISTS\s+)?',
+                                          rf'CREATE \1INDEX IF NOT EXISTS {schema}.', index_sql,
+                                          count=1, flags=re.IGNORECASE))
+        return schema
+
+    def _sales_sources(self, column, start_date=None, end_date=None):
+        """
+        Bases a consultar para las ventas de un rango: (esquema, where, params).
+        Siempre la base viva ('main') y, si el rango llega a lo archivado, cada
+        archivo anual que lo cubre (se adjunta recién al usarlo). En un archivo
+        solo cuentan las ventas anteriores a su archived_until.
+        """
+        if start_date and end_date:
+            date_filter, date_params = date_range_filter(column, start_date, end_date)
+            yield 'main', f' WHERE {date_filter}', date_params
+        else:
+            date_filter, date_params = None, []
+            yield 'main', '', []
+
+        conn = self.get_connection()
+        archives = conn.execute('SELECT year, archived_until FROM sales_archives ORDER BY year DESC').fetchall()
+        for year, archived_until in archives:
+            if date_filter and not (date_params[0] < archived_until and date_params[1] > f"{year}-01-01"):
+                continue
+            conditions = ([date_filter] if date_filter else []) + [f'{column} < ?']
+            yield (self._attach_archive(conn, year), f" WHERE {' AND '.join(conditions)}",
+                   date_params + [archived_until])
+
+    def _query_sales(self, cursor, query, column, start_date=None, end_date=None, sort_index=None, limit=None):
+        """
+        Ejecutar `query` (con {schema} y {where}) sobre la base viva y los
+        archivos del rango y juntar las filas. Si hubo archivos, se vuelven a
+        ordenar por la columna `sort_index` (descendente) y a cortar en `limit`.
+        """
+        rows = []
+        sources = 0
+        for schema, where, params in self._sales_sources(column, start_date, end_date):
+            cursor.execute(query.format(schema=schema, where=where), params)
+            rows.extend(cursor.fetchall())
+            sources += 1
+        if sources > 1 and sort_index is not None:
+            rows.sort(key=lambda row: row[sort_index], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def archive_old_sales(self, older_than_days=None, reference_date=None):
+        """
+        Mover a archive_AAAA.db (uno por año, junto a la base) las ventas y sus
+        items de los meses completos con más de `older_than_days` días
+        (ARCHIVE_AFTER_DAYS por defecto) al `reference_date` (hoy si no se da).
+        Devuelve {año: ventas archivadas}.
+
+        Los resúmenes (sales_daily, sales_hourly, product_sales_daily) quedan
+        en la base viva con toda la historia; los reportes que leen ventas
+        sueltas suman los archivos cuando el rango los alcanza. Los rebuild_*
+        recalculan solo desde la base viva.
+        """
+        days = self.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        reference = (datetime.strptime(reference_date, "%Y-%m-%d") if reference_date
+                     else datetime.strptime(self.get_current_local_time(), "%Y-%m-%d %H:%M:%S"))
+        cutoff = (reference - timedelta(days=days)).replace(day=1).strftime("%Y-%m-%d")
+
+        conn = self.get_connection()
+        archived = {}
+        while True:
+            first_sale = conn.execute('SELECT MIN(created_at) FROM sales').fetchone()[0]
+            if first_sale is None or first_sale >= cutoff:
+                break
+            month_start = datetime.strptime(first_sale[:7], "%Y-%m")
+            month_end = (month_start + timedelta(days=32)).replace(day=1)
+            moved = self._archive_month(conn, month_start.year, month_start.strftime("%Y-%m-%d"),
+                                        month_end.strftime("%Y-%m-%d"))
+            if not moved:
+                raise Exception(f"No se pudieron archivar las ventas desde {first_sale}")
+            archived[month_start.year] = archived.get(month_start.year, 0) + moved
+        return archived
+
+    def _archive_month(self, conn, year, month_start, month_end):
+        """
+        Archivar un mes en dos pasos: copiarlo al archivo y, en otra transacción,
+        borrarlo de la base viva y avanzar archived_until. En WAL una transacción
+        sobre varios archivos no es atómica: si el proceso se corta entre los dos
+        pasos, la copia queda fuera de archived_until (no se cuenta dos veces) y
+        la próxima ejecución la reemplaza.
+        """
+        schema = self._attach_archive(conn, year, create=True)
+        columns = {}
+        for table in self.ARCHIVED_TABLES:
+            archived_columns = {row[1] for row in conn.execute(f'PRAGMA {schema}.table_info({table})')}
+            columns[table] = [row[1] for row in conn.execute(f'PRAGMA main.table_info({table})')
+                              if row[1] in archived_columns]
+        sale_columns = ', '.join(columns['sales'])
+        item_columns = ', '.join(columns['sale_items'])
+        month = (month_start, month_end)
+
+        with self.transaction() as cursor:
+            cursor.execute(f'''
+                INSERT OR REPLACE INTO {schema}.sales ({sale_columns})
+                SELECT {sale_columns} FROM main.sales WHERE created_at >= ? AND created_at < ?
+            ''', month)
+            cursor.execute(f'''
+                INSERT OR REPLACE INTO {schema}.sale_items ({item_columns})
+                SELECT {', '.join(f'si.{column}' for column in columns['sale_items'])}
+                FROM main.sales s CROSS JOIN main.sale_items si ON si.sale_id = s.id
+                WHERE s.created_at >= ? AND s.created_at < ?
+            ''', month)
+
+        with self.transaction() as cursor:
+            # Sin los triggers de borrado: las ventas salen de la base viva pero no de los resúmenes
+            cursor.execute('''
+                SELECT name, sql FROM main.sqlite_master
+                WHERE type = 'trigger' AND tbl_name IN ('sales', 'sale_items') AND sql LIKE '%DELETE ON%'
+            ''')
+            triggers = cursor.fetchall()
+            for name, _ in triggers:
+                cursor.execute(f'DROP TRIGGER main.{name}')
+
+            cursor.execute(f'''
+                DELETE FROM main.sale_items WHERE sale_id IN (
+                    SELECT s.id FROM main.sales s JOIN {schema}.sales a ON a.id = s.id
+                    WHERE s.created_at >= ? AND s.created_at < ?
+                )
+            ''', month)
+            cursor.execute(f'''
+                DELETE FROM main.sales
+                WHERE created_at >= ? AND created_at < ? AND id IN (SELECT id FROM {schema}.sales)
+            ''', month)
+            moved = cursor.rowcount
+
+            for _, sql in triggers:
+                cursor.execute(sql)
+            # El diario no registra las bajas de arriba (sus triggers de borrado también se quitaron)
+            journal_archived_month(cursor, month_start, month_end)
+
+            cursor.execute('SELECT COUNT(*) FROM main.sales WHERE created_at >= ? AND created_at < ?', month)
+            if cursor.fetchone()[0]:
+                # Alguna venta cambió entre la copia y el borrado: se deshace este paso
+                raise Exception(f"Quedaron ventas de {month_start[:7]} sin copiar al archivo; volver a ejecutar")
+
+            cursor.execute(f'''
+                INSERT INTO sales_archives (year, file, archived_until, sales_count, items_count)
+                VALUES (?, ?, ?,
+                        (SELECT COUNT(*) FROM {schema}.sales WHERE created_at < ?),
+                        (SELECT COUNT(*) FROM {schema}.sales s CROSS JOIN {schema}.sale_items si
+                         ON si.sale_id = s.id WHERE s.created_at < ?))
+                ON CONFLICT (year) DO UPDATE SET
+                    archived_until = excluded.archived_until,
+                    sales_count = excluded.sales_count,
+                    items_count = excluded.items_count,
+                    updated_at = CURRENT_TIMESTAMP
+            ''', (year, os.path.basename(self.archive_path(year)), month_end, month_end, month_end))
+        return moved
+
+    # ===== DIARIO DE CAMBIOS =====
+
+    # Cambios por segmento al enviar el diario
+    JOURNAL_SEGMENT_ROWS = 20000
+
+    def journal_dir(self):
+        """Carpeta de los segmentos del diario de esta base (backups/journal_<base>)"""
+        return journal_dir(self.backup_service.backup_dir, self.backup_service.base_name)
+
+    def ship_change_journal(self, max_rows=None):
+        """
+        Enviar los cambios pendientes del diario a journal_dir() en segmentos
+        comprimidos y borrarlos de la base. Devuelve la cantidad enviada.
+        """
+        max_rows = max_rows or self.JOURNAL_SEGMENT_ROWS
+        shipped = 0
+        try:
+            with self._journal_lock:
+                conn = self.get_connection()
+                while True:
+                    rows = conn.execute('''
+                        SELECT seq, table_name, op, row_id, row_data FROM change_journal
+                        ORDER BY seq LIMIT ?
+                    ''', (max_rows,)).fetchall()
+                    if not rows:
+                        break
+                    write_segment(self.journal_dir(), rows)
+                    # Si el proceso se corta acá, el próximo envío repite estos cambios
+                    # en otro segmento y la reconstrucción saltea los repetidos
+                    with self.transaction() as cursor:
+                        cursor.execute('DELETE FROM change_journal WHERE seq <= ?', (rows[-1][0],))
+                    shipped += len(rows)
+                    if len(rows) < max_rows:
+                        break
+            return shipped
+        except Exception as e:
+            raise Exception(f"Error al enviar el diario de cambios: {str(e)}")
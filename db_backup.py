@@ -0,0 +1,664 @@
+"""
+Copias de seguridad en línea de la base.
+
+BackupService copia la base en un hilo aparte con la API de backup de SQLite,
+de a tramos de páginas: entre un tramo y el siguiente las ventas se siguen
+guardando. En modo WAL la copia se hace dentro de una transacción de lectura,
+así refleja un único momento de la base y no vuelve a empezar cada vez que
+otra conexión escribe. Al terminar, la copia se comprime (zstd si está
+instalado el paquete zstandard, si no gzip).
+
+Cada respaldo queda registrado en backups/catalog.json con su tamaño, sha256,
+filas por tabla y el resultado de PRAGMA integrity_check. La verificación
+corre en el mismo hilo del respaldo, después de comprimir, y la rotación y la
+restauración se deciden con ese catálogo.
+
+Uso:
+    python db_backup.py respaldar [--base kiosco_pos.db] [--carpeta backups] [--maximo 10]
+    python db_backup.py verificar [--base kiosco_pos.db] [--todos]
+    python db_backup.py listar [--base kiosco_pos.db]
+    python db_backup.py restaurar [--base kiosco_pos.db]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+from db_journal import JournalGapError, journal_dir, journal_position, prune_segments, replay_journal
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_BACKUP_DIR = "backups"
+DEFAULT_MAX_BACKUPS = 10
+BACKUP_PREFIX = "backup_"
+# Páginas por tramo: con páginas de 4 KB son 1 MB por paso
+DEFAULT_PAGES_PER_STEP = 256
+# Pausa entre tramos para dejar pasar a las escrituras (segundos)
+DEFAULT_STEP_SLEEP = 0.005
+COPY_CHUNK = 1024 * 1024
+BACKUP_SUFFIXES = (".db.zst", ".db.gz", ".db")
+CATALOG_FILE = "catalog.json"
+# backup_<fecha>_<hora>[_<n>]_<base>.db[.zst|.gz]
+BACKUP_NAME = re.compile(r"^backup_(?P<timestamp>\d{8}_\d{6})_(?:\d+_)?(?P<base>.+?)\.db(?:\.zst|\.gz)?$")
+
+
+def default_compression():
+    """'zst' si el paquete zstandard está instalado, si no 'gz'"""
+    return "zst" if zstandard is not None else "gz"
+
+
+def compress_file(path, method=None):
+    """Comprimir path a path.zst / path.gz y borrar el original. Devuelve la ruta nueva"""
+    method = method or default_compression()
+    target = f"{path}.{method}"
+    with open(path, "rb") as source, open(target, "wb") as raw:
+        if method == "zst":
+            if zstandard is None:
+                raise RuntimeError("El paquete zstandard no está instalado")
+            with zstandard.ZstdCompressor(level=3).stream_writer(raw) as writer:
+                shutil.copyfileobj(source, writer, COPY_CHUNK)
+        elif method == "gz":
+            # Nivel 6: casi el tamaño de 9 en bastante menos tiempo
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as writer:
+                shutil.copyfileobj(source, writer, COPY_CHUNK)
+        else:
+            raise ValueError(f"Compresión desconocida: {method}")
+    os.remove(path)
+    return target
+
+
+def decompress_file(path, target):
+    """Descomprimir un respaldo (.zst, .gz o sin comprimir) en target"""
+    with open(path, "rb") as raw, open(target, "wb") as out:
+        if path.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError("El paquete zstandard no está instalado")
+            with zstandard.ZstdDecompressor().stream_reader(raw) as reader:
+                shutil.copyfileobj(reader, out, COPY_CHUNK)
+        elif path.endswith(".gz"):
+            with gzip.GzipFile(fileobj=raw, mode="rb") as reader:
+                shutil.copyfileobj(reader, out, COPY_CHUNK)
+        else:
+            shutil.copyfileobj(raw, out, COPY_CHUNK)
+    return target
+
+
+def file_checksum(path):
+    """sha256 del archivo, leído de a bloques"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def inspect_database(path):
+    """
+    (resultado de PRAGMA integrity_check, {tabla: filas}, último cambio del
+    diario incluido) de una base que no está en uso
+    """
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        messages = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+        integrity = "ok" if messages == ["ok"] else "; ".join(messages[:5])
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+        row_counts = {table: conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in tables}
+        return integrity, row_counts, journal_position(conn)
+    finally:
+        conn.close()
+
+
+class BackupCatalog:
+    """
+    Registro de los respaldos de una carpeta (catalog.json): archivo, fecha,
+    tamaño, sha256, filas por tabla y resultado de la última verificación.
+
+    La rotación y la restauración se deciden con este registro, no mirando
+    las fechas de los archivos.
+    """
+
+    # Estados de un respaldo
+    PENDING = "pendiente"
+    VERIFIED = "verificado"
+    FAILED = "fallido"
+
+    # Un solo lock por proceso: el hilo de respaldo y el de verificación escriben el mismo archivo
+    _lock = threading.RLock()
+
+    def __init__(self, backup_dir):
+        self.backup_dir = backup_dir
+        self.path = os.path.join(backup_dir, CATALOG_FILE)
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f).get("backups", [])
+        except FileNotFoundError:
+            return []
+        except ValueError as e:
+            # Un catálogo ilegible no debe impedir respaldar: se reconstruye con sync()
+            print(f"Error leyendo {self.path}: {e}")
+            return []
+
+    def _save(self, entries):
+        os.makedirs(self.backup_dir, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"backups": entries}, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.path)
+
+    def entries(self, base_name=None):
+        """Respaldos registrados (de una base, si se indica), del más nuevo al más viejo"""
+        with self._lock:
+            entries = self._load()
+        if base_name:
+            entries = [entry for entry in entries if entry.get("database") == base_name]
+        # Entre dos del mismo segundo va primero el registrado después
+        return sorted(reversed(entries), key=lambda entry: entry["created_at"], reverse=True)
+
+    def file_path(self, entry):
+        return os.path.join(self.backup_dir, entry["file"])
+
+    def add(self, path, base_name, database_bytes=0, created_at=None):
+        """Registrar un respaldo recién creado (queda pendiente de verificación)"""
+        entry = {
+            "file": os.path.basename(path),
+            "database": base_name,
+            "created_at": created_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "size_bytes": os.path.getsize(path),
+            "database_bytes": database_bytes,
+            "sha256": file_checksum(path),
+            "status": self.PENDING,
+            "integrity": None,
+            "row_counts": None,
+            "verified_at": None,
+        }
+        with self._lock:
+            entries = [e for e in self._load() if e["file"] != entry["file"]]
+            entries.append(entry)
+            self._save(entries)
+        return entry
+
+    def update(self, file_name, **changes):
+        with self._lock:
+            entries = self._load()
+            for entry in entries:
+                if entry["file"] == file_name:
+                    entry.update(changes)
+                    self._save(entries)
+                    return entry
+        return None
+
+    def remove(self, file_name):
+        with self._lock:
+            self._save([entry for entry in self._load() if entry["file"] != file_name])
+
+    def sync(self, base_name=None):
+        """
+        Poner el catálogo al día con la carpeta: registrar respaldos que no
+        estén (de versiones anteriores o copiados a mano) y olvidar los que
+        ya no existen. Devuelve la cantidad de archivos agregados.
+        """
+        if not os.path.isdir(self.backup_dir):
+            return 0
+        with self._lock:
+            entries = [entry for entry in self._load() if os.path.exists(self.file_path(entry))]
+            known = {entry["file"] for entry in entries}
+            self._save(entries)
+        added = 0
+        for f in sorted(os.listdir(self.backup_dir)):
+            if f in known or not (f.startswith(BACKUP_PREFIX) and f.endswith(BACKUP_SUFFIXES)):
+                continue
+            match = BACKUP_NAME.match(f)
+            if not match or (base_name and match.group("base") != base_name):
+                continue
+            created_at = datetime.strptime(match.group("timestamp"), "%Y%m%d_%H%M%S")
+            self.add(os.path.join(self.backup_dir, f), match.group("base"),
+                     created_at=created_at.strftime("%Y-%m-%d %H:%M:%S"))
+            added += 1
+        return added
+
+    def verify(self, entry):
+        """
+        Comprobar que un respaldo se puede restaurar: mismo sha256 que al
+        crearlo, se descomprime, pasa PRAGMA integrity_check y tiene las mismas
+        filas por tabla que la vez anterior. Devuelve la entrada actualizada.
+        """
+        path = self.file_path(entry)
+        temp_path = f"{path}.verificando"
+        try:
+            if file_checksum(path) != entry["sha256"]:
+                raise ValueError("el sha256 no coincide: el archivo cambió desde que se creó")
+            decompress_file(path, temp_path)
+            integrity, row_counts, journal_seq = inspect_database(temp_path)
+            if integrity != "ok":
+                raise ValueError(f"integrity_check: {integrity}")
+            if entry.get("row_counts") and entry["row_counts"] != row_counts:
+                raise ValueError("las filas por tabla no coinciden con la verificación anterior")
+            changes = {"status": self.VERIFIED, "integrity": integrity, "row_counts": row_counts,
+                       "journal_seq": journal_seq}
+        except Exception as e:
+            changes = {"status": self.FAILED, "integrity": str(e)}
+            print(f"❌ Respaldo {entry['file']} no verificado: {e}")
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        changes["verified_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return self.update(entry["file"], **changes) or dict(entry, **changes)
+
+    def verify_all(self, base_name=None, only_pending=True):
+        """Verificar los respaldos pendientes (o todos); devuelve las entradas verificadas"""
+        return [self.verify(entry) for entry in self.entries(base_name)
+                if not only_pending or entry["status"] == self.PENDING]
+
+    def latest_verified(self, base_name=None):
+        for entry in self.entries(base_name):
+            if entry["status"] == self.VERIFIED:
+                return entry
+        return None
+
+    def prune(self, max_backups=DEFAULT_MAX_BACKUPS, base_name=None):
+        """
+        Dejar los max_backups respaldos más nuevos. El último verificado se
+        conserva aunque quede fuera del límite: si los nuevos fallan, sigue
+        habiendo uno para restaurar.
+        """
+        entries = self.entries(base_name)
+        latest_verified = self.latest_verified(base_name)
+        for entry in entries[max_backups:]:
+            if latest_verified and entry["file"] == latest_verified["file"]:
+                continue
+            try:
+                path = self.file_path(entry)
+                if os.path.exists(path):
+                    os.remove(path)
+                self.remove(entry["file"])
+                print(f"🗑️ Backup antiguo eliminado: {path}")
+            except Exception as e:
+                print(f"Error limpiando backups: {e}")
+
+        # Los segmentos del diario hacen falta desde el respaldo más viejo que queda
+        remaining = self.entries(base_name)
+        if base_name and remaining and all(entry.get("journal_seq") is not None for entry in remaining):
+            prune_segments(journal_dir(self.backup_dir, base_name),
+                           min(entry["journal_seq"] for entry in remaining))
+
+
+def clean_old_backups(backup_dir, max_backups=DEFAULT_MAX_BACKUPS, base_name=None):
+    """Dejar solo los max_backups respaldos más nuevos de la carpeta (según el catálogo)"""
+    catalog = BackupCatalog(backup_dir)
+    catalog.sync(base_name)
+    catalog.prune(max_backups, base_name)
+
+
+def restore_latest_backup(db_name, backup_dir=None):
+    """
+    Reemplazar la base por el respaldo verificado más nuevo más los cambios
+    del diario enviados después de él. La base no debe estar abierta por la
+    aplicación. El respaldo se vuelve a comprobar, se descomprime junto a la
+    base y se le aplica el diario; recién entonces se cambia de un solo paso
+    (os.replace), así nunca queda una base a medio escribir. La base anterior
+    se guarda como <base>.antes_de_restaurar. Devuelve la entrada restaurada,
+    con la cantidad de cambios del diario aplicados en "journal_changes".
+
+    Si un respaldo no se puede descomprimir o aplicarle el diario, queda
+    marcado como fallido y se prueba con el anterior. Si falta un tramo del
+    diario no se sigue: los respaldos anteriores necesitan ese mismo tramo.
+    """
+    db_path = os.path.abspath(db_name)
+    backup_dir = backup_dir or os.path.join(os.path.dirname(db_path), DEFAULT_BACKUP_DIR)
+    base_name = os.path.splitext(os.path.basename(db_path))[0]
+    catalog = BackupCatalog(backup_dir)
+    catalog.sync(base_name)
+    temp_path = f"{db_path}.restaurando"
+    journal_directory = journal_dir(backup_dir, base_name)
+
+    for entry in catalog.entries(base_name):
+        if entry["status"] != BackupCatalog.VERIFIED:
+            continue
+        # Un respaldo verificado hace tiempo pudo dañarse después
+        entry = catalog.verify(entry)
+        if entry["status"] != BackupCatalog.VERIFIED:
+            continue
+        try:
+            try:
+                decompress_file(catalog.file_path(entry), temp_path)
+                changes = replay_journal(temp_path, journal_directory)
+            except JournalGapError as e:
+                raise JournalGapError(f"{e} en {journal_directory}: restaurar {entry['file']} sin esos "
+                                      f"cambios perdería ventas; recupere los segmentos que faltan") from e
+            except Exception as e:
+                catalog.update(entry["file"], status=BackupCatalog.FAILED, integrity=f"no se pudo restaurar: {e}",
+                               verified_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                print(f"❌ Respaldo {entry['file']} no se pudo restaurar: {e}")
+                continue
+            if os.path.exists(db_path):
+                _release_database(db_path)
+                shutil.copy2(db_path, f"{db_path}.antes_de_restaurar")
+            os.replace(temp_path, db_path)
+            return dict(entry, journal_changes=changes)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    raise RuntimeError(f"No hay respaldos verificados de {base_name} en {backup_dir}")
+
+
+def _release_database(db_path):
+    """
+    Volcar el WAL de la base actual y dejarla en un único archivo: un -wal
+    viejo junto al respaldo restaurado se aplicaría sobre él. Cambiar el modo
+    de journal falla si otra conexión la tiene abierta.
+    """
+    in_use = "la base está abierta por otro programa; cierre el POS antes de restaurar"
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=1)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if conn.execute("PRAGMA journal_mode = DELETE").fetchone()[0].lower() != "delete":
+            raise RuntimeError(in_use)
+    except sqlite3.OperationalError:
+        raise RuntimeError(in_use)
+    finally:
+        conn.close()
+
+
+class BackupJob:
+    """Estado de una copia: progreso mientras corre, y archivo o error al terminar"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.path = None
+        self.error = None
+        self.pages_total = 0
+        self.pages_remaining = 0
+        self.steps = 0
+        self.restarts = 0
+        self.snapshot = False
+        self.database_bytes = 0
+        self.compressed_bytes = 0
+        self.copy_seconds = 0.0
+        self.compress_seconds = 0.0
+        self.verify_seconds = 0.0
+        # Entrada del catálogo, con el resultado de la verificación
+        self.entry = None
+
+    @property
+    def progress(self):
+        """Fracción copiada (0 a 1)"""
+        if not self.pages_total:
+            return 1.0 if self.done.is_set() else 0.0
+        return (self.pages_total - self.pages_remaining) / self.pages_total
+
+    @property
+    def ok(self):
+        return self.done.is_set() and self.error is None
+
+    @property
+    def verified(self):
+        return self.ok and self.entry is not None and self.entry["status"] == BackupCatalog.VERIFIED
+
+    def wait(self, timeout=None):
+        """Esperar a que termine; devuelve True si terminó"""
+        return self.done.wait(timeout)
+
+
+class BackupService:
+    """
+    Respaldos en segundo plano de una base SQLite (de a uno por vez).
+
+    Usa su propia conexión de lectura, independiente de las de Database, así
+    que puede correr mientras la aplicación sigue vendiendo.
+    """
+
+    def __init__(self, db_name, backup_dir=None, max_backups=DEFAULT_MAX_BACKUPS,
+                 pages=DEFAULT_PAGES_PER_STEP, sleep=DEFAULT_STEP_SLEEP, compression=None,
+                 busy_timeout_ms=5000):
+        self.db_name = db_name
+        self.base_name = os.path.splitext(os.path.basename(db_name))[0]
+        # Por defecto junto a la base, como los archivos de ventas antiguas
+        self.backup_dir = backup_dir or os.path.join(
+            os.path.dirname(os.path.abspath(db_name)), DEFAULT_BACKUP_DIR)
+        self.max_backups = max_backups
+        self.pages = pages
+        self.sleep = sleep
+        self.compression = compression or default_compression()
+        self.busy_timeout_ms = busy_timeout_ms
+        self.catalog = BackupCatalog(self.backup_dir)
+        self._lock = threading.Lock()
+        self._job = None
+        self._thread = None
+        self._verify_thread = None
+
+    def start(self, on_finished=None):
+        """
+        Lanzar un respaldo en un hilo aparte y devolver su BackupJob. Si ya hay
+        uno en curso se devuelve ese. on_finished(job) se llama desde el hilo del
+        respaldo al terminar (con error o sin él).
+        """
+        with self._lock:
+            if self._job is not None and not self._job.done.is_set():
+                return self._job
+            job = BackupJob()
+            self._job = job
+            # No es daemon: si se cierra la aplicación, la copia termina antes de salir
+            self._thread = threading.Thread(target=self._run, args=(job, on_finished),
+                                            name="pos-backup")
+            self._thread.start()
+            return job
+
+    def backup_now(self):
+        """Respaldo en el hilo actual (para scripts); devuelve el BackupJob terminado"""
+        job = BackupJob()
+        self._run(job)
+        return job
+
+    def start_if_due(self, max_age_hours=24, on_finished=None):
+        """Lanzar un respaldo si el último verificado tiene más de max_age_hours (o no hay ninguno)"""
+        latest = self.catalog.latest_verified(self.base_name)
+        if latest is not None:
+            age = datetime.now() - datetime.strptime(latest["created_at"], "%Y-%m-%d %H:%M:%S")
+            if age.total_seconds() < max_age_hours * 3600:
+                return None
+        return self.start(on_finished)
+
+    def start_verification(self, only_pending=True, on_finished=None):
+        """
+        Verificar en un hilo aparte los respaldos del catálogo (los pendientes,
+        o todos). on_finished(entradas) se llama desde ese hilo al terminar.
+        """
+        def run():
+            entries = []
+            try:
+                self.catalog.sync(self.base_name)
+                entries = self.catalog.verify_all(self.base_name, only_pending)
+            except Exception as e:
+                print(f"Error verificando backups: {e}")
+            finally:
+                if on_finished:
+                    on_finished(entries)
+
+        with self._lock:
+            if self._verify_thread is not None and self._verify_thread.is_alive():
+                return self._verify_thread
+            self._verify_thread = threading.Thread(target=run, name="pos-backup-verify")
+            self._verify_thread.start()
+            return self._verify_thread
+
+    def current_job(self):
+        return self._job
+
+    def wait(self, timeout=None):
+        """Esperar al respaldo en curso, si lo hay"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self, job, on_finished=None):
+        target = None
+        try:
+            os.makedirs(self.backup_dir, exist_ok=True)
+            target = self._target_path()
+            started = time.perf_counter()
+            self._copy(job, f"{target}.part")
+            os.replace(f"{target}.part", target)
+            job.database_bytes = os.path.getsize(target)
+            job.copy_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            job.path = compress_file(target, self.compression)
+            job.compressed_bytes = os.path.getsize(job.path)
+            job.compress_seconds = time.perf_counter() - started
+
+            # Se verifica el archivo comprimido, que es lo que se va a restaurar
+            started = time.perf_counter()
+            entry = self.catalog.add(job.path, self.base_name, job.database_bytes)
+            job.entry = self.catalog.verify(entry)
+            job.verify_seconds = time.perf_counter() - started
+
+            print(f"Backup creado exitosamente en: {job.path} ({job.entry['status']})")
+            self.catalog.prune(self.max_backups, self.base_name)
+        except Exception as e:
+            job.error = str(e)
+            print(f"Error en backup: {e}")
+            for leftover in (f"{target}.part", target, f"{target}.{self.compression}") if target else ():
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+        finally:
+            job.done.set()
+            if on_finished:
+                on_finished(job)
+
+    def _target_path(self):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base_name = self.base_name
+        target = os.path.join(self.backup_dir, f"{BACKUP_PREFIX}{timestamp}_{base_name}.db")
+        counter = 1
+        # Dos respaldos en el mismo segundo no se pisan
+        while any(os.path.exists(f"{target}{suffix}") for suffix in ("", ".zst", ".gz")):
+            target = os.path.join(self.backup_dir, f"{BACKUP_PREFIX}{timestamp}_{counter}_{base_name}.db")
+            counter += 1
+        return target
+
+    def _copy(self, job, target):
+        source = sqlite3.connect(self.db_name, isolation_level=None, timeout=self.busy_timeout_ms / 1000)
+        copy = sqlite3.connect(target, isolation_level=None)
+        try:
+            wal = source.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+            pages = self.pages
+            if wal:
+                # Una lectura abierta fija la foto de la base; las escrituras siguen en el WAL
+                source.execute("BEGIN")
+                source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                job.snapshot = True
+            else:
+                # Sin WAL, cada escritura entre tramos reiniciaría la copia: se hace de un paso
+                pages = -1
+
+            def on_progress(status, remaining, total):
+                if remaining > job.pages_remaining and job.steps:
+                    job.restarts += 1
+                job.pages_total = total
+                job.pages_remaining = remaining
+                job.steps += 1
+
+            source.backup(copy, pages=pages, progress=on_progress, sleep=self.sleep)
+            # La copia queda como un único archivo, sin -wal ni -shm
+            copy.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            if source.in_transaction:
+                source.execute("COMMIT")
+            source.close()
+            copy.close()
+
+
+def backup_command(args):
+    """Crear un respaldo comprimido y verificarlo"""
+    service = BackupService(args.base, backup_dir=args.carpeta, max_backups=args.maximo,
+                            compression=args.compresion)
+    job = service.backup_now()
+    if not job.verified:
+        sys.exit(1)
+    print(f"{job.database_bytes / 1024 / 1024:.1f} MB copiados en {job.copy_seconds:.1f} s "
+          f"({job.steps} tramos), comprimidos a {job.compressed_bytes / 1024 / 1024:.1f} MB "
+          f"en {job.compress_seconds:.1f} s, verificados en {job.verify_seconds:.1f} s")
+
+
+def verify_command(args):
+    """Verificar los respaldos pendientes del catálogo (o todos con --todos)"""
+    service = BackupService(args.base, backup_dir=args.carpeta)
+    added = service.catalog.sync(service.base_name)
+    if added:
+        print(f"{added} respaldos agregados al catálogo")
+    entries = service.catalog.verify_all(service.base_name, only_pending=not args.todos)
+    for entry in entries:
+        print(f"{entry['file']}: {entry['status']}")
+    if any(entry["status"] != BackupCatalog.VERIFIED for entry in entries):
+        sys.exit(1)
+
+
+def list_command(args):
+    """Listar los respaldos del catálogo, del más nuevo al más viejo"""
+    service = BackupService(args.base, backup_dir=args.carpeta)
+    service.catalog.sync(service.base_name)
+    for entry in service.catalog.entries(service.base_name):
+        rows = sum((entry["row_counts"] or {}).values())
+        print(f"{entry['created_at']}  {entry['status']:<10} {entry['size_bytes'] / 1024 / 1024:>8.1f} MB "
+              f"{rows:>10} filas  {entry['file']}")
+
+
+def restore_command(args):
+    """Reemplazar la base por el respaldo verificado más nuevo"""
+    try:
+        entry = restore_latest_backup(args.base, args.carpeta)
+    except Exception as e:
+        print(f"❌ No se pudo restaurar: {e}")
+        sys.exit(1)
+    print(f"✅ {args.base} restaurada desde {entry['file']} ({entry['created_at']}) "
+          f"más {entry['journal_changes']} cambios del diario")
+    print(f"La base anterior quedó en {args.base}.antes_de_restaurar")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Respaldos de la base: crear, verificar, listar y restaurar")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    commands = (
+        ("respaldar", backup_command),
+        ("verificar", verify_command),
+        ("listar", list_command),
+        ("restaurar", restore_command),
+    )
+    for name, func in commands:
+        command_parser = subparsers.add_parser(name, help=func.__doc__)
+        command_parser.add_argument("--base", default="kiosco_pos.db")
+        command_parser.add_argument("--carpeta", default=None,
+                                    help="carpeta de respaldos (por defecto backups/ junto a la base)")
+        command_parser.set_defaults(func=func)
+        if name == "respaldar":
+            command_parser.add_argument("--maximo", type=int, default=DEFAULT_MAX_BACKUPS,
+                                        help="respaldos a conservar")
+            command_parser.add_argument("--compresion", choices=("zst", "gz"), default=None)
+        elif name == "verificar":
+            command_parser.add_argument("--todos", action="store_true",
+                                        help="volver a verificar también los ya verificados")
+
+    args = parser.parse_args()
+    if args.func is not restore_command and not os.path.exists(args.base):
+        print(f"❌ No existe {args.base}")
+        sys.exit(1)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+"""
+Catálogo de productos en memoria, compartido por todos los módulos.
+
+Cada Database tiene uno (db.catalog). Carga los productos una sola vez y los
+guarda por columnas: arrays de números para id, precios (en centavos, como
+la base) y stock, listas de textos para código y nombre, y la categoría como número de una lista de
+nombres (cada nombre de categoría se guarda una vez). Las grillas de Ventas y
+Productos no copian los productos: leen las filas del catálogo
+(widgets/product_table.py).
+
+Índices: por id, por código, por categoría, el orden por nombre y el índice de
+búsqueda (utils/search_index.py).
+
+Después de escribir (una venta, un alta, una baja) refresh() trae solo los
+productos que cambiaron (Database.get_product_changes) y avisa a los que
+escuchan (add_listener). Un cambio de precio o de stock avisa solo esas
+posiciones. Un alta, una baja o un cambio de nombre, código o categoría mueve
+posiciones u orden y se avisa como reset, aunque los índices se corrigen
+fila por fila, sin recargar el catálogo.
+"""
+from array import array
+from collections import namedtuple
+
+from utils.money import Money
+from utils.search_index import SearchIndex
+
+# Aviso a los que escuchan. reset: cambiaron posiciones u orden (altas, bajas,
+# nombre, código o categoría). Si no, updated son las posiciones con otro precio o stock.
+CatalogChange = namedtuple('CatalogChange', 'reset updated')
+
+# Número de categoría de los productos sin categoría
+NO_CATEGORY = -1
+
+# min_stock NULL en la base (los arrays solo guardan números)
+NO_MIN_STOCK = -1
+
+
+class CatalogService:
+    """
+    Productos de la base en columnas. La posición de un producto (slot) es
+    la fila de las grillas; product(slot) arma la tupla con las mismas
+    columnas que Database.get_products.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.listeners = []
+        # Versión del catálogo de la última lectura (None = sin cargar)
+        self.version = None
+        self._categories = None
+        self._clear()
+
+    def _clear(self):
+        self.ids = array('q')
+        self.codes = []
+        self.names = []
+        self.categories = array('l')
+        # Centavos enteros: Money.from_cents al leerlos (product)
+        self.buy_prices = array('q')
+        self.sell_prices = array('q')
+        self.stocks = array('q')
+        self.min_stocks = array('q')
+        self.category_names = []
+        self._category_numbers = {}
+        self.by_id = {}
+        self.by_code = {}
+        self.by_category = {}
+        self.search_index = SearchIndex()
+        self._name_order = None
+
+    def _columns(self):
+        return (self.ids, self.codes, self.names, self.categories, self.buy_prices,
+                self.sell_prices, self.stocks, self.min_stocks)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def loaded(self):
+        return self.version is not None
+
+    def add_listener(self, listener):
+        """listener(CatalogChange) después de cada carga o cambio"""
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def _notify(self, change):
+        for listener in list(self.listeners):
+            listener(change)
+
+    # ===== CARGA Y CAMBIOS =====
+
+    @staticmethod
+    def fetch(db):
+        """Lectura para load(): (versión, filas de get_products). Se puede hacer en otro hilo."""
+        # La versión se lee antes que los productos: lo que cambie entre las
+        # dos consultas vuelve a llegar en el próximo refresh()
+        return db.get_catalog_version(), db.get_products()
+
+    def load(self, snapshot=None):
+        """Cargar todo el catálogo (de snapshot, si ya se leyó con fetch)"""
+        version, rows = snapshot if snapshot is not None else self.fetch(self.db)
+        self._clear()
+        for row in rows:
+            self._append(row)
+        self.search_index.set_texts(self.search_text(slot) for slot in range(len(self)))
+        self.version = version
+        self._notify(CatalogChange(True, ()))
+
+    def ensure_loaded(self):
+        if self.version is None:
+            self.load()
+
+    def refresh(self):
+        """
+        Aplicar los cambios de la base desde la última lectura (o cargar, si
+        no se cargó). Devuelve el CatalogChange avisado, o None si no hubo cambios.
+        """
+        if self.version is None:
+            self.load()
+            return CatalogChange(True, ())
+
+        version, changed, deleted_ids = self.db.get_product_changes(self.version)
+        self.version = version
+
+        reset = False
+        updated = []
+        # Primero las bajas: mueven el último producto a la posición que queda libre
+        for product_id in deleted_ids:
+            slot = self.by_id.get(product_id)
+            if slot is not None:
+                self._remove(slot)
+                reset = True
+        for row in changed:
+            slot = self.by_id.get(row[0])
+            if slot is None:
+                self._append(row)
+                self.search_index.append(self.search_text(len(self) - 1))
+                reset = True
+                continue
+            moved = self._update(slot, row)
+            if moved:
+                reset = True
+            elif moved is not None:
+                updated.append(slot)
+
+        if not reset and not updated:
+            return None
+        change = CatalogChange(True, ()) if reset else CatalogChange(False, updated)
+        self._notify(change)
+        return change
+
+    def _category_number(self, name):
+        if name is None:
+            return NO_CATEGORY
+        number = self._category_numbers.get(name)
+        if number is None:
+            number = self._category_numbers[name] = len(self.category_names)
+            self.category_names.append(name)
+        return number
+
+    def _append(self, row):
+        product_id, code, name, category, buy_price, sell_price, stock, min_stock = row
+        slot = len(self.ids)
+        self.ids.append(product_id)
+        self.codes.append(code)
+        self.names.append(name)
+        number = self._category_number(category)
+        self.categories.append(number)
+        self.buy_prices.append(Money.to_cents(buy_price))
+        self.sell_prices.append(Money.to_cents(sell_price))
+        self.stocks.append(stock or 0)
+        self.min_stocks.append(NO_MIN_STOCK if min_stock is None else min_stock)
+        self.by_id[product_id] = slot
+        if code:
+            self.by_code[code] = slot
+        self.by_category.setdefault(number, set()).add(slot)
+        self._name_order = None
+
+    def _update(self, slot, row):
+        """
+        Escribir una fila sobre un producto existente. Devuelve None si no
+        cambió nada, True si cambió nombre, código o categoría (índices y
+        orden) y False si cambiaron solo precios o stock.
+        """
+        product_id, code, name, category, buy_price, sell_price, stock, min_stock = row
+        buy_cents, sell_cents = Money.to_cents(buy_price), Money.to_cents(sell_price)
+        if self.product(slot) == (product_id, code, name, category, Money(buy_cents), Money(sell_cents),
+                                  stock or 0, min_stock):
+            return None
+        self.buy_prices[slot] = buy_cents
+        self.sell_prices[slot] = sell_cents
+        self.stocks[slot] = stock or 0
+        self.min_stocks[slot] = NO_MIN_STOCK if min_stock is None else min_stock
+
+        moved = False
+        if code != self.codes[slot]:
+            if self.by_code.get(self.codes[slot]) == slot:
+                del self.by_code[self.codes[slot]]
+            if code:
+                self.by_code[code] = slot
+            self.codes[slot] = code
+            moved = True
+        if name != self.names[slot]:
+            self.names[slot] = name
+            self._name_order = None
+            moved = True
+        number = self._category_number(category)
+        if number != self.categories[slot]:
+            self.by_category[self.categories[slot]].discard(slot)
+            self.by_category.setdefault(number, set()).add(slot)
+            self.categories[slot] = number
+            moved = True
+        if moved:
+            self.search_index.set_text(slot, self.search_text(slot))
+        return moved
+
+    def _remove(self, slot):
+        """Quitar un producto: el último pasa a su posición, así no se corre ningún otro"""
+        last = len(self.ids) - 1
+        del self.by_id[self.ids[slot]]
+        if self.by_code.get(self.codes[slot]) == slot:
+            del self.by_code[self.codes[slot]]
+        self.by_category[self.categories[slot]].discard(slot)
+
+        if slot != last:
+            for column in self._columns():
+                column[slot] = column[last]
+            self.by_id[self.ids[slot]] = slot
+            if self.codes[slot]:
+                self.by_code[self.codes[slot]] = slot
+            moved_category = self.by_category[self.categories[slot]]
+            moved_category.discard(last)
+            moved_category.add(slot)
+            self.search_index.set_text(slot, self.search_text(slot))
+        for column in self._columns():
+            column.pop()
+        self.search_index.pop()
+        self._name_order = None
+
+    # ===== CONSULTAS =====
+
+    def product(self, slot):
+        """
+        (id, código, nombre, categoría, compra, venta, stock, stock mínimo), como
+        get_products pero con los precios en Money
+        """
+        category = self.categories[slot]
+        min_stock = self.min_stocks[slot]
+        return (self.ids[slot], self.codes[slot], self.names[slot],
+                None if category == NO_CATEGORY else self.category_names[category],
+                Money.from_cents(self.buy_prices[slot]), Money.from_cents(self.sell_prices[slot]), self.stocks[slot],
+                None if min_stock == NO_MIN_STOCK else min_stock)
+
+    def search_text(self, slot):
+        """Texto que se indexa para la búsqueda: nombre y código"""
+        return f"{self.names[slot]} {self.codes[slot] or ''}"
+
+    def slot_of(self, product_id):
+        return self.by_id.get(product_id)
+
+    def find_by_code(self, code):
+        """
+        Posición del producto con ese código. Si no está (por ejemplo, se dio
+        de alta desde otra conexión y todavía no se refrescó) se busca en la
+        base y, si existe, se aplican los cambios pendientes.
+        """
+        slot = self.by_code.get(code)
+        if slot is not None:
+            return slot
+        row = self.db.get_product_by_code(code)
+        if row is None:
+            return None
+        self.refresh()
+        return self.by_id.get(row[0])
+
+    def category_slots(self, name):
+        """Posiciones de los productos de una categoría (no modificar)"""
+        number = self._category_numbers.get(name)
+        return self.by_category.get(number, set()) if number is not None else set()
+
+    def name_order(self):
+        """
+        Posiciones ordenadas por nombre, como get_products (se arma de nuevo
+        solo si cambió). Recién cargado el catálogo ya está en ese orden y es
+        un range: ordenar filas es ordenar números.
+        """
+        if self._name_order is None:
+            names = self.names
+            if all(names[slot] <= names[slot + 1] for slot in range(len(names) - 1)):
+                self._name_order = range(len(names))
+            else:
+                self._name_order = sorted(range(len(names)), key=names.__getitem__)
+        return self._name_order
+
+    # ===== CATEGORÍAS =====
+
+    def get_categories(self):
+        """Categorías de la base (id, nombre, descripción), leídas una vez"""
+        if self._categories is None:
+            self._categories = self.db.get_categories()
+        return self._categories
+
+    def invalidate_categories(self):
+        """Volver a leer las categorías en el próximo get_categories (Database lo llama al agregar o borrar)"""
+        self._categories = None
+
+    # ===== ESCRITURAS (pasan por la base y actualizan solo lo que cambió) =====
+
+    def add_category(self, name, description=""):
+        return self.db.add_category(name, description)
+
+    def delete_category(self, category_id):
+        return self.db.delete_category(category_id)
+
+    def add_product(self, product_data):
+        result = self.db.add_product(product_data)
+        self.refresh()
+        return result
+
+    def update_product_stock(self, product_id, new_stock):
+        self.db.update_product_stock(product_id, new_stock)
+        self.refresh()
+
+    def delete_product(self, product_id):
+        result = self.db.delete_product(product_id)
+        self.refresh()
+        return result
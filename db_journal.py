@@ -0,0 +1,341 @@
+"""
+Diario de cambios: respaldo continuo entre copias completas.
+
+Triggers sobre las tablas de JOURNALED_TABLES guardan en change_journal cada
+fila insertada, modificada (con su contenido nuevo) o borrada. Database los
+envía de a segmentos comprimidos a backups/journal_<base>/ y los borra de la
+base (ship_change_journal). Para reconstruir, se parte de un respaldo completo
+y se aplican los segmentos posteriores a él: el respaldo sabe hasta qué cambio
+incluye porque lleva su propio sqlite_sequence de change_journal.
+
+Las tablas de resumen (sales_daily, product_sales_daily, inventory_stats, ...)
+no se registran: al aplicar los cambios, sus triggers las recalculan igual que
+en la base original.
+
+Uso:
+    python db_journal.py enviar [--base kiosco_pos.db]
+    python db_journal.py reconstruir respaldo.db.gz salida.db [--diario backups/journal_kiosco_pos]
+    python db_journal.py comparar a.db b.db
+"""
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+
+# Tablas con datos que no se pueden recalcular a partir de otras
+JOURNALED_TABLES = ('sales', 'sale_items', 'products', 'customers', 'credit_payments',
+                    'cash_opens', 'cash_closes', 'categories', 'sales_archives')
+
+# Operaciones del diario: alta, modificación, baja y archivo de un mes de ventas
+OP_INSERT = 'I'
+OP_UPDATE = 'U'
+OP_DELETE = 'D'
+OP_ARCHIVE = 'A'
+
+JOURNAL_TRIGGER_PREFIX = 'trg_journal_'
+SEGMENT_NAME = re.compile(r"^journal_(?P<first>\d+)_(?P<last>\d+)\.jsonl\.gz$")
+
+
+class JournalGapError(RuntimeError):
+    """Faltan segmentos del diario entre un respaldo y los cambios siguientes"""
+
+
+def journal_dir(backup_dir, base_name):
+    """Carpeta de los segmentos de una base, dentro de la carpeta de respaldos"""
+    return os.path.join(backup_dir, f"journal_{base_name}")
+
+
+# ===== ESQUEMA =====
+
+def create_change_journal(cursor):
+    """Tabla change_journal y sus triggers (dentro de la transacción de la migración)"""
+    # AUTOINCREMENT: seq nunca se reutiliza aunque el diario se vacíe al enviarlo
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_journal (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            op TEXT NOT NULL,
+            row_id INTEGER,
+            row_data TEXT
+        )
+    ''')
+    create_journal_triggers(cursor)
+
+
+def create_journal_triggers(cursor):
+    """
+    (Re)crear los triggers del diario con las columnas actuales de cada tabla.
+    Una migración que agregue columnas a una tabla registrada tiene que volver
+    a llamarla.
+    """
+    for table in JOURNALED_TABLES:
+        cursor.execute(f'PRAGMA table_info("{table}")')
+        columns = [row[1] for row in cursor.fetchall()]
+        if not columns:
+            continue
+        # json_object conserva enteros, texto y NULL tal cual (los importes son centavos enteros)
+        row_image = "json_object({})".format(', '.join(f"'{column}', NEW.\"{column}\"" for column in columns))
+        triggers = (
+            ('insert', 'INSERT', OP_INSERT, 'NEW.rowid', row_image),
+            ('update', 'UPDATE', OP_UPDATE, 'OLD.rowid', row_image),
+            ('delete', 'DELETE', OP_DELETE, 'OLD.rowid', 'NULL'),
+        )
+        for suffix, event, op, row_id, row_data in triggers:
+            name = f"{JOURNAL_TRIGGER_PREFIX}{table}_{suffix}"
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'''
+                CREATE TRIGGER {name} AFTER {event} ON {table} BEGIN
+                    INSERT INTO change_journal (table_name, op, row_id, row_data)
+                    VALUES ('{table}', '{op}', {row_id}, {row_data});
+                END
+            ''')
+
+
+def journal_archived_month(cursor, month_start, month_end):
+    """
+    Registrar que las ventas del mes salieron de la base viva hacia su archivo.
+    El archivo borra sin los triggers de borrado (los resúmenes no cambian), así
+    que no quedan bajas individuales: al reconstruir se repite el mismo borrado.
+    """
+    cursor.execute('''
+        INSERT INTO change_journal (table_name, op, row_data)
+        VALUES ('sales', ?, json_object('start', ?, 'end', ?))
+    ''', (OP_ARCHIVE, month_start, month_end))
+
+
+def journal_position(conn):
+    """Último seq asignado en el diario de esta base (0 si nunca registró cambios)"""
+    try:
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_journal'").fetchone()
+    except sqlite3.OperationalError:
+        # Base anterior al diario: no existe sqlite_sequence
+        return 0
+    return row[0] if row else 0
+
+
+# ===== SEGMENTOS =====
+
+def write_segment(directory, rows):
+    """
+    Escribir [(seq, tabla, op, row_id, row_data)] como journal_<primero>_<último>.jsonl.gz.
+    Se escribe a un temporal y se renombra: un segmento existe completo o no existe.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"journal_{rows[0][0]:012d}_{rows[-1][0]:012d}.jsonl.gz")
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as segment:
+            for row in rows:
+                segment.write(json.dumps(row, ensure_ascii=False).encode("utf-8") + b"\n")
+        raw.flush()
+        # Recién con el segmento en disco se pueden borrar esos cambios de la base
+        os.fsync(raw.fileno())
+    os.replace(temp_path, path)
+    return path
+
+
+def list_segments(directory):
+    """[(primer seq, último seq, ruta)] de los segmentos de la carpeta, en orden"""
+    segments = []
+    for path in glob.glob(os.path.join(glob.escape(directory), "journal_*.jsonl.gz")):
+        match = SEGMENT_NAME.match(os.path.basename(path))
+        if match:
+            segments.append((int(match.group("first")), int(match.group("last")), path))
+    return sorted(segments)
+
+
+def read_segment(path):
+    with gzip.open(path, "rt", encoding="utf-8") as segment:
+        for line in segment:
+            yield json.loads(line)
+
+
+def prune_segments(directory, up_to_seq):
+    """Borrar los segmentos que ya están incluidos en un respaldo completo (último seq <= up_to_seq)"""
+    removed = 0
+    for first, last, path in list_segments(directory):
+        if last <= up_to_seq:
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+# ===== RECONSTRUCCIÓN =====
+
+def _drop_triggers(conn, condition):
+    """Borrar los triggers que cumplen la condición; devuelve su SQL para recrearlos"""
+    triggers = conn.execute(f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND {condition}").fetchall()
+    for name, _ in triggers:
+        conn.execute(f'DROP TRIGGER "{name}"')
+    return [sql for _, sql in triggers]
+
+
+def _apply_change(conn, table, op, row_id, row_data):
+    if op == OP_INSERT:
+        row = json.loads(row_data)
+        columns = ', '.join(f'"{column}"' for column in row)
+        conn.execute(f'INSERT INTO "{table}" ({columns}) VALUES ({", ".join("?" * len(row))})',
+                     list(row.values()))
+    elif op == OP_UPDATE:
+        row = json.loads(row_data)
+        assignments = ', '.join(f'"{column}" = ?' for column in row)
+        conn.execute(f'UPDATE "{table}" SET {assignments} WHERE rowid = ?', list(row.values()) + [row_id])
+    elif op == OP_DELETE:
+        conn.execute(f'DELETE FROM "{table}" WHERE rowid = ?', (row_id,))
+    elif op == OP_ARCHIVE:
+        # El mismo borrado que Database._archive_month: sin triggers de borrado
+        month = json.loads(row_data)
+        month = (month['start'], month['end'])
+        triggers = _drop_triggers(conn, "tbl_name IN ('sales', 'sale_items') AND sql LIKE '%DELETE ON%'")
+        conn.execute('''
+            DELETE FROM sale_items WHERE sale_id IN (
+                SELECT id FROM sales WHERE created_at >= ? AND created_at < ?
+            )
+        ''', month)
+        conn.execute('DELETE FROM sales WHERE created_at >= ? AND created_at < ?', month)
+        for sql in triggers:
+            conn.execute(sql)
+    else:
+        raise ValueError(f"Operación desconocida en el diario: {op}")
+
+
+def replay_journal(db_path, directory):
+    """
+    Aplicar a la base db_path (un respaldo completo ya descomprimido) los
+    cambios de los segmentos posteriores a ella, en una sola transacción.
+    Devuelve la cantidad de cambios aplicados. Falla sin tocar la base si
+    falta un segmento en el medio.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        start = journal_position(conn)
+        segments = [segment for segment in list_segments(directory) if segment[1] > start]
+        if not segments:
+            return 0
+
+        applied = start
+        changes = 0
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Lo que se aplica ya está en el diario: no se vuelve a registrar
+            journal_triggers = _drop_triggers(conn, f"name LIKE '{JOURNAL_TRIGGER_PREFIX}%'")
+            for first, last, path in segments:
+                if first > applied + 1:
+                    raise JournalGapError(f"Falta el diario entre los cambios {applied + 1} y {first - 1}")
+                for seq, table, op, row_id, row_data in read_segment(path):
+                    # Los segmentos pueden solaparse si un envío se cortó antes de borrar lo enviado
+                    if seq <= applied:
+                        continue
+                    _apply_change(conn, table, op, row_id, row_data)
+                    applied = seq
+                    changes += 1
+
+            # La base queda como la original después del último cambio, con el diario vacío
+            conn.execute('DELETE FROM change_journal')
+            conn.execute("DELETE FROM sqlite_sequence WHERE name = 'change_journal'")
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('change_journal', ?)", (applied,))
+            for sql in journal_triggers:
+                conn.execute(sql)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return changes
+    finally:
+        conn.close()
+
+
+def table_digests(db_path):
+    """
+    {tabla: sha256} del contenido de cada tabla, ordenado por todas sus columnas.
+    repr() distingue tipos (1 y 1.0 dan distinto), así que dos bases con los
+    mismos digests tienen exactamente las mismas filas.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        digests = {}
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+        for table in tables:
+            column_count = len(conn.execute(f'PRAGMA table_info("{table}")').fetchall())
+            order = ', '.join(str(index) for index in range(1, column_count + 1))
+            digest = hashlib.sha256()
+            for row in conn.execute(f'SELECT * FROM "{table}" ORDER BY {order}'):
+                digest.update(repr(row).encode("utf-8"))
+            digests[table] = digest.hexdigest()
+        return digests
+    finally:
+        conn.close()
+
+
+# ===== LÍNEA DE COMANDOS =====
+
+def ship_command(args):
+    """Enviar ahora los cambios pendientes del diario"""
+    from database import Database
+
+    db = Database(args.base)
+    shipped = db.ship_change_journal()
+    print(f"{shipped} cambios enviados a {db.journal_dir()}")
+    db.close_connection()
+
+
+def rebuild_command(args):
+    """Reconstruir una base a partir de un respaldo completo y el diario posterior"""
+    from db_backup import BACKUP_NAME, decompress_file
+
+    if os.path.exists(args.salida):
+        print(f"❌ Ya existe {args.salida}")
+        sys.exit(1)
+    directory = args.diario
+    if directory is None:
+        match = BACKUP_NAME.match(os.path.basename(args.respaldo))
+        if not match:
+            print("❌ No se reconoce la base del respaldo; indicar --diario")
+            sys.exit(1)
+        directory = journal_dir(os.path.dirname(os.path.abspath(args.respaldo)), match.group("base"))
+    decompress_file(args.respaldo, args.salida)
+    changes = replay_journal(args.salida, directory)
+    print(f"✅ {args.salida}: respaldo {os.path.basename(args.respaldo)} + {changes} cambios del diario")
+
+
+def compare_command(args):
+    """Comparar el contenido de todas las tablas de dos bases"""
+    first, second = table_digests(args.a), table_digests(args.b)
+    different = sorted(table for table in set(first) | set(second) if first.get(table) != second.get(table))
+    if different:
+        print(f"❌ Tablas distintas: {', '.join(different)}")
+        sys.exit(1)
+    print(f"✅ Las {len(first)} tablas tienen exactamente las mismas filas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diario de cambios: enviar, reconstruir y comparar")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ship_parser = subparsers.add_parser("enviar", help=ship_command.__doc__)
+    ship_parser.add_argument("--base", default="kiosco_pos.db")
+    ship_parser.set_defaults(func=ship_command)
+
+    rebuild_parser = subparsers.add_parser("reconstruir", help=rebuild_command.__doc__)
+    rebuild_parser.add_argument("respaldo")
+    rebuild_parser.add_argument("salida")
+    rebuild_parser.add_argument("--diario", default=None,
+                                help="carpeta de segmentos (por defecto journal_<base>/ junto al respaldo)")
+    rebuild_parser.set_defaults(func=rebuild_command)
+
+    compare_parser = subparsers.add_parser("comparar", help=compare_command.__doc__)
+    compare_parser.add_argument("a")
+    compare_parser.add_argument("b")
+    compare_parser.set_defaults(func=compare_command)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Instrumentación opcional de la capa de base de datos.
+
+Se activa con la variable de entorno POS_DB_SLOW_MS (umbral en ms) o pasando
+Database(profiler=QueryProfiler(...)). Por cada método público de Database
+registra el tiempo, las filas leídas de sus cursores y las sentencias SQL
+ejecutadas (salvo los de esquema e infraestructura, ver NOT_PROFILED):
+
+- logs/db_timings.log: una línea JSON por llamada (rotativo), para el resumen.
+- logs/slow_queries.log: las llamadas que superan el umbral, con su SQL y el
+  EXPLAIN QUERY PLAN de cada consulta (rotativo).
+
+Resumen de percentiles por método:
+    python db_profiler.py [--log logs/db_timings.log]
+"""
+import argparse
+import functools
+import glob
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+DEFAULT_SLOW_MS = 100
+DEFAULT_LOG_DIR = "logs"
+TIMINGS_LOG = "db_timings.log"
+SLOW_LOG = "slow_queries.log"
+
+# Métodos de infraestructura: no son consultas o devuelven objetos que no se pueden medir así
+NOT_INSTRUMENTED = {"get_connection", "transaction", "close_connection"}
+
+# Esquema, migraciones, PRAGMAs de arranque y rutas: corren al abrir la base
+# (o a mano), no en el uso diario; medirlos mezclaría el arranque con los
+# percentiles de las consultas
+NOT_PROFILED = {
+    "init_database", "get_schema_version", "latest_schema_version", "update_schema", "apply_migrations",
+    "insert_default_categories", "rebuild_sales_daily", "rebuild_sales_hourly", "rebuild_product_sales_daily",
+    "rebuild_inventory_stats", "reset_database", "get_runtime_profile", "report_runtime_profile",
+    "archive_path", "journal_dir",
+}
+
+# Control de transacción, PRAGMA y DDL: no tienen plan de consulta
+_NO_PLAN_PREFIXES = ("BEGIN", "COMMIT", "ROLLBACK", "PRAGMA", "SAVEPOINT", "RELEASE",
+                     "CREATE", "DROP", "ALTER")
+
+
+def percentile(sorted_values, pct):
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _make_logger(name, path, max_bytes, backup_count, fmt):
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    handler.setFormatter(logging.Formatter(fmt))
+    logger.addHandler(handler)
+    return logger
+
+
+class QueryProfiler:
+    """Mide los métodos de una instancia de Database y registra los lentos"""
+
+    def __init__(self, slow_ms=DEFAULT_SLOW_MS, log_dir=DEFAULT_LOG_DIR,
+                 max_bytes=5 * 1024 * 1024, backup_count=3, explain=True):
+        self.slow_ms = float(slow_ms)
+        self.log_dir = log_dir
+        self.explain = explain
+        os.makedirs(log_dir, exist_ok=True)
+        self.timings_path = os.path.join(log_dir, TIMINGS_LOG)
+        self.slow_path = os.path.join(log_dir, SLOW_LOG)
+        self._timings_log = _make_logger(f"pos.db.timings.{id(self)}", self.timings_path,
+                                         max_bytes, backup_count, "%(message)s")
+        self._slow_log = _make_logger(f"pos.db.slow.{id(self)}", self.slow_path,
+                                      max_bytes, backup_count, "%(asctime)s %(message)s")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.timings = {}
+
+    @classmethod
+    def from_env(cls, db_name):
+        """Profiler configurado por POS_DB_SLOW_MS, o None si la variable no está definida"""
+        slow_ms = os.environ.get("POS_DB_SLOW_MS")
+        if not slow_ms:
+            return None
+        log_dir = os.environ.get("POS_DB_LOG_DIR") or os.path.join(
+            os.path.dirname(os.path.abspath(db_name)), DEFAULT_LOG_DIR)
+        return cls(slow_ms=slow_ms, log_dir=log_dir)
+
+    # ===== ENGANCHE CON DATABASE =====
+
+    def attach(self, db):
+        """Envolver los métodos públicos de la instancia (la clase no se modifica)"""
+        for name, _ in inspect.getmembers(type(db), inspect.isfunction):
+            if name.startswith("_") or name in NOT_INSTRUMENTED or name in NOT_PROFILED:
+                continue
+            setattr(db, name, self._wrap(name, getattr(db, name)))
+
+    def watch_connection(self, conn):
+        """
+        Registrar las sentencias que ejecuta una conexión (con los parámetros
+        ya expandidos) y contar las filas que leen sus cursores. El
+        row_factory que ya tenga la conexión se sigue usando para armar cada
+        fila; uno asignado después reemplaza al que cuenta.
+        """
+        conn.set_trace_callback(self._on_statement)
+        conn.row_factory = functools.partial(self._on_row, conn.row_factory)
+
+    def _active_frames(self):
+        if getattr(self._local, "explaining", False):
+            return ()
+        return getattr(self._local, "frames", ())
+
+    def _on_statement(self, sql):
+        # Las sentencias de un método anidado también cuentan para el que lo llamó
+        for frame in self._active_frames():
+            frame["statements"].append(sql)
+
+    def _on_row(self, row_factory, cursor, row):
+        # Cada fila que entrega un cursor, sea cual sea la forma del resultado del método
+        for frame in self._active_frames():
+            frame["rows"] += 1
+        return row_factory(cursor, row) if row_factory is not None else row
+
+    def _wrap(self, name, method):
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            frames = self._local.__dict__.setdefault("frames", [])
+            frame = {"statements": [], "rows": 0}
+            frames.append(frame)
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                frames.pop()
+            self._record(name, elapsed_ms, frame["rows"], frame["statements"], method.__self__)
+            return result
+        return timed
+
+    # ===== REGISTRO =====
+
+    def _record(self, name, elapsed_ms, rows, statements, db):
+        with self._lock:
+            self.timings.setdefault(name, []).append(elapsed_ms)
+        self._timings_log.info(json.dumps({"method": name, "ms": round(elapsed_ms, 3), "rows": rows}))
+
+        if elapsed_ms < self.slow_ms:
+            return
+        lines = [f"LENTO {name}: {elapsed_ms:.1f} ms, {rows} filas, {len(statements)} sentencias"]
+        for sql in statements:
+            lines.append(f"  SQL: {' '.join(sql.split())}")
+            if self.explain:
+                for plan in self._explain(db, sql):
+                    lines.append(f"    PLAN: {plan}")
+        self._slow_log.warning("\n".join(lines))
+
+    def _explain(self, db, sql):
+        if sql.lstrip().upper().startswith(_NO_PLAN_PREFIXES):
+            return []
+        self._local.explaining = True
+        try:
+            rows = db.get_connection().execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+            return [row[3] for row in rows]
+        except Exception as e:
+            return [f"(sin plan: {e})"]
+        finally:
+            self._local.explaining = False
+
+    def summary(self):
+        """{método: (llamadas, p50, p95, p99, máximo)} de lo medido en este proceso"""
+        with self._lock:
+            return summarize(self.timings)
+
+    def print_summary(self):
+        print_summary(self.summary())
+
+
+def summarize(timings):
+    result = {}
+    for name, values in timings.items():
+        ordered = sorted(values)
+        result[name] = (len(ordered), percentile(ordered, 50), percentile(ordered, 95),
+                        percentile(ordered, 99), ordered[-1])
+    return result
+
+
+def print_summary(summary):
+    if not summary:
+        print("No hay mediciones")
+        return
+    print(f"{'Método':<40} {'llamadas':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'máx ms':>9}")
+    # Primero los métodos con peor p99
+    for name, (calls, p50, p95, p99, worst) in sorted(summary.items(), key=lambda item: -item[1][3]):
+        print(f"{name:<40} {calls:>8} {p50:>9.2f} {p95:>9.2f} {p99:>9.2f} {worst:>9.2f}")
+
+
+def read_timings(log_path):
+    """Leer el log de tiempos junto con sus archivos rotados (.1, .2, ...)"""
+    timings = {}
+    for path in sorted(glob.glob(f"{glob.escape(log_path)}*")):
+        with open(path, encoding="utf-8") as log_file:
+            for line in log_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                timings.setdefault(record["method"], []).append(record["ms"])
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Percentiles de tiempo por método de Database")
+    parser.add_argument("--log", default=os.path.join(DEFAULT_LOG_DIR, TIMINGS_LOG))
+    args = parser.parse_args()
+    print_summary(summarize(read_timings(args.log)))
+
+
+if __name__ == '__main__':
+    main()
@@ -19,7 +19,7 @@ for col in columns:
 
 # Ver últimas ventas
 print('\nÚltimas 5 ventas:')
-cursor.execute('SELECT id, total, payment_method, payment_status, created_at FROM sales ORDER BY created_at DESC LIMIT 5')
+cursor.execute('SELECT id, total / 100.0, payment_method, payment_status, created_at FROM sales ORDER BY created_at DESC LIMIT 5')
 sales = cursor.fetchall()
 for sale in sales:
     print(f'  ID: {sale[0]}, Total: {sale[1]}, Método: {sale[2]}, Estado: {sale[3]}, Fecha: {sale[4]}')
@@ -5,6 +5,7 @@ from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont, QPalette, QColor
 from database import Database
 from login_dialog import LoginDialog
+from utils.db_worker import DbExecutor
 
 from modules.dashboard import DashboardModule
 from modules.products import ProductsModule
@@ -13,11 +14,22 @@ from modules.reports import ReportsModule
 from modules.cash import CashModule
 
 class ModernPOS(QMainWindow):
+    JOURNAL_SHIP_INTERVAL_MS = 60 * 1000
+
     def __init__(self):
         super().__init__()
         self.db = Database()
+        self.db.report_runtime_profile()
+        # Consultas pesadas fuera del hilo de la UI (compartido por los módulos)
+        self.db_executor = DbExecutor(self.db)
         self.current_module = None
         self.init_ui()
+        # Respaldo diario: se copia, comprime y verifica en otro hilo (ver db_backup.py)
+        self.db.backup_service.start_if_due()
+        # Entre respaldos, los cambios se envían al diario cada minuto (ver db_journal.py)
+        self.journal_timer = QTimer()
+        self.journal_timer.timeout.connect(self.ship_change_journal)
+        self.journal_timer.start(self.JOURNAL_SHIP_INTERVAL_MS)
         
     def init_ui(self):
         self.setWindowTitle("🏪 Mi Emprendimiento - Sistema para Kiosco")
@@ -170,10 +182,10 @@ class ModernPOS(QMainWindow):
         """Inicializar todos los módulos"""
         self.modules = {
             'dashboard': DashboardModule(self.db),
-            'products': ProductsModule(self.db),
+            'products': ProductsModule(self.db, self.db_executor),
             'sales': SalesModule(self.db),
-            'cash': CashModule(self.db),
-            'reports': ReportsModule(self.db)
+            'cash': CashModule(self.db, self.db_executor),
+            'reports': ReportsModule(self.db, self.db_executor)
         }
         
         for name, module in self.modules.items():
@@ -459,7 +471,22 @@ class ModernPOS(QMainWindow):
                 f"Error inesperado:\n{str(e)}")
             dialog.reject()
 
+    def ship_change_journal(self):
+        """Enviar el diario de cambios en el hilo de escritura, si no hay un envío en curso"""
+        if not self.db_executor.is_running('diario'):
+            self.db_executor.write('diario', lambda db: db.ship_change_journal())
+
     def closeEvent(self, event):
+        # Esperar a los hilos del pool antes de cerrar sus conexiones
+        self.journal_timer.stop()
+        self.db_executor.shutdown()
+        try:
+            # Lo vendido desde el último envío no espera al próximo inicio
+            self.db.ship_change_journal()
+        except Exception as e:
+            print(e)
+        if self.db.profiler:
+            self.db.profiler.print_summary()
         self.db.close_connection()
         self.timer.stop()
         event.accept()
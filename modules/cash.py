@@ -5,11 +5,13 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushBut
 from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QFont
 from utils.formatters import format_currency
+from utils.db_worker import DbExecutor
 from datetime import datetime
 
 class CashModule:
-    def __init__(self, db):
+    def __init__(self, db, executor=None):
         self.db = db
+        self.executor = executor or DbExecutor(db)
         self.widget = QWidget()
         self.init_ui()
 
@@ -49,8 +51,12 @@ class CashModule:
         subtitle = QLabel("Control y administración del flujo de caja del negocio")
         subtitle.setStyleSheet("font-size: 16px; color: #64748b;")
 
+        self.loading_label = QLabel("")
+        self.loading_label.setStyleSheet("font-size: 14px; color: #6b7280; font-style: italic;")
+
         header_layout.addWidget(title)
         header_layout.addWidget(subtitle)
+        header_layout.addWidget(self.loading_label)
         layout.addWidget(header_frame)
 
     def create_quick_actions(self, layout):
@@ -83,6 +89,7 @@ class CashModule:
             ("📈 Historial", "Ver historial completo", "#8b5cf6", self.show_history_dialog)
         ]
 
+        self.action_buttons = []
         for text, tooltip, color, callback in actions:
             btn = QPushButton(text)
             btn.setToolTip(tooltip)
@@ -103,6 +110,7 @@ class CashModule:
             """)
             btn.clicked.connect(callback)
             actions_layout.addWidget(btn)
+            self.action_buttons.append(btn)
 
         layout.addWidget(group)
 
@@ -312,41 +320,65 @@ class CashModule:
         except Exception as e:
             QMessageBox.critical(self.widget, "Error", f"Error en apertura:\n{e}")
 
+    def set_loading(self, loading, text=""):
+        """Estado de carga: deshabilita las acciones mientras hay una consulta en curso"""
+        self.loading_label.setText(text if loading else "")
+        for btn in self.action_buttons:
+            btn.setEnabled(not loading)
+
     def close_cash_dialog(self):
         """Diálogo para cierre de caja con reporte detallado"""
         current_date = datetime.now().strftime("%Y-%m-%d")
 
+        def fetch(db):
+            # Obtener todos los datos del reporte en una sola lectura
+            snapshot = db.get_cash_close_snapshot(current_date)
+            try:
+                existing_closes = db.get_cash_close_records(current_date, current_date)
+            except Exception as e:
+                print(f"Error verificando cierres existentes: {e}")
+                existing_closes = []
+            return snapshot, existing_closes
+
+        def on_error(message):
+            self.set_loading(False)
+            QMessageBox.critical(self.widget, "Error de Base de Datos", f"No se pudo calcular el resumen de caja:\n{message}")
+
+        def on_result(result):
+            self.set_loading(False)
+            self.show_close_cash_dialog(current_date, *result)
+
+        # El resumen recorre las ventas del día: se calcula fuera del hilo de la UI
+        self.set_loading(True, "⏳ Calculando resumen de caja...")
+        self.executor.read('cash_close', fetch, on_result, on_error)
+
+    def show_close_cash_dialog(self, current_date, snapshot, existing_closes):
+        """Mostrar el reporte de cierre con los datos ya consultados"""
         try:
-            # Obtener datos para el reporte
-            total_income = self.db.get_cash_register_income_summary(current_date)
-            sales_summary = self.db.get_sales_summary(current_date, current_date)
-            top_products = self.db.get_top_products(current_date, current_date, 5)
-            total_products_sold = self.db.get_total_products_sold(current_date, current_date)
-            inventory_value = self.db.get_inventory_value()
-            total_products = self.db.get_total_products()
-            low_stock_count = self.db.get_low_stock_count()
-            out_of_stock_count = self.db.get_out_of_stock_count()
+            total_income = snapshot['total_income']
+            top_products = snapshot['top_products']
+            total_products_sold = snapshot['total_products_sold']
+            inventory_value = snapshot['inventory_value']
+            total_products = snapshot['total_products']
+            low_stock_count = snapshot['low_stock_count']
+            out_of_stock_count = snapshot['out_of_stock_count']
 
             # Extraer datos de ventas
-            if sales_summary and len(sales_summary) >= 4:
-                total_sales, total_amount, avg_ticket, unique_customers = sales_summary
-            else:
-                total_sales, total_amount, avg_ticket, unique_customers = 0, 0.0, 0.0, 0
+            total_sales = snapshot['total_sales']
+            total_amount = snapshot['total_amount']
+            avg_ticket = snapshot['average_ticket']
+            unique_customers = snapshot['unique_customers']
 
         except Exception as e:
             QMessageBox.critical(self.widget, "Error de Base de Datos", f"No se pudo calcular el resumen de caja:\n{e}")
             return
 
         # ⚠️ NUEVO: Verificar si ya hay un cierre para hoy
-        try:
-            existing_closes = self.db.get_cash_close_records(current_date, current_date)
-            if existing_closes:
-                QMessageBox.warning(self.widget, "Caja ya cerrada",
-                    f"⚠️ La caja del día {current_date} ya fue cerrada anteriormente.\n\n"
-                    f"Si necesita reabrir la caja, puede hacer una nueva apertura desde el botón 'Apertura de Caja'.")
-                return
-        except Exception as e:
-            print(f"Error verificando cierres existentes: {e}")
+        if existing_closes:
+            QMessageBox.warning(self.widget, "Caja ya cerrada",
+                f"⚠️ La caja del día {current_date} ya fue cerrada anteriormente.\n\n"
+                f"Si necesita reabrir la caja, puede hacer una nueva apertura desde el botón 'Apertura de Caja'.")
+            return
 
 
         # Crear diálogo personalizado para el cierre de caja
@@ -245,13 +245,15 @@ class DashboardModule:
         alerts = []
 
         try:
+            stats = self.db.get_inventory_stats()
+
             # 1. Verificar stock bajo
-            low_stock = self.db.get_low_stock_count()
+            low_stock = stats['low_stock_count']
             if low_stock > 0:
                 alerts.append(f"⚠️ {low_stock} productos con stock bajo")
 
             # 2. Verificar si no hay productos
-            total_products = self.db.get_total_products()
+            total_products = stats['total_products']
             if total_products == 0:
                 alerts.append("📦 No hay productos cargados en el sistema")
 
@@ -1,16 +1,41 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
-                             QTableWidget, QTableWidgetItem, QLineEdit, QComboBox,
+                             QTableView, QLineEdit, QComboBox,
                              QHeaderView, QMessageBox, QFrame, QGroupBox, QFormLayout,
                              QSpinBox, QDoubleSpinBox, QTextEdit)
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from widgets.product_dialog import ProductDialog
+from widgets.product_table import (ProductTableModel, ProductFilterProxy, ProductColumn,
+                                   ActionButton, ActionButtonsDelegate, stock_text, stock_color,
+                                   SEARCH_DELAY_MS)
 from utils.formatters import format_currency
+from utils.db_worker import DbExecutor
 
 class ProductsModule:
-    def __init__(self, db):
+    # Columnas de la grilla: (id, código, nombre, categoría, compra, venta, stock, stock mínimo)
+    PRODUCT_COLUMNS = [
+        ProductColumn("ID", lambda product: str(product[0]), None, None, lambda product: product[0]),
+        ProductColumn("Código", lambda product: product[1] or "", None, None, lambda product: product[1] or ""),
+        ProductColumn("Producto", lambda product: product[2], None, None, lambda product: product[2]),
+        ProductColumn("Categoría", lambda product: product[3] or "Sin categoría", None, None,
+                      lambda product: product[3] or ""),
+        ProductColumn("Precio Compra", lambda product: format_currency(product[4]),
+                      Qt.AlignRight | Qt.AlignVCenter, None, lambda product: product[4]),
+        ProductColumn("Precio Venta", lambda product: format_currency(product[5]),
+                      Qt.AlignRight | Qt.AlignVCenter, None, lambda product: product[5]),
+        ProductColumn("Stock", lambda product: stock_text(product[6], product[7]), Qt.AlignCenter,
+                      lambda product: stock_color(product[6], product[7]), lambda product: product[6]),
+        ProductColumn("Acciones"),
+    ]
+
+    def __init__(self, db, executor=None):
         self.db = db
+        self.executor = executor or DbExecutor(db)
+        # Productos en memoria, compartidos con los demás módulos (ver db_catalog.py)
+        self.catalog = db.catalog
         self.widget = QWidget()
         self.init_ui()
+        # Una venta o un cambio hecho en otro módulo se ve acá sin recargar
+        self.catalog.add_listener(self.on_catalog_changed)
         
     def get_widget(self):
         return self.widget
@@ -48,8 +73,11 @@ class ProductsModule:
         title.setStyleSheet("font-size: 28px; font-weight: bold; color: #1e293b; margin-bottom: 4px;")
         subtitle = QLabel("Administra el inventario de tu kiosco")
         subtitle.setStyleSheet("font-size: 14px; color: #64748b;")
+        self.loading_label = QLabel("")
+        self.loading_label.setStyleSheet("font-size: 12px; color: #6b7280; font-style: italic;")
         title_layout.addWidget(title)
         title_layout.addWidget(subtitle)
+        title_layout.addWidget(self.loading_label)
         header_layout.addLayout(title_layout)
         
         header_layout.addStretch()
@@ -78,10 +106,11 @@ class ProductsModule:
 
         # ✅ DATOS REALES desde la base de datos
         try:
-            total_products = self.db.get_total_products()
-            low_stock = self.db.get_low_stock_count()
-            out_of_stock = self.db.get_out_of_stock_count()
-            inventory_value = self.db.get_inventory_value()
+            stats = self.db.get_inventory_stats()
+            total_products = stats['total_products']
+            low_stock = stats['low_stock_count']
+            out_of_stock = stats['out_of_stock_count']
+            inventory_value = stats['inventory_value']
 
             stats_data = [
                 ("Total Productos", str(total_products), "#3b82f6", "📦"),
@@ -149,7 +178,12 @@ class ProductsModule:
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("🔍 Buscar por código, nombre...")
         self.search_input.setClearButtonEnabled(True)
-        self.search_input.textChanged.connect(self.filter_products)
+        # Se filtra cuando se deja de escribir, no en cada tecla
+        self.search_timer = QTimer(self.widget)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.filter_products)
+        self.search_input.textChanged.connect(self.search_timer.start)
         
         # Categorías
         self.category_combo = QComboBox()
@@ -176,49 +210,96 @@ class ProductsModule:
         table_header.setStyleSheet("font-size: 18px; font-weight: 600; color: #374151; margin-bottom: 12px;")
         table_layout.addWidget(table_header)
         
-        self.products_table = QTableWidget()
-        self.products_table.setColumnCount(8)
-        self.products_table.setHorizontalHeaderLabels([
-            "ID", "Código", "Producto", "Categoría", "Precio Compra", "Precio Venta", 
-            "Stock", "Acciones"
-        ])
+        # Modelo + proxy con las filas filtradas: la vista solo pide las filas que muestra
+        self.products_model = ProductTableModel(self.PRODUCT_COLUMNS, self.catalog)
+        self.products_proxy = ProductFilterProxy(self.products_model)
+        self.products_table = QTableView()
+        self.products_table.setModel(self.products_proxy)
+        self.products_table.setItemDelegateForColumn(7, ActionButtonsDelegate([
+            ActionButton("✏️", "Editar producto", "#3b82f6", "#2563eb", self.edit_product),
+            ActionButton("🗑️", "Eliminar producto", "#ef4444", "#dc2626",
+                         lambda product: self.delete_product(product[0], product[2])),
+        ], self.products_table, button_width=32, button_height=32))
         
         header = self.products_table.horizontalHeader()
         header.setSectionResizeMode(2, QHeaderView.Stretch)  # Nombre más ancho
         header.setSectionResizeMode(0, QHeaderView.ResizeToContents)  # ID más compacto
         header.setSectionResizeMode(1, QHeaderView.ResizeToContents)  # Código
         header.setSectionResizeMode(3, QHeaderView.ResizeToContents)  # Categoría
+        header.resizeSection(7, 84)
+        # Las columnas ajustadas al contenido miden solo las filas visibles (por defecto, hasta 1000)
+        header.setResizeContentsPrecision(0)
         
         self.products_table.setAlternatingRowColors(True)
-        self.products_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.products_table.setSelectionBehavior(QTableView.SelectRows)
+        self.products_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.products_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.products_table.verticalHeader().setDefaultSectionSize(38)
+        # Sin números de fila: el encabezado vertical tiene una sección por fila visible
+        self.products_table.verticalHeader().hide()
+        # Orden inicial por nombre, como llegan de get_products
+        header.setSortIndicator(2, Qt.AscendingOrder)
         self.products_table.setSortingEnabled(True)
         
         table_layout.addWidget(self.products_table)
         layout.addWidget(table_frame)
         
     def load_products(self):
-        """Cargar productos desde la base de datos REAL"""
+        """Cargar productos desde la base de datos REAL (en segundo plano)"""
+        if self.catalog.loaded:
+            # Ya está en memoria (quizás lo cargó otro módulo): solo lo que cambió
+            try:
+                self.catalog.refresh()
+            except Exception as e:
+                print(f"Error actualizando productos: {e}")
+            self.update_real_stats()
+            return
+
+        def fetch(db):
+            # fetch no toca el catálogo (es estático): se puede leer en el hilo de la consulta
+            return self.catalog.fetch(db), db.get_inventory_stats()
+
+        self.set_loading(True)
+        self.executor.read('products', fetch, self.on_products_loaded, self.on_products_error)
+
+    def on_products_loaded(self, result):
+        self.set_loading(False)
         try:
             # ✅ USAR DATOS REALES de la base de datos
-            self.all_products = self.db.get_products()
-            self.filter_products()
+            snapshot, stats = result
+            # La grilla se actualiza con el aviso del catálogo (on_catalog_changed)
+            self.catalog.load(snapshot)
         
             # ✅ ACTUALIZAR ESTADÍSTICAS CON DATOS REALES
-            self.update_real_stats()
+            self.update_real_stats(stats)
         
         except Exception as e:
             QMessageBox.critical(self.widget, "Error", f"Error al cargar productos:\n{str(e)}")
-            # En caso de error, usar lista vacía
-            self.all_products = []
+
+    def on_products_error(self, message):
+        self.set_loading(False)
+        # El catálogo compartido queda como estaba (lo usan los demás módulos)
+        QMessageBox.critical(self.widget, "Error", f"Error al cargar productos:\n{message}")
+
+    def on_catalog_changed(self, change):
+        # Un stock nuevo puede sacar la fila del filtro de stock o moverla en el orden
+        self.filter_products()
+
+    def set_loading(self, loading):
+        """Estado de carga: la tabla queda deshabilitada hasta que llegan los datos"""
+        self.loading_label.setText("⏳ Cargando productos..." if loading else "")
+        self.products_table.setEnabled(not loading)
             
-    def update_real_stats(self):
+    def update_real_stats(self, stats=None):
         """Actualizar estadísticas con datos REALES de la base de datos"""
         try:
             # ✅ USAR LOS MÉTODOS DE LA BASE DE DATOS PARA OBTENER DATOS REALES Y ACTUALIZADOS
-            total_products = self.db.get_total_products()
-            low_stock = self.db.get_low_stock_count()
-            out_of_stock = self.db.get_out_of_stock_count()
-            inventory_value = self.db.get_inventory_value()
+            if stats is None:
+                stats = self.db.get_inventory_stats()
+            total_products = stats['total_products']
+            low_stock = stats['low_stock_count']
+            out_of_stock = stats['out_of_stock_count']
+            inventory_value = stats['inventory_value']
 
             # ✅ ACTUALIZAR LAS ESTADÍSTICAS EN LA UI
             stats_data = [
@@ -263,133 +344,36 @@ class ProductsModule:
     def filter_products(self):
         """Filtrar productos por categoría y búsqueda - USANDO DATOS REALES"""
         try:
-            if not hasattr(self, 'all_products') or not self.all_products:
-                self.products_table.setRowCount(0)
-                return
-
+            self.search_timer.stop()
             category_filter = self.category_combo.currentText()
-            search_text = self.search_input.text().strip().lower()
             stock_filter = self.stock_combo.currentText()
+            stocks = self.catalog.stocks
+            min_stocks = self.catalog.min_stocks
 
-            filtered_products = []
-            for product in self.all_products:
-                product_id, code, name, category, buy_price, sell_price, stock, min_stock = product
-
-                # Filtrar por categoría
-                if category_filter != "Todas las categorías" and category != category_filter:
-                    continue
-
-                # Filtrar por búsqueda de texto
-                if search_text and search_text not in name.lower() and search_text not in code.lower():
-                    continue
-
-                # Filtrar por stock
-                if stock_filter == "Stock normal" and stock <= min_stock:
-                    continue
-                elif stock_filter == "Stock bajo (≤5)" and stock > min_stock:
-                    continue
-                elif stock_filter == "Sin stock" and stock > 0:
-                    continue
-
-                filtered_products.append(product)
-
-            # Actualizar tabla
-            self.products_table.setRowCount(len(filtered_products))
-
-            for row, product in enumerate(filtered_products):
-                product_id, code, name, category, buy_price, sell_price, stock, min_stock = product
-
-                # ID
-                id_item = QTableWidgetItem(str(product_id))
-                id_item.setData(Qt.UserRole, product_id)
-                self.products_table.setItem(row, 0, id_item)
-
-                # Código
-                code_item = QTableWidgetItem(code)
-                self.products_table.setItem(row, 1, code_item)
-
-                # Producto
-                name_item = QTableWidgetItem(name)
-                self.products_table.setItem(row, 2, name_item)
-
-                # Categoría
-                category_item = QTableWidgetItem(category or "Sin categoría")
-                self.products_table.setItem(row, 3, category_item)
-
-                # Precio Compra
-                buy_price_item = QTableWidgetItem(format_currency(buy_price))
-                buy_price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.products_table.setItem(row, 4, buy_price_item)
-
-                # Precio Venta
-                sell_price_item = QTableWidgetItem(format_currency(sell_price))
-                sell_price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.products_table.setItem(row, 5, sell_price_item)
-
-                # Stock con indicador visual
-                if stock == 0:
-                    stock_text = "❌ Agotado"
-                    stock_style = "color: #ef4444; font-weight: bold;"
-                elif stock <= min_stock:
-                    stock_text = f"⚠️ {stock}"
-                    stock_style = "color: #f59e0b; font-weight: bold;"
-                else:
-                    stock_text = f"✅ {stock}"
-                    stock_style = "color: #10b981; font-weight: bold;"
-
-                stock_item = QTableWidgetItem(stock_text)
-                stock_item.setTextAlignment(Qt.AlignCenter)
-                self.products_table.setItem(row, 6, stock_item)
-
-                # Botón acciones
-                actions_widget = QWidget()
-                actions_layout = QHBoxLayout(actions_widget)
-                actions_layout.setContentsMargins(4, 2, 4, 2)
-                actions_layout.setSpacing(4)
-
-                edit_btn = QPushButton("✏️")
-                edit_btn.setToolTip("Editar producto")
-                edit_btn.setFixedSize(32, 32)
-                edit_btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #3b82f6;
-                        color: white;
-                        border-radius: 6px;
-                        font-size: 14px;
-                    }
-                    QPushButton:hover {
-                        background-color: #2563eb;
-                    }
-                """)
-                edit_btn.clicked.connect(lambda checked, p=product: self.edit_product(p))
+            # Filtrar por búsqueda de texto (nombre y código, en el índice del catálogo)
+            groups = self.catalog.search_index.search(self.search_input.text())
+            rows = self.products_proxy.ranked_rows(groups)
 
-                delete_btn = QPushButton("🗑️")
-                delete_btn.setToolTip("Eliminar producto")
-                delete_btn.setFixedSize(32, 32)
-                delete_btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #ef4444;
-                        color: white;
-                        border-radius: 6px;
-                        font-size: 14px;
-                    }
-                    QPushButton:hover {
-                        background-color: #dc2626;
-                    }
-                """)
-                delete_btn.clicked.connect(lambda checked, pid=product_id, pn=name: self.delete_product(pid, pn))
+            # Filtrar por categoría
+            if category_filter != "Todas las categorías":
+                in_category = self.catalog.category_slots(category_filter)
+                rows = [row for row in rows if row in in_category]
 
-                actions_layout.addWidget(edit_btn)
-                actions_layout.addWidget(delete_btn)
-                actions_layout.addStretch()
+            # Filtrar por stock (columnas del catálogo, sin armar la tupla de cada producto)
+            if stock_filter == "Stock normal":
+                rows = [row for row in rows if stocks[row] > min_stocks[row]]
+            elif stock_filter == "Stock bajo (≤5)":
+                rows = [row for row in rows if stocks[row] <= min_stocks[row]]
+            elif stock_filter == "Sin stock":
+                rows = [row for row in rows if stocks[row] <= 0]
 
-                self.products_table.setCellWidget(row, 7, actions_widget)
+            self.products_proxy.set_rows(rows)
 
         except Exception as e:
             print(f"Error filtrando productos: {e}")
         
     def show_add_dialog(self):
-        dialog = ProductDialog(self.widget)
+        dialog = ProductDialog(self.widget, [category[1] for category in self.catalog.get_categories()])
         if dialog.exec_():
             product_data = dialog.get_product_data()
             try:
@@ -397,17 +381,17 @@ class ProductsModule:
                 category_name = product_data['category_name']
             
                 # Verificar si la categoría ya existe en la base de datos
-                categories = self.db.get_categories()
+                categories = self.catalog.get_categories()
                 category_exists = any(cat[1] == category_name for cat in categories)
             
                 if not category_exists and category_name:
                     # Agregar nueva categoría
-                    self.db.add_category(category_name, "Categoría agregada desde producto")
+                    self.catalog.add_category(category_name, "Categoría agregada desde producto")
             
-                # Ahora agregar el producto
-                success = self.db.add_product(product_data)
+                # Ahora agregar el producto (el catálogo suma solo esa fila)
+                success = self.catalog.add_product(product_data)
                 if success:
-                    self.load_products()
+                    self.update_real_stats()
                     QMessageBox.information(self.widget, "✅ Éxito", "Producto agregado correctamente")
             except Exception as e:
                 QMessageBox.critical(self.widget, "❌ Error", str(e))
@@ -419,7 +403,7 @@ class ProductsModule:
         
             # Crear diálogo de edición
             from widgets.product_dialog import ProductDialog
-            dialog = ProductDialog(self.widget)
+            dialog = ProductDialog(self.widget, [category[1] for category in self.catalog.get_categories()])
         
             # Cargar datos del producto en el diálogo
             dialog.code_input.setText(code)
@@ -434,8 +418,8 @@ class ProductsModule:
                 dialog.category_combo.addItem(category)
                 dialog.category_combo.setCurrentText(category)
         
-            dialog.buy_price_input.setValue(buy_price)
-            dialog.sell_price_input.setValue(sell_price)
+            dialog.buy_price_input.setValue(float(buy_price))
+            dialog.sell_price_input.setValue(float(sell_price))
             dialog.stock_input.setValue(stock)
         
             dialog.setWindowTitle("✏️ Editar Producto")
@@ -460,9 +444,9 @@ class ProductsModule:
         
         if reply == QMessageBox.Yes:
             try:
-                success = self.db.delete_product(product_id)
+                success = self.catalog.delete_product(product_id)
                 if success:
-                    self.load_products()
+                    self.update_real_stats()
                     QMessageBox.information(self.widget, "✅ Éxito", "Producto eliminado correctamente")
                 else:
                     QMessageBox.warning(self.widget, "⚠️ Advertencia", "No se pudo eliminar el producto")
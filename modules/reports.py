@@ -4,10 +4,12 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushBut
 from PyQt5.QtCore import QDate, Qt
 from utils.formatters import format_currency
 from modules.report_components import StatsCard, DataHelper, TableManager
+from utils.db_worker import DbExecutor
 
 class ReportsModule:
-    def __init__(self, db):
+    def __init__(self, db, executor=None):
         self.db = db
+        self.executor = executor or DbExecutor(db)
         self.widget = QWidget()
         self.init_ui()
         
@@ -18,7 +20,10 @@ class ReportsModule:
         self.load_reports_data()
         
     def on_leave(self):
-        pass
+        # Al salir del módulo no tiene sentido seguir calculando el reporte
+        self.executor.cancel('reports')
+        if not self.executor.is_running('reports_export'):
+            self.set_loading(False)
         
     def init_ui(self):
         layout = QVBoxLayout(self.widget)
@@ -35,13 +40,17 @@ class ReportsModule:
         title = QLabel("📊 Reportes del Kiosco")
         title.setStyleSheet("font-size: 28px; font-weight: bold; color: #1e293b;")
         
-        export_btn = QPushButton("📤 Exportar Reporte")
-        export_btn.setProperty("class", "success")
-        export_btn.clicked.connect(self.export_report)
+        self.export_btn = QPushButton("📤 Exportar Reporte")
+        self.export_btn.setProperty("class", "success")
+        self.export_btn.clicked.connect(self.export_report)
+
+        self.loading_label = QLabel("")
+        self.loading_label.setStyleSheet("color: #6b7280; font-style: italic;")
         
         header_layout.addWidget(title)
         header_layout.addStretch()
-        header_layout.addWidget(export_btn)
+        header_layout.addWidget(self.loading_label)
+        header_layout.addWidget(self.export_btn)
         layout.addLayout(header_layout)
         
     def create_date_filters(self, layout):
@@ -69,9 +78,9 @@ class ReportsModule:
         self.view_combo.addItems(["📊 Resumen", "📋 Detallado"])
         self.view_combo.setToolTip("Cambiar entre vista resumen o detallada")
 
-        update_btn = QPushButton("🔄 Actualizar Reporte")
-        update_btn.setStyleSheet("background-color: #3b82f6; color: white; font-weight: bold; padding: 10px 20px;")
-        update_btn.clicked.connect(self.load_reports_data)
+        self.update_btn = QPushButton("🔄 Actualizar Reporte")
+        self.update_btn.setStyleSheet("background-color: #3b82f6; color: white; font-weight: bold; padding: 10px 20px;")
+        self.update_btn.clicked.connect(self.load_reports_data)
 
         filter_layout.addWidget(self.period_combo)
         filter_layout.addWidget(QLabel("Vista:"))
@@ -80,7 +89,7 @@ class ReportsModule:
         filter_layout.addWidget(self.start_date)
         filter_layout.addWidget(QLabel("Hasta:"))
         filter_layout.addWidget(self.end_date)
-        filter_layout.addWidget(update_btn)
+        filter_layout.addWidget(self.update_btn)
         filter_layout.addStretch()
     
         layout.addWidget(filter_frame)
@@ -167,45 +176,67 @@ class ReportsModule:
             self.end_date.setDate(end)
             
     def load_reports_data(self):
-        """Cargar datos de reportes desde la base de datos"""
+        """Cargar datos de reportes en segundo plano; la UI se actualiza al llegar el resultado"""
+        start_date = self.start_date.date().toString("yyyy-MM-dd")
+        end_date = self.end_date.date().toString("yyyy-MM-dd")
+        view_mode = self.view_combo.currentText()
+        prev_start, prev_end = self.get_previous_period_dates(start_date, end_date)
+
+        def fetch(db):
+            return {
+                'view_mode': view_mode,
+                'current_sales_summary': db.get_sales_summary(start_date, end_date),
+                'previous_sales_summary': db.get_previous_period_sales(start_date, end_date),
+                'top_products': db.get_top_products(start_date, end_date, 10),
+                'recent_sales': db.get_sales_report(start_date, end_date),
+                'current_products_sold': db.get_total_products_sold(start_date, end_date),
+                'previous_products_sold': db.get_total_products_sold(prev_start, prev_end),
+                'detailed_sales': db.get_detailed_sales_report(start_date, end_date),
+                'payment_data': db.get_payment_methods_distribution(start_date, end_date),
+            }
+
+        self.set_loading(True, "⏳ Cargando reportes...")
+        # Una consulta anterior todavía en curso se cancela
+        self.executor.read('reports', fetch, self.on_reports_loaded, self.on_reports_error)
+
+    def on_reports_loaded(self, data):
+        """Actualizar los componentes con los datos ya consultados"""
+        self.set_loading(False)
         try:
-            start_date = self.start_date.date().toString("yyyy-MM-dd")
-            end_date = self.end_date.date().toString("yyyy-MM-dd")
-            view_mode = self.view_combo.currentText()
+            view_mode = data['view_mode']
 
             # Determinar si mostrar vista detallada o resumen
             is_detailed = "📋 Detallado" in view_mode
 
-            # Cargar datos reales
-            current_sales_summary = self.db.get_sales_summary(start_date, end_date)
-            previous_sales_summary = self.db.get_previous_period_sales(start_date, end_date)
-            top_products = self.db.get_top_products(start_date, end_date, 10)
-            recent_sales = self.db.get_sales_report(start_date, end_date)
-            current_products_sold = self.db.get_total_products_sold(start_date, end_date)
-
-            # Calcular período anterior
-            prev_start, prev_end = self.get_previous_period_dates(start_date, end_date)
-            previous_products_sold = self.db.get_total_products_sold(prev_start, prev_end)
-
             # Actualizar componentes
-            self.update_main_stats(current_sales_summary, previous_sales_summary,
-                                 current_products_sold, previous_products_sold)
-            self.update_top_products(top_products)
-            self.update_recent_sales(recent_sales)
-            self.update_hourly_sales(start_date, end_date)
-            self.update_payment_methods(start_date, end_date)
+            self.update_main_stats(data['current_sales_summary'], data['previous_sales_summary'],
+                                 data['current_products_sold'], data['previous_products_sold'])
+            self.update_top_products(data['top_products'])
+            self.update_recent_sales(data['recent_sales'])
+            self.update_hourly_sales(data['detailed_sales'])
+            self.update_payment_methods(data['payment_data'])
 
             # Mostrar/ocultar secciones según la vista seleccionada
             self.toggle_view_mode(is_detailed)
 
             # Show success message only if data was loaded successfully
-            if current_sales_summary or top_products or recent_sales:
+            if data['current_sales_summary'] or data['top_products'] or data['recent_sales']:
                 QMessageBox.information(self.widget, "✅ Actualizado", f"Reportes actualizados correctamente ({view_mode})")
             else:
                 QMessageBox.information(self.widget, "ℹ️ Sin Datos", "No hay datos para el período seleccionado.")
 
         except Exception as e:
             QMessageBox.critical(self.widget, "❌ Error", f"Error al cargar reportes:\n{str(e)}")
+
+    def on_reports_error(self, message):
+        self.set_loading(False)
+        QMessageBox.critical(self.widget, "❌ Error", f"Error al cargar reportes:\n{message}")
+
+    def set_loading(self, loading, text=""):
+        """Estado de carga: deshabilita las acciones mientras hay una consulta en curso"""
+        self.loading_label.setText(text if loading else "")
+        self.update_btn.setEnabled(not loading)
+        self.export_btn.setEnabled(not loading)
             
     def update_main_stats(self, current_sales_summary, previous_sales_summary, 
                         current_products_sold, previous_products_sold):
@@ -304,7 +335,7 @@ class ReportsModule:
             print(f"Error en update_recent_sales: {e}")
             self.recent_sales_table.setRowCount(0)
 
-    def update_hourly_sales(self, start_date, end_date):
+    def update_hourly_sales(self, detailed_sales):
         """Actualizar ventas por horario mostrando las ventas individuales"""
         from PyQt5.QtWidgets import QWidget, QHBoxLayout, QLabel
 
@@ -315,9 +346,6 @@ class ReportsModule:
                 child.widget().deleteLater()
 
         try:
-            # Obtener ventas detalladas del período
-            detailed_sales = self.db.get_detailed_sales_report(start_date, end_date)
-
             if not detailed_sales:
                 # Si no hay datos, mostrar mensaje
                 no_data_widget = QWidget()
@@ -379,7 +407,7 @@ class ReportsModule:
         
         self.hourly_layout.addWidget(time_widget)
 
-    def update_payment_methods(self, start_date, end_date):
+    def update_payment_methods(self, payment_data):
         """Actualizar distribución de métodos de pago con datos reales"""
         from PyQt5.QtWidgets import QWidget, QHBoxLayout, QLabel
 
@@ -390,9 +418,6 @@ class ReportsModule:
                 child.widget().deleteLater()
 
         try:
-            # Obtener datos reales de la base de datos
-            payment_data = self.db.get_payment_methods_distribution(start_date, end_date)
-
             if not payment_data:
                 # Si no hay datos, mostrar mensaje
                 no_data_widget = QWidget()
@@ -475,7 +500,7 @@ class ReportsModule:
 
             # Ver últimas ventas
             debug_info += "\nÚltimas 5 ventas:\n"
-            cursor.execute('SELECT id, total, payment_method, payment_status, created_at FROM sales ORDER BY created_at DESC LIMIT 5')
+            cursor.execute('SELECT id, total / 100.0, payment_method, payment_status, created_at FROM sales ORDER BY created_at DESC LIMIT 5')
             sales = cursor.fetchall()
             for sale in sales:
                 debug_info += f"  ID: {sale[0]}, Total: {sale[1]}, Método: {sale[2]}, Estado: {sale[3]}, Fecha: {sale[4]}\n"
@@ -483,7 +508,7 @@ class ReportsModule:
             # Ver items de las últimas ventas
             debug_info += "\nItems de las últimas ventas:\n"
             cursor.execute('''
-                SELECT si.sale_id, si.product_name, si.quantity, si.price, si.subtotal
+                SELECT si.sale_id, si.product_name, si.quantity, si.price / 100.0, si.subtotal / 100.0
                 FROM sale_items si
                 JOIN sales s ON si.sale_id = s.id
                 ORDER BY s.created_at DESC LIMIT 10
@@ -501,11 +526,7 @@ class ReportsModule:
     def export_report(self):
         """Exportar reporte a Excel"""
         try:
-            from PyQt5.QtWidgets import QFileDialog, QMessageBox
-            from openpyxl import Workbook
-            from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-            from openpyxl.utils import get_column_letter
-            from datetime import datetime
+            from PyQt5.QtWidgets import QFileDialog
 
             # Obtener fechas del período actual
             start_date = self.start_date.date().toString("yyyy-MM-dd")
@@ -522,181 +543,253 @@ class ReportsModule:
             if not filename:
                 return
 
-            # Crear workbook de Excel
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Reporte de Ventas"
-
-            # Estilos
-            header_font = Font(bold=True, size=14, color="FFFFFF")
-            header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-            subheader_font = Font(bold=True, size=12, color="000000")
-            subheader_fill = PatternFill(start_color="DCE6F1", end_color="DCE6F1", fill_type="solid")
-            data_font = Font(size=10)
-            border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+            # La consulta y la escritura del archivo corren fuera del hilo de la UI
+            self.set_loading(True, "⏳ Exportando reporte...")
+            self.executor.read(
+                'reports_export',
+                lambda db: self.write_excel_report(db, filename, start_date, end_date),
+                self.on_report_exported,
+                self.on_report_export_error,
+            )
 
-            # Fila actual para escribir
-            current_row = 1
+        except Exception as e:
+            self.set_loading(False)
+            QMessageBox.critical(self.widget, "❌ Error", f"Error al exportar reporte:\n{str(e)}")
 
-            # Título principal
+    def on_report_exported(self, filename):
+        self.set_loading(False)
+        QMessageBox.information(self.widget, "✅ Exportado", f"Reporte exportado exitosamente a:\n{filename}")
+
+    def on_report_export_error(self, message):
+        self.set_loading(False)
+        QMessageBox.critical(self.widget, "❌ Error", f"Error al exportar reporte:\n{message}")
+
+    def write_excel_report(self, db, filename, start_date, end_date):
+        """Generar el Excel del período (se ejecuta en un hilo del pool, sin tocar widgets)"""
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+        from openpyxl.utils import get_column_letter
+        from datetime import datetime
+
+        # Crear workbook de Excel
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Reporte de Ventas"
+
+        # Estilos
+        header_font = Font(bold=True, size=14, color="FFFFFF")
+        header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+        subheader_font = Font(bold=True, size=12, color="000000")
+        subheader_fill = PatternFill(start_color="DCE6F1", end_color="DCE6F1", fill_type="solid")
+        data_font = Font(size=10)
+        border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+
+        # Fila actual para escribir
+        current_row = 1
+
+        # Título principal
+        ws.merge_cells(f'A{current_row}:F{current_row}')
+        title_cell = ws[f'A{current_row}']
+        title_cell.value = "📊 REPORTE DE VENTAS - KIOSCO POS"
+        title_cell.font = Font(bold=True, size=16, color="1e293b")
+        title_cell.alignment = Alignment(horizontal="center")
+        current_row += 1
+
+        # Información del período
+        ws.merge_cells(f'A{current_row}:F{current_row}')
+        period_cell = ws[f'A{current_row}']
+        period_cell.value = f"Período: {start_date} a {end_date}"
+        period_cell.font = Font(bold=True, size=12)
+        period_cell.alignment = Alignment(horizontal="center")
+        current_row += 1
+
+        # Fecha de generación
+        ws.merge_cells(f'A{current_row}:F{current_row}')
+        date_cell = ws[f'A{current_row}']
+        date_cell.value = f"Generado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        date_cell.font = Font(italic=True, size=10)
+        date_cell.alignment = Alignment(horizontal="center")
+        current_row += 2
+
+        # Obtener datos para exportar
+        sales_data = db.get_sales_report(start_date, end_date)
+        top_products = db.get_top_products(start_date, end_date, 50)
+        sales_summary = db.get_sales_summary(start_date, end_date)
+        payment_data = db.get_payment_methods_distribution(start_date, end_date)
+        detailed_sales = db.get_detailed_sales_report(start_date, end_date)
+
+        # Resumen general
+        if sales_summary:
+            # Título de sección
             ws.merge_cells(f'A{current_row}:F{current_row}')
-            title_cell = ws[f'A{current_row}']
-            title_cell.value = "📊 REPORTE DE VENTAS - KIOSCO POS"
-            title_cell.font = Font(bold=True, size=16, color="1e293b")
-            title_cell.alignment = Alignment(horizontal="center")
+            summary_title = ws[f'A{current_row}']
+            summary_title.value = "RESUMEN GENERAL"
+            summary_title.font = subheader_font
+            summary_title.fill = subheader_fill
+            summary_title.alignment = Alignment(horizontal="center")
             current_row += 1
 
-            # Información del período
-            ws.merge_cells(f'A{current_row}:F{current_row}')
-            period_cell = ws[f'A{current_row}']
-            period_cell.value = f"Período: {start_date} a {end_date}"
-            period_cell.font = Font(bold=True, size=12)
-            period_cell.alignment = Alignment(horizontal="center")
+            sales_count, total_amount, avg_ticket, customers = sales_summary
+
+            # Encabezados
+            headers = ['Métrica', 'Valor']
+            for col, header in enumerate(headers, 1):
+                cell = ws[f'{get_column_letter(col)}{current_row}']
+                cell.value = header
+                cell.font = header_font
+                cell.fill = header_fill
+                cell.alignment = Alignment(horizontal="center")
+                cell.border = border
             current_row += 1
 
-            # Fecha de generación
-            ws.merge_cells(f'A{current_row}:F{current_row}')
-            date_cell = ws[f'A{current_row}']
-            date_cell.value = f"Generado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-            date_cell.font = Font(italic=True, size=10)
-            date_cell.alignment = Alignment(horizontal="center")
-            current_row += 2
-
-            # Obtener datos para exportar
-            sales_data = self.db.get_sales_report(start_date, end_date)
-            top_products = self.db.get_top_products(start_date, end_date, 50)
-            sales_summary = self.db.get_sales_summary(start_date, end_date)
-            payment_data = self.db.get_payment_methods_distribution(start_date, end_date)
-            detailed_sales = self.db.get_detailed_sales_report(start_date, end_date)
-
-            # Resumen general
-            if sales_summary:
-                # Título de sección
-                ws.merge_cells(f'A{current_row}:F{current_row}')
-                summary_title = ws[f'A{current_row}']
-                summary_title.value = "RESUMEN GENERAL"
-                summary_title.font = subheader_font
-                summary_title.fill = subheader_fill
-                summary_title.alignment = Alignment(horizontal="center")
-                current_row += 1
-
-                sales_count, total_amount, avg_ticket, customers = sales_summary
+            # Datos del resumen
+            summary_data = [
+                ['Ventas Totales', sales_count],
+                ['Monto Total', format_currency(total_amount)],
+                ['Ticket Promedio', format_currency(avg_ticket)],
+                ['Clientes Atendidos', customers]
+            ]
 
-                # Encabezados
-                headers = ['Métrica', 'Valor']
-                for col, header in enumerate(headers, 1):
+            for row_data in summary_data:
+                for col, value in enumerate(row_data, 1):
                     cell = ws[f'{get_column_letter(col)}{current_row}']
-                    cell.value = header
-                    cell.font = header_font
-                    cell.fill = header_fill
-                    cell.alignment = Alignment(horizontal="center")
+                    cell.value = value
+                    cell.font = data_font
                     cell.border = border
+                    if col == 1:
+                        cell.alignment = Alignment(horizontal="left")
+                    else:
+                        cell.alignment = Alignment(horizontal="right")
                 current_row += 1
 
-                # Datos del resumen
-                summary_data = [
-                    ['Ventas Totales', sales_count],
-                    ['Monto Total', format_currency(total_amount)],
-                    ['Ticket Promedio', format_currency(avg_ticket)],
-                    ['Clientes Atendidos', customers]
-                ]
+            current_row += 1
+
+        # Ventas detalladas
+        if sales_data:
+            # Título de sección
+            ws.merge_cells(f'A{current_row}:F{current_row}')
+            sales_title = ws[f'A{current_row}']
+            sales_title.value = "VENTAS DETALLADAS"
+            sales_title.font = subheader_font
+            sales_title.fill = subheader_fill
+            sales_title.alignment = Alignment(horizontal="center")
+            current_row += 1
+
+            # Encabezados
+            headers = ['ID Venta', 'Fecha/Hora', 'Total', 'Método de Pago', 'Tipo Cliente', 'Items']
+            for col, header in enumerate(headers, 1):
+                cell = ws[f'{get_column_letter(col)}{current_row}']
+                cell.value = header
+                cell.font = header_font
+                cell.fill = header_fill
+                cell.alignment = Alignment(horizontal="center")
+                cell.border = border
+            current_row += 1
+
+            # Datos de ventas
+            for sale in sales_data:
+                if len(sale) >= 5:
+                    sale_id, total, payment_method, customer_type, created_at = sale[:5]
+                    items_count = sale[5] if len(sale) > 5 else 0
+
+                    sale_time = DataHelper.adjust_timezone(str(created_at))
+
+                    row_data = [
+                        sale_id,
+                        sale_time,
+                        format_currency(total),
+                        payment_method,
+                        customer_type,
+                        items_count
+                    ]
 
-                for row_data in summary_data:
                     for col, value in enumerate(row_data, 1):
                         cell = ws[f'{get_column_letter(col)}{current_row}']
                         cell.value = value
                         cell.font = data_font
                         cell.border = border
-                        if col == 1:
-                            cell.alignment = Alignment(horizontal="left")
-                        else:
+                        if col in [3]:  # Columnas numéricas
                             cell.alignment = Alignment(horizontal="right")
+                        elif col in [1, 6]:  # ID e Items
+                            cell.alignment = Alignment(horizontal="center")
+                        else:
+                            cell.alignment = Alignment(horizontal="left")
                     current_row += 1
 
-                current_row += 1
+            current_row += 1
 
-            # Ventas detalladas
-            if sales_data:
-                # Título de sección
-                ws.merge_cells(f'A{current_row}:F{current_row}')
-                sales_title = ws[f'A{current_row}']
-                sales_title.value = "VENTAS DETALLADAS"
-                sales_title.font = subheader_font
-                sales_title.fill = subheader_fill
-                sales_title.alignment = Alignment(horizontal="center")
-                current_row += 1
+        # Productos más vendidos
+        if top_products:
+            # Título de sección
+            ws.merge_cells(f'A{current_row}:C{current_row}')
+            products_title = ws[f'A{current_row}']
+            products_title.value = "PRODUCTOS MÁS VENDIDOS"
+            products_title.font = subheader_font
+            products_title.fill = subheader_fill
+            products_title.alignment = Alignment(horizontal="center")
+            current_row += 1
+
+            # Encabezados
+            headers = ['Producto', 'Cantidad', 'Monto Total']
+            for col, header in enumerate(headers, 1):
+                cell = ws[f'{get_column_letter(col)}{current_row}']
+                cell.value = header
+                cell.font = header_font
+                cell.fill = header_fill
+                cell.alignment = Alignment(horizontal="center")
+                cell.border = border
+            current_row += 1
+
+            # Datos de productos
+            for name, quantity, amount in top_products:
+                row_data = [
+                    name or "Producto sin nombre",
+                    quantity or 0,
+                    format_currency(amount or 0)
+                ]
 
-                # Encabezados
-                headers = ['ID Venta', 'Fecha/Hora', 'Total', 'Método de Pago', 'Tipo Cliente', 'Items']
-                for col, header in enumerate(headers, 1):
+                for col, value in enumerate(row_data, 1):
                     cell = ws[f'{get_column_letter(col)}{current_row}']
-                    cell.value = header
-                    cell.font = header_font
-                    cell.fill = header_fill
-                    cell.alignment = Alignment(horizontal="center")
+                    cell.value = value
+                    cell.font = data_font
                     cell.border = border
+                    if col in [2, 3]:  # Columnas numéricas
+                        cell.alignment = Alignment(horizontal="right")
+                    else:
+                        cell.alignment = Alignment(horizontal="left")
                 current_row += 1
 
-                # Datos de ventas
-                for sale in sales_data:
-                    if len(sale) >= 5:
-                        sale_id, total, payment_method, customer_type, created_at = sale[:5]
-                        items_count = sale[5] if len(sale) > 5 else 0
-
-                        sale_time = DataHelper.adjust_timezone(str(created_at))
-
-                        row_data = [
-                            sale_id,
-                            sale_time,
-                            format_currency(total),
-                            payment_method,
-                            customer_type,
-                            items_count
-                        ]
-
-                        for col, value in enumerate(row_data, 1):
-                            cell = ws[f'{get_column_letter(col)}{current_row}']
-                            cell.value = value
-                            cell.font = data_font
-                            cell.border = border
-                            if col in [3]:  # Columnas numéricas
-                                cell.alignment = Alignment(horizontal="right")
-                            elif col in [1, 6]:  # ID e Items
-                                cell.alignment = Alignment(horizontal="center")
-                            else:
-                                cell.alignment = Alignment(horizontal="left")
-                        current_row += 1
-
-                current_row += 1
+            current_row += 1
 
-            # Productos más vendidos
-            if top_products:
-                # Título de sección
-                ws.merge_cells(f'A{current_row}:C{current_row}')
-                products_title = ws[f'A{current_row}']
-                products_title.value = "PRODUCTOS MÁS VENDIDOS"
-                products_title.font = subheader_font
-                products_title.fill = subheader_fill
-                products_title.alignment = Alignment(horizontal="center")
-                current_row += 1
+        # Distribución de pagos
+        if payment_data:
+            # Título de sección
+            ws.merge_cells(f'A{current_row}:C{current_row}')
+            payment_title = ws[f'A{current_row}']
+            payment_title.value = "DISTRIBUCIÓN DE PAGOS"
+            payment_title.font = subheader_font
+            payment_title.fill = subheader_fill
+            payment_title.alignment = Alignment(horizontal="center")
+            current_row += 1
 
-                # Encabezados
-                headers = ['Producto', 'Cantidad', 'Monto Total']
-                for col, header in enumerate(headers, 1):
-                    cell = ws[f'{get_column_letter(col)}{current_row}']
-                    cell.value = header
-                    cell.font = header_font
-                    cell.fill = header_fill
-                    cell.alignment = Alignment(horizontal="center")
-                    cell.border = border
-                current_row += 1
+            # Encabezados
+            headers = ['Método de Pago', 'Cantidad', 'Monto Total']
+            for col, header in enumerate(headers, 1):
+                cell = ws[f'{get_column_letter(col)}{current_row}']
+                cell.value = header
+                cell.font = header_font
+                cell.fill = header_fill
+                cell.alignment = Alignment(horizontal="center")
+                cell.border = border
+            current_row += 1
 
-                # Datos de productos
-                for name, quantity, amount in top_products:
+            # Datos de pagos
+            for method, count, amount in payment_data:
+                if amount > 0:
                     row_data = [
-                        name or "Producto sin nombre",
-                        quantity or 0,
-                        format_currency(amount or 0)
+                        method,
+                        count,
+                        format_currency(amount)
                     ]
 
                     for col, value in enumerate(row_data, 1):
@@ -710,61 +803,13 @@ class ReportsModule:
                             cell.alignment = Alignment(horizontal="left")
                     current_row += 1
 
-                current_row += 1
-
-            # Distribución de pagos
-            if payment_data:
-                # Título de sección
-                ws.merge_cells(f'A{current_row}:C{current_row}')
-                payment_title = ws[f'A{current_row}']
-                payment_title.value = "DISTRIBUCIÓN DE PAGOS"
-                payment_title.font = subheader_font
-                payment_title.fill = subheader_fill
-                payment_title.alignment = Alignment(horizontal="center")
-                current_row += 1
+        # Ajustar ancho de columnas
+        for col in range(1, 7):
+            ws.column_dimensions[get_column_letter(col)].width = 20
 
-                # Encabezados
-                headers = ['Método de Pago', 'Cantidad', 'Monto Total']
-                for col, header in enumerate(headers, 1):
-                    cell = ws[f'{get_column_letter(col)}{current_row}']
-                    cell.value = header
-                    cell.font = header_font
-                    cell.fill = header_fill
-                    cell.alignment = Alignment(horizontal="center")
-                    cell.border = border
-                current_row += 1
-
-                # Datos de pagos
-                for method, count, amount in payment_data:
-                    if amount > 0:
-                        row_data = [
-                            method,
-                            count,
-                            format_currency(amount)
-                        ]
-
-                        for col, value in enumerate(row_data, 1):
-                            cell = ws[f'{get_column_letter(col)}{current_row}']
-                            cell.value = value
-                            cell.font = data_font
-                            cell.border = border
-                            if col in [2, 3]:  # Columnas numéricas
-                                cell.alignment = Alignment(horizontal="right")
-                            else:
-                                cell.alignment = Alignment(horizontal="left")
-                        current_row += 1
-
-            # Ajustar ancho de columnas
-            for col in range(1, 7):
-                ws.column_dimensions[get_column_letter(col)].width = 20
-
-            # Guardar archivo
-            wb.save(filename)
-
-            QMessageBox.information(self.widget, "✅ Exportado", f"Reporte exportado exitosamente a:\n{filename}")
-
-        except Exception as e:
-            QMessageBox.critical(self.widget, "❌ Error", f"Error al exportar reporte:\n{str(e)}")
+        # Guardar archivo
+        wb.save(filename)
+        return filename
 
     def toggle_view_mode(self, is_detailed):
         """Mostrar/ocultar secciones según el modo de vista seleccionado"""
@@ -1,11 +1,16 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
-                             QTableWidget, QTableWidgetItem, QLineEdit, QComboBox,
+                             QTableView, QLineEdit, QComboBox,
                              QHeaderView, QMessageBox, QFrame, QGroupBox, QSpinBox,
                              QScrollArea, QGridLayout, QSizePolicy, QInputDialog, QDialog, 
                              QDialogButtonBox, QTextEdit)
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont, QColor
 from utils.formatters import format_currency
+from utils.money import Money
+from widgets.product_table import (ProductTableModel, ProductFilterProxy, ProductColumn,
+                                   ActionButton, ActionButtonsDelegate, stock_text, stock_color,
+                                   SEARCH_DELAY_MS)
+from widgets.cart_table import CartTableModel, QuantityDelegate
 import random
 from datetime import datetime 
 
@@ -33,17 +38,32 @@ class QuickProductButton(QPushButton):
 
 # Clase principal del Módulo de Ventas
 class SalesModule:
+    # Columnas de la grilla de productos (tuplas del catálogo, como get_products)
+    PRODUCT_COLUMNS = [
+        ProductColumn("Producto", lambda product: product[2]),
+        ProductColumn("Precio", lambda product: format_currency(product[5]), Qt.AlignRight | Qt.AlignVCenter),
+        ProductColumn("Stock", lambda product: stock_text(product[6], 5), Qt.AlignCenter,
+                      lambda product: stock_color(product[6], 5)),
+        ProductColumn("Agregar"),
+    ]
+
     def __init__(self, db):
         self.db = db
-        self.cart_items = []
+        # Items del carrito y total de la venta (ver la propiedad cart_items)
+        self.cart_model = CartTableModel()
+        self.cart_model.totalChanged.connect(self.update_totals)
+        # Productos en memoria, compartidos con los demás módulos (ver db_catalog.py)
+        self.catalog = db.catalog
         self.widget = QWidget()
         self.init_ui()
+        # Una venta o un cambio hecho en otro módulo se ve acá sin recargar
+        self.catalog.add_listener(self.on_catalog_changed)
         
     def get_widget(self):
         return self.widget
         
     def on_enter(self):
-        self.load_products()
+        self.refresh_products()
         # Asegurarse de que el foco esté en el campo de código de barras al entrar
         self.barcode_input.setFocus()
         
@@ -109,9 +129,19 @@ class SalesModule:
         cart_table_group.setStyleSheet("QGroupBox { font-weight: bold; }")
         cart_table_layout = QVBoxLayout(cart_table_group)
         
-        self.cart_table = QTableWidget()
-        self.cart_table.setColumnCount(5)
-        self.cart_table.setHorizontalHeaderLabels(["Producto", "Precio", "Cantidad", "Subtotal", ""])
+        # Cada cambio del carrito redibuja solo su fila; los botones se dibujan
+        self.cart_table = QTableView()
+        self.cart_table.setModel(self.cart_model)
+        self.cart_table.setItemDelegateForColumn(2, QuantityDelegate([
+            ActionButton("-", None, "#ef4444", "#dc2626",
+                         lambda item: self.decrease_quantity(self.cart_model.row_of(item))),
+            ActionButton("+", None, "#10b981", "#059669",
+                         lambda item: self.increase_quantity(self.cart_model.row_of(item))),
+        ], self.cart_table, button_width=28, button_height=28))
+        self.cart_table.setItemDelegateForColumn(4, ActionButtonsDelegate([
+            ActionButton("🗑️", "Eliminar del carrito", "#6b7280", "#4b5563",
+                         lambda item: self.remove_from_cart(self.cart_model.row_of(item))),
+        ], self.cart_table, button_width=32, button_height=32))
         
         header = self.cart_table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.Stretch)
@@ -119,9 +149,13 @@ class SalesModule:
         header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
         header.setSectionResizeMode(3, QHeaderView.ResizeToContents)
         header.setSectionResizeMode(4, QHeaderView.ResizeToContents)
+        header.setResizeContentsPrecision(0)
         
         self.cart_table.setAlternatingRowColors(True)
-        self.cart_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.cart_table.setSelectionBehavior(QTableView.SelectRows)
+        self.cart_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.cart_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.cart_table.verticalHeader().setDefaultSectionSize(38)
         
         cart_table_layout.addWidget(self.cart_table)
         scroll_layout.addWidget(cart_table_group)
@@ -223,7 +257,8 @@ class SalesModule:
         layout.addWidget(cart_frame, 3)
 
         # Conectar doble click para editar precios
-        self.cart_table.cellDoubleClicked.connect(self.on_cart_item_double_click)
+        self.cart_table.doubleClicked.connect(
+            lambda index: self.on_cart_item_double_click(index.row(), index.column()))
         
     def on_cart_item_double_click(self, row, column):
         """Permitir editar precios con doble click - CUMPLIDO"""
@@ -235,16 +270,14 @@ class SalesModule:
                 self.widget, 
                 "💰 Cambiar Precio", 
                 f"Nuevo precio para:\n{item['name']}", 
-                value=current_price, 
+                value=float(current_price), 
                 decimals=2, 
                 min=0.01,
                 max=999999.99
             )
         
-            if ok and new_price != current_price:
-                item['price'] = new_price
-                item['subtotal'] = item['quantity'] * new_price
-                self.update_cart_display()
+            if ok and Money.from_pesos(new_price) != current_price:
+                self.cart_model.set_price(row, Money.from_pesos(new_price))
                 self.show_quick_notification(f"✅ Precio actualizado: {format_currency(new_price)}")
     
     def open_cash_open_dialog(self):
@@ -300,21 +333,21 @@ class SalesModule:
         current_date = datetime.now().strftime("%Y-%m-%d")
 
         try:
-            # Obtener datos para el reporte
-            total_income = self.db.get_cash_register_income_summary(current_date)
-            sales_summary = self.db.get_sales_summary(current_date, current_date)
-            top_products = self.db.get_top_products(current_date, current_date, 5)
-            total_products_sold = self.db.get_total_products_sold(current_date, current_date)
-            inventory_value = self.db.get_inventory_value()
-            total_products = self.db.get_total_products()
-            low_stock_count = self.db.get_low_stock_count()
-            out_of_stock_count = self.db.get_out_of_stock_count()
+            # Obtener todos los datos del reporte en una sola lectura
+            snapshot = self.db.get_cash_close_snapshot(current_date)
+            total_income = snapshot['total_income']
+            top_products = snapshot['top_products']
+            total_products_sold = snapshot['total_products_sold']
+            inventory_value = snapshot['inventory_value']
+            total_products = snapshot['total_products']
+            low_stock_count = snapshot['low_stock_count']
+            out_of_stock_count = snapshot['out_of_stock_count']
 
             # Extraer datos de ventas
-            if sales_summary and len(sales_summary) >= 4:
-                total_sales, total_amount, avg_ticket, unique_customers = sales_summary
-            else:
-                total_sales, total_amount, avg_ticket, unique_customers = 0, 0.0, 0.0, 0
+            total_sales = snapshot['total_sales']
+            total_amount = snapshot['total_amount']
+            avg_ticket = snapshot['average_ticket']
+            unique_customers = snapshot['unique_customers']
 
         except Exception as e:
             QMessageBox.critical(self.widget, "Error de Base de Datos", f"No se pudo calcular el resumen de caja:\n{e}")
@@ -495,7 +528,12 @@ Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
         name_search_layout = QHBoxLayout()
         self.name_search_input = QLineEdit()
         self.name_search_input.setPlaceholderText("Buscar producto por nombre...")
-        self.name_search_input.textChanged.connect(self.filter_products)
+        # Se filtra cuando se deja de escribir, no en cada tecla
+        self.search_timer = QTimer(self.widget)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.filter_products)
+        self.name_search_input.textChanged.connect(self.search_timer.start)
         clear_search_btn = QPushButton("X")
         clear_search_btn.setFixedWidth(30)
         clear_search_btn.setToolTip("Limpiar búsqueda")
@@ -526,10 +564,16 @@ Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
         
         products_list_layout.addLayout(filter_layout)
         
-        # Tabla de productos
-        self.products_table = QTableWidget()
-        self.products_table.setColumnCount(4)
-        self.products_table.setHorizontalHeaderLabels(["Producto", "Precio", "Stock", "Agregar"])
+        # Tabla de productos: modelo + proxy con las filas filtradas, sin widgets por fila
+        self.products_model = ProductTableModel(self.PRODUCT_COLUMNS, self.catalog)
+        self.products_proxy = ProductFilterProxy(self.products_model)
+        self.products_table = QTableView()
+        self.products_table.setModel(self.products_proxy)
+        self.products_table.setItemDelegateForColumn(3, ActionButtonsDelegate([
+            ActionButton("➕ Agregar", None, "#10b981", "#059669",
+                         lambda product: self.add_to_cart(product[0], product[2], product[5], product[6]),
+                         lambda product: product[6] > 0),
+        ], self.products_table))
         
         header = self.products_table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.Stretch)
@@ -537,12 +581,18 @@ Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
         header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
         header.setSectionResizeMode(3, QHeaderView.Fixed)
         header.resizeSection(3, 100)
+        # Las columnas ajustadas al contenido miden solo las filas visibles (por defecto, hasta 1000)
+        header.setResizeContentsPrecision(0)
         
         self.products_table.setAlternatingRowColors(True)
-        self.products_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.products_table.setSelectionBehavior(QTableView.SelectRows)
+        self.products_table.setEditTriggers(QTableView.NoEditTriggers)
         self.products_table.setSortingEnabled(False)
         
+        self.products_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.products_table.verticalHeader().setDefaultSectionSize(45)
+        # Sin números de fila: el encabezado vertical tiene una sección por fila visible
+        self.products_table.verticalHeader().hide()
         
         products_list_layout.addWidget(self.products_table)
         products_layout.addWidget(products_list_group)
@@ -552,101 +602,61 @@ Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
     def load_products(self):
         """Cargar productos desde la base de datos REAL"""
         try:
-            products_from_db = self.db.get_products()
-        
-            # Asumimos que la tupla de productos es: 
-            # (id, code, name, category, buy_price, sell_price, stock, min_stock)
-            self.all_products = []
-            for product in products_from_db:
-                product_id, code, name, category, buy_price, sell_price, stock, min_stock = product
-                self.all_products.append((
-                    product_id, name, sell_price, stock, code, category
-                ))
-        
-            self.filter_products()
-            
+            # La grilla se actualiza con el aviso del catálogo (on_catalog_changed)
+            self.catalog.load()
         except Exception as e:
             QMessageBox.critical(self.widget, "Error", f"Error al cargar productos:\n{str(e)}")
-            self.all_products = []
+
+    def refresh_products(self):
+        """
+        Traer solo los productos que cambiaron desde la última lectura del
+        catálogo (por ejemplo, el stock de lo recién vendido). Las filas se
+        actualizan con el aviso del catálogo.
+        """
+        if not self.catalog.loaded:
+            self.load_products()
+            return
+        try:
+            self.catalog.refresh()
+        except Exception as e:
+            print(f"Error actualizando productos: {e}")
+
+    def on_catalog_changed(self, change):
+        # Un stock nuevo puede cambiar el orden de la grilla; si no, set_rows no redibuja
+        self.filter_products()
+
+    @staticmethod
+    def sales_product(row):
+        """Tupla de la pantalla de ventas a partir de una fila de get_products"""
+        # (id, code, name, category, buy_price, sell_price, stock, min_stock)
+        product_id, code, name, category, buy_price, sell_price, stock, min_stock = row
+        return (product_id, name, sell_price, stock, code, category)
+
+    def find_product_by_code(self, code):
+        """
+        Producto con ese código de barras: del índice del catálogo y, si no está
+        (por ejemplo, dado de alta desde otra caja), de la base. Devuelve
+        (id, nombre, precio, stock, código, categoría) o None.
+        """
+        slot = self.catalog.find_by_code(code)
+        if slot is None:
+            return None
+        return self.sales_product(self.catalog.product(slot))
             
     def filter_products(self):
         """Filtrar productos por categoría y búsqueda"""
         try:
-            if not hasattr(self, 'all_products'):
-                return
-                
+            self.search_timer.stop()
             category_filter = self.category_filter.currentText()
-            search_text = self.name_search_input.text().strip().lower()
-            
-            filtered_products = []
-            for product in self.all_products:
-                product_id, name, price, stock, code, category = product
-                
-                if category_filter != "Todas" and category != category_filter:
-                    continue
-                    
-                if search_text and search_text not in name.lower():
-                    continue
-                    
-                filtered_products.append(product)
-            
-            # Actualizar tabla
-            self.products_table.setRowCount(len(filtered_products))
-            
-            for row, product in enumerate(filtered_products):
-                product_id, name, price, stock, code, category = product
-                
-                # Producto
-                name_item = QTableWidgetItem(name)
-                name_item.setData(Qt.UserRole, product_id)
-                self.products_table.setItem(row, 0, name_item)
-                
-                # Precio
-                price_item = QTableWidgetItem(format_currency(price))
-                price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.products_table.setItem(row, 1, price_item)
-                
-                # Stock con indicador visual
-                if stock == 0:
-                    stock_text = "❌ Agotado"
-                    stock_style = "color: #ef4444; font-weight: bold;"
-                elif stock <= 5:
-                    stock_text = f"⚠️ {stock}"
-                    stock_style = "color: #f59e0b; font-weight: bold;"
-                else:
-                    stock_text = f"✅ {stock}"
-                    stock_style = "color: #10b981; font-weight: bold;"
-                
-                stock_item = QTableWidgetItem(stock_text)
-                stock_item.setTextAlignment(Qt.AlignCenter)
-                stock_item.setData(Qt.UserRole, stock_style)
-                self.products_table.setItem(row, 2, stock_item)
-                
-                # Botón agregar
-                add_btn = QPushButton("➕ Agregar")
-                add_btn.setFixedHeight(35)
-                add_btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #10b981;
-                        color: white;
-                        border: none;
-                        border-radius: 6px;
-                        font-weight: 600;
-                        font-size: 12px;
-                        padding: 8px;
-                    }
-                    QPushButton:hover {
-                        background-color: #059669;
-                    }
-                    QPushButton:disabled {
-                        background-color: #9ca3af;
-                        color: #6b7280;
-                    }
-                """)
-                add_btn.setEnabled(stock > 0)
-                add_btn.clicked.connect(lambda checked, pid=product_id, n=name, p=price, s=stock: 
-                                            self.add_to_cart(pid, n, p, s))
-                self.products_table.setCellWidget(row, 3, add_btn)
+
+            # Búsqueda en el índice del catálogo: las que mejor coinciden primero
+            groups = self.catalog.search_index.search(self.name_search_input.text())
+            rows = self.products_proxy.ranked_rows(groups)
+            if category_filter != "Todas":
+                in_category = self.catalog.category_slots(category_filter)
+                rows = [row for row in rows if row in in_category]
+
+            self.products_proxy.set_rows(rows)
                 
         except Exception as e:
             print(f"Error filtrando productos: {e}")
@@ -665,17 +675,13 @@ Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
             self.barcode_input.setFocus() 
             return
     
-        product_found = False
-        for product in self.all_products: 
+        product = self.find_product_by_code(barcode)
+        if product is not None:
             product_id, name, price, stock, code, category = product
-            if code == barcode:
-                self.add_to_cart(product_id, name, price, stock)
-                self.barcode_input.clear()
-                self.barcode_input.setFocus() # CLAVE: MANTENER EL FOCO
-                product_found = True
-                break
-    
-        if not product_found:
+            self.add_to_cart(product_id, name, price, stock)
+            self.barcode_input.clear()
+            self.barcode_input.setFocus() # CLAVE: MANTENER EL FOCO
+        else:
             QMessageBox.warning(self.widget, "Producto no encontrado", 
                                 f"❌ No se encontró ningún producto con el código:\n{barcode}")
             self.barcode_input.selectAll() 
@@ -683,16 +689,14 @@ Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
             
     def add_to_cart(self, product_id, name, price, stock):
         """Agregar producto al carrito"""
-        for item in self.cart_items:
+        for row, item in enumerate(self.cart_items):
             if item['product_id'] == product_id:
                 if item['quantity'] >= stock:
                     QMessageBox.warning(self.widget, "Stock insuficiente", 
                                         f"❌ No hay suficiente stock de {name}\n\nStock disponible: {stock}")
                     return
                     
-                item['quantity'] += 1
-                item['subtotal'] = item['quantity'] * item['price']
-                self.update_cart_display()
+                self.cart_model.set_quantity(row, item['quantity'] + 1)
                 return
                 
         if stock <= 0:
@@ -700,7 +704,9 @@ Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
                                 f"❌ El producto {name} está agotado")
             return
             
-        self.cart_items.append({
+        # Importes del carrito en Money (centavos enteros): el total es la suma exacta de los subtotales
+        price = Money.from_pesos(price)
+        self.cart_model.add_item({
             'product_id': product_id,
             'name': name,
             'price': price,
@@ -709,114 +715,32 @@ Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
             'stock': stock
         })
         
-        self.update_cart_display()
-        
     def add_quick_product(self, name, price, code):
         """Agregar producto rápido al carrito"""
-        for product in self.all_products:
+        product = self.find_product_by_code(code)
+        if product is not None:
             product_id, p_name, p_price, stock, p_code, category = product
-            if p_code == code:
-                self.add_to_cart(product_id, name, price, stock) 
-                return
+            self.add_to_cart(product_id, name, price, stock)
+            return
                 
         QMessageBox.warning(self.widget, "Producto no disponible", 
                             f"El producto {name} no está disponible en este momento")
         
-    def update_cart_display(self):
-        """Actualizar la visualización del carrito"""
-        self.cart_table.setRowCount(len(self.cart_items))
-        
-        for row, item in enumerate(self.cart_items):
-            # Producto
-            name_item = QTableWidgetItem(item['name'])
-            self.cart_table.setItem(row, 0, name_item)
-            
-            # Precio unitario
-            price_item = QTableWidgetItem(format_currency(item['price']))
-            price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.cart_table.setItem(row, 1, price_item)
-            
-            # Cantidad con controles
-            qty_widget = QWidget()
-            qty_layout = QHBoxLayout(qty_widget)
-            qty_layout.setContentsMargins(4, 2, 4, 2)
-            qty_layout.setSpacing(4)
-            
-            minus_btn = QPushButton("-")
-            minus_btn.setFixedSize(28, 28)
-            minus_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #ef4444; 
-                    color: white; 
-                    border-radius: 4px;
-                    font-weight: bold;
-                }
-                QPushButton:hover {
-                    background-color: #dc2626;
-                }
-            """)
-            minus_btn.clicked.connect(lambda checked, r=row: self.decrease_quantity(r))
-            
-            qty_label = QLabel(str(item['quantity']))
-            qty_label.setAlignment(Qt.AlignCenter)
-            qty_label.setStyleSheet("font-weight: bold; padding: 0 8px; min-width: 30px;")
-            qty_label.setMinimumWidth(30)
-            
-            plus_btn = QPushButton("+")
-            plus_btn.setFixedSize(28, 28)
-            plus_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #10b981; 
-                    color: white; 
-                    border-radius: 4px;
-                    font-weight: bold;
-                }
-                QPushButton:hover {
-                    background-color: #059669;
-                }
-            """)
-            plus_btn.clicked.connect(lambda checked, r=row: self.increase_quantity(r))
-            
-            qty_layout.addWidget(minus_btn)
-            qty_layout.addWidget(qty_label)
-            qty_layout.addWidget(plus_btn)
-            qty_layout.addStretch()
-            
-            self.cart_table.setCellWidget(row, 2, qty_widget)
-            
-            # Subtotal
-            subtotal_item = QTableWidgetItem(format_currency(item['subtotal']))
-            subtotal_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.cart_table.setItem(row, 3, subtotal_item)
-            
-            # Botón eliminar
-            remove_btn = QPushButton("🗑️")
-            remove_btn.setToolTip("Eliminar del carrito")
-            remove_btn.setFixedSize(32, 32)
-            remove_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #6b7280; 
-                    color: white; 
-                    border-radius: 6px;
-                    font-size: 14px;
-                }
-                QPushButton:hover {
-                    background-color: #4b5563;
-                }
-            """)
-            remove_btn.clicked.connect(lambda checked, r=row: self.remove_from_cart(r))
-            self.cart_table.setCellWidget(row, 4, remove_btn)
-            
-        self.update_totals()
+    @property
+    def cart_items(self):
+        """Items del carrito: la lista del modelo de la tabla (se modifica con sus métodos)"""
+        return self.cart_model.items
+
+    @cart_items.setter
+    def cart_items(self, items):
+        self.cart_model.set_items(items)
         
     def increase_quantity(self, row):
         """Aumentar cantidad de un producto en el carrito"""
         if 0 <= row < len(self.cart_items):
             item = self.cart_items[row]
             if item['quantity'] < item['stock']:
-                item['quantity'] += 1
-                item['subtotal'] = item['quantity'] * item['price']
-                self.update_cart_display()
+                self.cart_model.set_quantity(row, item['quantity'] + 1)
             else:
                 QMessageBox.warning(self.widget, "Stock insuficiente", 
                                     f"❌ No hay suficiente stock de {item['name']}\n\nStock disponible: {item['stock']}")
@@ -826,17 +750,14 @@ Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
         if 0 <= row < len(self.cart_items):
             item = self.cart_items[row]
             if item['quantity'] > 1:
-                item['quantity'] -= 1
-                item['subtotal'] = item['quantity'] * item['price']
-                self.update_cart_display()
+                self.cart_model.set_quantity(row, item['quantity'] - 1)
             else:
                 self.remove_from_cart(row)
                 
     def remove_from_cart(self, row):
         """Eliminar producto del carrito"""
         if 0 <= row < len(self.cart_items):
-            self.cart_items.pop(row)
-            self.update_cart_display()
+            self.cart_model.remove_item(row)
             
     def clear_cart(self):
         """Limpiar todo el carrito"""
@@ -850,12 +771,9 @@ Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
             )
             if reply == QMessageBox.Yes:
                 self.cart_items = []
-                self.update_cart_display()
                 
-    def update_totals(self):
-        """Actualizar totales de la venta - SIMPLIFICADO"""
-        total = sum(item['subtotal'] for item in self.cart_items)
-        
+    def update_totals(self, total):
+        """Mostrar el total de la venta (el modelo del carrito lo lleva al día, sin volver a sumar)"""
         self.subtotal_value.setText(format_currency(total))
         self.total_value.setText(format_currency(total))
         
@@ -873,7 +791,7 @@ Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
                                     f"❌ No hay suficiente stock de:\n{item['name']}\n\nStock disponible: {item['stock']}")
                 return
             
-        total = sum(item['subtotal'] for item in self.cart_items)
+        total = self.cart_model.total
     
         # Mostrar resumen de venta
         items_summary = "\n".join([f"• {item['name']} x{item['quantity']} = {format_currency(item['subtotal'])}" 
@@ -923,9 +841,9 @@ Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
                 # Mostrar ticket
                 ticket_text = self.print_ticket(sale_id, sale_data, self.cart_items, total)
             
-                # Limpiar carrito y recargar productos
+                # Limpiar carrito y actualizar los productos vendidos
                 self.clear_cart()
-                self.load_products()
+                self.refresh_products()
             
                 current_time = datetime.now().strftime("%H:%M")
 
@@ -0,0 +1,305 @@
+"""
+Generador de datos sintéticos para probar la base con años de historia.
+
+Carga en una base de prueba (nunca en kiosco_pos.db):
+- un catálogo de N productos con popularidad desigual (unos pocos se venden mucho),
+- ventas con canastas de tamaño realista, concentradas en las horas y días de más
+  movimiento de un kiosco,
+- ventas a cuenta corriente con sus clientes y abonos posteriores,
+- una apertura y un cierre de caja por cada día con ventas.
+
+Los importes se escriben directamente en centavos enteros, como los guarda Database.
+
+Con la misma semilla se obtiene exactamente la misma base.
+
+Uso:
+    python synthetic_data.py prueba.db [--productos 2000] [--items 1000000] [--dias 730]
+"""
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from database import Database
+from utils.money import Money
+
+DEFAULT_END_DATE = datetime(2024, 12, 31)
+
+# Métodos de pago con el texto que guarda SalesModule y su peso relativo
+PAYMENT_METHODS = (
+    ("💵 Efectivo", 55),
+    ("📱 Mercado Pago", 25),
+    ("💳 Débito", 12),
+    ("Cuenta Corriente", 8),
+)
+CREDIT_METHOD = "Cuenta Corriente"
+
+# Movimiento por hora del día (7 a 23 hs) y por día de la semana (lunes = 0)
+HOUR_WEIGHTS = {7: 3, 8: 6, 9: 6, 10: 5, 11: 6, 12: 8, 13: 7, 14: 4, 15: 4,
+                16: 5, 17: 7, 18: 9, 19: 10, 20: 9, 21: 7, 22: 4, 23: 2}
+WEEKDAY_WEIGHTS = (9, 9, 10, 10, 13, 14, 8)
+
+# Canasta: casi siempre 1 a 3 productos, a veces una compra grande
+BASKET_STOP_PROBABILITY = 0.45
+MAX_BASKET_LINES = 20
+QUANTITY_WEIGHTS = ((1, 80), (2, 14), (3, 3), (4, 2), (6, 1))
+
+# Sesgo de popularidad de los productos (Zipf): mayor => más concentrado
+POPULARITY_EXPONENT = 0.9
+
+CHUNK_SALES = 20000
+
+
+def _cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+
+def _basket_size(rng):
+    lines = 1
+    while lines < MAX_BASKET_LINES and rng.random() > BASKET_STOP_PROBABILITY:
+        lines += 1
+    return lines
+
+
+def expected_basket_size():
+    """Líneas promedio por venta de la distribución de canastas (sin el tope)"""
+    return 1 / BASKET_STOP_PROBABILITY
+
+
+def generate_products(db, total_products, rng):
+    """Catálogo sintético. Devuelve [(id, nombre, precio de venta, precio de compra)] en centavos"""
+    with db.transaction() as cursor:
+        cursor.execute('SELECT id FROM categories ORDER BY id')
+        category_ids = [row[0] for row in cursor.fetchall()] or [None]
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM products')
+        first_id = cursor.fetchone()[0] + 1
+
+        products = []
+        rows = []
+        for offset in range(total_products):
+            product_id = first_id + offset
+            buy_price = Money.to_cents(rng.uniform(80, 4000))
+            sell_price = (Money.from_cents(buy_price) * rng.uniform(1.25, 1.6)).cents
+            name = f"Producto {product_id:06d}"
+            products.append((product_id, name, sell_price, buy_price))
+            rows.append((product_id, f"779{product_id:010d}", name, rng.choice(category_ids), "",
+                         buy_price, sell_price, rng.choice((0, 2, 4)) if rng.random() < 0.1 else rng.randint(5, 200),
+                         5))
+        cursor.executemany('''
+            INSERT INTO products (id, code, name, category_id, description, buy_price, sell_price, stock, min_stock)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+    return products
+
+
+def generate_customers(db, total_customers, rng):
+    """Clientes de cuenta corriente. Devuelve [(id, nombre)]"""
+    with db.transaction() as cursor:
+        customers = []
+        for index in range(total_customers):
+            name = f"Cliente {index + 1:04d}"
+            cursor.execute('INSERT INTO customers (name, phone) VALUES (?, ?)',
+                           (name, f"11{rng.randint(10000000, 99999999)}"))
+            customers.append((cursor.lastrowid, name))
+    return customers
+
+
+def _day_plan(total_sales, days, end_date):
+    """Cantidad de ventas de cada día, según el peso del día de la semana"""
+    first_day = end_date - timedelta(days=days - 1)
+    dates = [first_day + timedelta(days=offset) for offset in range(days)]
+    weights = [WEEKDAY_WEIGHTS[date.weekday()] for date in dates]
+    total_weight = sum(weights)
+    plan = []
+    assigned = 0
+    accumulated = 0
+    for date, weight in zip(dates, weights):
+        # Reparto acumulado: la suma de los días da exactamente total_sales
+        accumulated += weight
+        target = round(total_sales * accumulated / total_weight)
+        plan.append((date, target - assigned))
+        assigned = target
+    return plan
+
+
+def _sale_times(rng, date, count, hours, hour_cumulative):
+    times = []
+    for _ in range(count):
+        hour = hours[bisect.bisect_left(hour_cumulative, rng.random() * hour_cumulative[-1])]
+        times.append(date.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60)))
+    times.sort()
+    return times
+
+
+def generate_sales(db, products, customers, total_sales, days, end_date, rng, progress=None):
+    """
+    Ventas, items y abonos de cuenta corriente, en bloques de CHUNK_SALES ventas
+    por transacción. Devuelve (ventas, items, abonos).
+    """
+    popularity = _cumulative(1 / (rank + 1) ** POPULARITY_EXPONENT for rank in range(len(products)))
+    # El orden de popularidad no coincide con el id
+    ranked_products = products[:]
+    rng.shuffle(ranked_products)
+    hours = sorted(HOUR_WEIGHTS)
+    hour_cumulative = _cumulative(HOUR_WEIGHTS[hour] for hour in hours)
+    payment_names = [name for name, _ in PAYMENT_METHODS]
+    payment_cumulative = _cumulative(weight for _, weight in PAYMENT_METHODS)
+    quantities = [quantity for quantity, _ in QUANTITY_WEIGHTS]
+    quantity_cumulative = _cumulative(weight for _, weight in QUANTITY_WEIGHTS)
+    last_moment = end_date.replace(hour=23, minute=59, second=59)
+
+    with db.transaction() as cursor:
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM sales')
+        next_sale_id = cursor.fetchone()[0] + 1
+
+    counts = {'sales': 0, 'sale_items': 0, 'credit_payments': 0}
+    sales, items, payments = [], [], []
+
+    def flush():
+        with db.transaction() as cursor:
+            cursor.executemany('''
+                INSERT INTO sales (id, customer_id, total, payment_method, payment_status, customer_type, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', sales)
+            cursor.executemany('''
+                INSERT INTO sale_items (sale_id, product_id, product_name, quantity, price, subtotal, unit_cost)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', items)
+            cursor.executemany('''
+                INSERT INTO credit_payments (customer_id, sale_id, amount, payment_method, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', payments)
+        counts['sales'] += len(sales)
+        counts['sale_items'] += len(items)
+        counts['credit_payments'] += len(payments)
+        sales.clear()
+        items.clear()
+        payments.clear()
+        if progress:
+            progress(counts)
+
+    for date, count in _day_plan(total_sales, days, end_date):
+        for created_at in _sale_times(rng, date, count, hours, hour_cumulative):
+            sale_id = next_sale_id
+            next_sale_id += 1
+            lines = _basket_size(rng)
+            chosen = rng.choices(ranked_products, cum_weights=popularity, k=lines)
+            total = 0
+            for product_id, name, price, cost in chosen:
+                quantity = rng.choices(quantities, cum_weights=quantity_cumulative)[0]
+                subtotal = price * quantity
+                items.append((sale_id, product_id, name, quantity, price, subtotal, cost))
+                total += subtotal
+
+            payment_method = rng.choices(payment_names, cum_weights=payment_cumulative)[0]
+            if payment_method == CREDIT_METHOD and customers:
+                customer_id, customer_name = rng.choice(customers)
+                timestamp = created_at.strftime("%Y-%m-%d %H:%M:%S")
+                sales.append((sale_id, customer_id, total, payment_method, 'cuenta_corriente', customer_name, timestamp))
+                # La mayoría de las cuentas se pagan a los pocos días, a veces en parte
+                if rng.random() < 0.8:
+                    paid_at = created_at + timedelta(days=rng.randint(1, 20), hours=rng.randint(0, 3))
+                    if paid_at <= last_moment:
+                        amount = total if rng.random() < 0.7 else (Money(total) * rng.uniform(0.3, 0.9)).cents
+                        payments.append((customer_id, sale_id, amount, rng.choice(payment_names[:2]),
+                                         paid_at.strftime("%Y-%m-%d %H:%M:%S")))
+            else:
+                if payment_method == CREDIT_METHOD:
+                    payment_method = payment_names[0]
+                sales.append((sale_id, None, total, payment_method, 'pagado', "🧑 Consumidor Final",
+                              created_at.strftime("%Y-%m-%d %H:%M:%S")))
+
+            if len(sales) >= CHUNK_SALES:
+                flush()
+    if sales or payments:
+        flush()
+    return counts
+
+
+def generate_cash_records(db, rng):
+    """Una apertura y un cierre por cada día con ventas; el cierre suma lo cobrado en el día"""
+    with db.transaction() as cursor:
+        cursor.execute('SELECT date FROM sales_daily ORDER BY date')
+        dates = [row[0] for row in cursor.fetchall()]
+        cursor.executemany('''
+            INSERT OR IGNORE INTO cash_opens (date, opening_amount, notes, created_at) VALUES (?, ?, '', ?)
+        ''', ((date, Money.to_cents(rng.choice((5000, 10000, 15000, 20000))), f"{date} 07:00:00") for date in dates))
+        cursor.execute('''
+            INSERT OR IGNORE INTO cash_closes (date, total_income, notes, created_at)
+            SELECT d.date,
+                   d.paid_amount + COALESCE((SELECT SUM(cp.amount) FROM credit_payments cp
+                                             WHERE cp.created_at >= d.date
+                                               AND cp.created_at < DATE(d.date, '+1 day')), 0),
+                   '', d.date || ' 23:30:00'
+            FROM sales_daily d
+        ''')
+        return len(dates)
+
+
+def update_customer_balances(db):
+    """Saldo de cada cliente: lo vendido a cuenta corriente menos lo abonado"""
+    with db.transaction() as cursor:
+        cursor.execute('''
+            UPDATE customers SET current_credit =
+                COALESCE((SELECT SUM(total) FROM sales
+                          WHERE customer_id = customers.id AND payment_status = 'cuenta_corriente'), 0)
+                - COALESCE((SELECT SUM(amount) FROM credit_payments WHERE customer_id = customers.id), 0)
+        ''')
+
+
+def generate_dataset(db, products=2000, sale_items=100000, sales=None, days=730, customers=50,
+                     end_date=DEFAULT_END_DATE, seed=42, progress=None):
+    """
+    Cargar un conjunto completo de datos sintéticos en `db`.
+
+    La cantidad de ventas se deriva de `sale_items` (según el tamaño promedio de
+    canasta) salvo que se indique `sales`. Devuelve las cantidades generadas.
+    """
+    rng = random.Random(seed)
+    if sales is None:
+        sales = max(1, round(sale_items / expected_basket_size()))
+    catalog = generate_products(db, products, rng)
+    accounts = generate_customers(db, customers, rng)
+    counts = generate_sales(db, catalog, accounts, sales, days, end_date, rng, progress)
+    update_customer_balances(db)
+    counts['cash_days'] = generate_cash_records(db, rng)
+    counts['products'] = len(catalog)
+    counts['customers'] = len(accounts)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generar una base de prueba con datos sintéticos")
+    parser.add_argument("destino", help="archivo de base a crear (no debe existir)")
+    parser.add_argument("--productos", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=1000000, help="items de venta aproximados")
+    parser.add_argument("--ventas", type=int, default=None, help="cantidad exacta de ventas (ignora --items)")
+    parser.add_argument("--dias", type=int, default=730)
+    parser.add_argument("--clientes", type=int, default=50)
+    parser.add_argument("--hasta", default=DEFAULT_END_DATE.strftime("%Y-%m-%d"), help="último día con ventas")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.destino):
+        print(f"❌ {args.destino} ya existe: el generador solo escribe en bases nuevas")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    db = Database(args.destino)
+    counts = generate_dataset(
+        db, products=args.productos, sale_items=args.items, sales=args.ventas, days=args.dias,
+        customers=args.clientes, end_date=datetime.strptime(args.hasta, "%Y-%m-%d"), seed=args.semilla,
+        progress=lambda c: print(f"  {c['sales']} ventas, {c['sale_items']} items...", end="\r"),
+    )
+    db.close_connection()
+    print(f"\n✅ {args.destino} generada en {time.perf_counter() - started:.1f} s")
+    for key, value in counts.items():
+        print(f"  {key}: {value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# Los módulos de la aplicación están en la raíz del repositorio (sin paquete)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks", "Benchmarks de Database (tests/test_benchmarks.py)")
+    group.addoption("--escalas", default="10k", help="escalas de items de venta: 10k, 1m, 10m (separadas por coma)")
+    group.addoption("--datos", default=None, help="carpeta donde guardar y reutilizar las bases sintéticas")
+    group.addoption("--repeticiones", type=int, default=30, help="llamadas medidas por método")
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Base nueva en un directorio temporal (nunca kiosco_pos.db)"""
+    database = Database(str(tmp_path / "prueba.db"))
+    yield database
+    database.close_connection()
@@ -0,0 +1,73 @@
+"""
+Archivo de ventas antiguas: con las ventas de los meses viejos en
+archive_AAAA.db, los reportes devuelven lo mismo que sobre la base sin
+archivar, y volver a archivar no mueve nada ni toca los resúmenes.
+"""
+import shutil
+from datetime import timedelta
+
+import pytest
+
+from benchmark_db import SEED_END_DATE
+from database import Database
+from synthetic_data import generate_dataset
+
+YEARS = 3
+ARCHIVE_DAYS = 365
+END = SEED_END_DATE.strftime("%Y-%m-%d")
+RECENT_START = (SEED_END_DATE - timedelta(days=29)).strftime("%Y-%m-%d")
+OLD_DAY = (SEED_END_DATE - timedelta(days=YEARS * 365 - 100)).strftime("%Y-%m-%d")
+BOUNDARY = (SEED_END_DATE - timedelta(days=ARCHIVE_DAYS)).replace(day=1)
+AROUND_BOUNDARY = ((BOUNDARY - timedelta(days=10)).strftime("%Y-%m-%d"),
+                   (BOUNDARY + timedelta(days=10)).strftime("%Y-%m-%d"))
+
+REPORTS = [
+    ("ventas_mes_reciente", lambda db: db.get_sales_report(RECENT_START, END)),
+    ("detalle_mes_reciente", lambda db: db.get_detailed_sales_report(RECENT_START, END)),
+    ("medios_de_pago_mes_reciente", lambda db: db.get_payment_methods_distribution(RECENT_START, END)),
+    ("ventas_toda_la_historia", lambda db: db.get_sales_report()),
+    ("detalle_cruza_el_corte", lambda db: db.get_detailed_sales_report(*AROUND_BOUNDARY)),
+    ("medios_de_pago_toda_la_historia", lambda db: db.get_payment_methods_distribution()),
+    ("movimientos_dia_archivado", lambda db: db.get_detailed_movements(OLD_DAY)),
+    ("ingresos_de_caja_dia_archivado", lambda db: db.get_cash_register_income_summary(OLD_DAY)),
+    ("resumen_toda_la_historia", lambda db: db.get_sales_summary()),
+]
+
+
+@pytest.fixture(scope="module")
+def live_and_archived(tmp_path_factory):
+    """(base sin archivar, copia con las ventas viejas archivadas, ventas archivadas por año)"""
+    live_path = tmp_path_factory.mktemp("sin_archivar") / "pos.db"
+    archived_path = tmp_path_factory.mktemp("archivada") / "pos.db"
+    db = Database(str(live_path))
+    generate_dataset(db, products=300, sale_items=20000, days=YEARS * 365, end_date=SEED_END_DATE)
+    db.get_connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    db.close_connection()
+    shutil.copy(live_path, archived_path)
+
+    live_db, archived_db = Database(str(live_path)), Database(str(archived_path))
+    archived = archived_db.archive_old_sales(ARCHIVE_DAYS, reference_date=END)
+    yield live_db, archived_db, archived
+    live_db.close_connection()
+    archived_db.close_connection()
+
+
+def test_old_sales_leave_the_live_base(live_and_archived):
+    live_db, archived_db, archived = live_and_archived
+    count = 'SELECT COUNT(*) FROM sales'
+    live_sales = live_db.get_connection().execute(count).fetchone()[0]
+    remaining = archived_db.get_connection().execute(count).fetchone()[0]
+
+    assert archived and remaining + sum(archived.values()) == live_sales
+
+
+@pytest.mark.parametrize("call", [report[1] for report in REPORTS], ids=[report[0] for report in REPORTS])
+def test_reports_unchanged_after_archiving(live_and_archived, call):
+    live_db, archived_db, _ = live_and_archived
+    assert call(archived_db) == call(live_db)
+
+
+def test_second_run_moves_nothing(live_and_archived):
+    _, archived_db, _ = live_and_archived
+    assert archived_db.archive_old_sales(ARCHIVE_DAYS, reference_date=END) == {}
+    assert not archived_db.check_inventory_stats()
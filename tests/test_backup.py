@@ -0,0 +1,130 @@
+"""
+Respaldos: verify detecta un archivo cambiado, la rotación nunca borra el
+último respaldo verificado y la restauración usa el verificado más nuevo que
+se pueda aplicar (marcando como fallidos los que no), más el diario posterior.
+"""
+import os
+
+import pytest
+
+import db_backup
+from benchmark_db import make_basket, seed_products, seed_sales
+from database import Database
+from db_backup import BackupCatalog, restore_latest_backup
+from db_journal import JournalGapError, table_digests
+
+SALE_DATA = {'total': 0, 'payment_method': '💵 Efectivo', 'customer_type': '🧑 Consumidor Final'}
+
+
+@pytest.fixture
+def backed_up(tmp_path):
+    """
+    (ruta de la base, catálogo, entradas de los tres respaldos del más viejo
+    al más nuevo, digests de la base al cerrarla). Entre un respaldo y otro
+    hay ventas nuevas, y después del último otra más, todas en el diario.
+    """
+    path = str(tmp_path / "pos.db")
+    db = Database(path)
+    seed_products(db, 200)
+    with db.transaction() as cursor:
+        cursor.execute('UPDATE products SET stock = 1000000')
+    seed_sales(db, 2000, total_products=200)
+
+    entries = []
+    for _ in range(3):
+        db.save_sale(SALE_DATA, make_basket(3))
+        job = db.backup_service.backup_now()
+        assert job.verified
+        entries.append(job.entry)
+    db.save_sale(SALE_DATA, make_basket(3))
+    db.ship_change_journal()
+    db.get_connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    catalog = db.backup_service.catalog
+    db.close_connection()
+    return path, catalog, entries, table_digests(path)
+
+
+def damage(catalog, entry):
+    path = catalog.file_path(entry)
+    with open(path, "r+b") as f:
+        f.seek(os.path.getsize(path) // 2)
+        f.write(b"\0" * 64)
+
+
+def status(catalog, entry):
+    return next(e["status"] for e in catalog.entries() if e["file"] == entry["file"])
+
+
+def test_verify_detects_sha256_mismatch(backed_up):
+    _, catalog, entries, _ = backed_up
+    damage(catalog, entries[-1])
+
+    checked = catalog.verify(entries[-1])
+    assert checked["status"] == BackupCatalog.FAILED
+    assert "sha256" in checked["integrity"]
+    assert status(catalog, entries[0]) == BackupCatalog.VERIFIED
+
+
+def test_prune_keeps_last_verified_backup(backed_up):
+    _, catalog, entries, _ = backed_up
+    damage(catalog, entries[-1])
+    catalog.verify(entries[-1])
+    catalog.update(entries[-2]["file"], status=BackupCatalog.PENDING)
+
+    catalog.prune(max_backups=1, base_name="pos")
+    kept = {entry["file"] for entry in catalog.entries()}
+    # El más nuevo entra en el límite; el último verificado se conserva aunque quede afuera
+    assert kept == {entries[-1]["file"], entries[0]["file"]}
+    assert os.path.exists(catalog.file_path(entries[0]))
+
+
+def test_restore_skips_corrupted_newest_backup(backed_up):
+    path, catalog, entries, digests = backed_up
+    damage(catalog, entries[-1])
+
+    restored = restore_latest_backup(path)
+    assert restored["file"] == entries[-2]["file"]
+    assert restored["journal_changes"] > 0
+    assert status(catalog, entries[-1]) == BackupCatalog.FAILED
+    # El respaldo más el diario dejan la base como estaba al cerrarla
+    assert table_digests(path) == digests
+    assert os.path.exists(f"{path}.antes_de_restaurar")
+
+
+def test_restore_marks_backup_that_cannot_be_applied(backed_up, monkeypatch):
+    path, catalog, entries, digests = backed_up
+    decompress_file = db_backup.decompress_file
+    attempts = []
+
+    def decompress_failing_newest(source, target):
+        # verify también descomprime: solo falla la restauración del más nuevo
+        if target.endswith(".restaurando"):
+            attempts.append(os.path.basename(source))
+            if len(attempts) == 1:
+                raise OSError("archivo ilegible")
+        return decompress_file(source, target)
+
+    monkeypatch.setattr(db_backup, "decompress_file", decompress_failing_newest)
+    restored = restore_latest_backup(path)
+
+    assert attempts == [entries[-1]["file"], entries[-2]["file"]]
+    assert restored["file"] == entries[-2]["file"]
+    assert status(catalog, entries[-1]) == BackupCatalog.FAILED
+    assert table_digests(path) == digests
+    assert not os.path.exists(f"{path}.restaurando")
+
+
+def test_restore_aborts_on_journal_gap(backed_up, monkeypatch):
+    path, catalog, entries, digests = backed_up
+
+    def replay_with_gap(db_path, directory):
+        raise JournalGapError("Falta el diario entre los cambios 10 y 20")
+
+    monkeypatch.setattr(db_backup, "replay_journal", replay_with_gap)
+    with pytest.raises(JournalGapError, match="recupere los segmentos que faltan"):
+        restore_latest_backup(path)
+
+    # No se prueba con los anteriores ni se marca nada: la base queda como estaba
+    assert [status(catalog, entry) for entry in entries] == [BackupCatalog.VERIFIED] * 3
+    assert table_digests(path) == digests
+    assert not os.path.exists(f"{path}.antes_de_restaurar")
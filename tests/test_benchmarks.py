@@ -0,0 +1,183 @@
+"""
+Benchmarks de cada método público de Database sobre bases de synthetic_data.py
+(pytest-benchmark). Por defecto a 10k items de venta; con --escalas 10k,1m,10m
+a cada escala, y con --datos CARPETA las bases generadas se guardan y se
+reutilizan entre corridas.
+
+    python -m pytest tests/test_benchmarks.py --escalas 10k,1m --benchmark-json resultados.json
+
+Para comparar dos versiones: --benchmark-save=base en una y
+--benchmark-compare=0001 --benchmark-compare-fail=median:25% en la otra.
+"""
+import inspect
+import itertools
+import os
+import shutil
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import Database
+from db_profiler import NOT_INSTRUMENTED
+from synthetic_data import generate_dataset
+
+SCALES = {"10k": 10000, "1m": 1000000, "10m": 10000000}
+PRODUCTS = 2000
+DAYS = 730
+END_DATE = datetime(2024, 12, 31)
+SEED = 42
+
+# Métodos públicos que no se miden, con el motivo
+EXCLUDED = {
+    "reset_database": "borra la base",
+    "create_automatic_backup": "copia el archivo completo, no es una consulta (ver el benchmark respaldo)",
+    "clean_old_backups": "solo trabaja sobre archivos",
+    "archive_old_sales": "mueve ventas a otros archivos (ver el benchmark archivo)",
+    "archive_path": "solo arma la ruta del archivo",
+    "ship_change_journal": "escribe segmentos en backups/ (ver el benchmark diario)",
+    "journal_dir": "solo arma la ruta de los segmentos",
+    "debug_sales": "diagnóstico por consola",
+    "report_runtime_profile": "imprime por consola; se mide get_runtime_profile",
+    "add_credit_payment_detailed": "usa tablas y columnas que el esquema no tiene (credit_payments_detail)",
+    "update_schema": "recibe el cursor de la migración",
+    "apply_migrations": "recibe el cursor de la migración",
+    "insert_default_categories": "recibe el cursor de la migración",
+    "rebuild_sales_daily": "recibe el cursor de la migración",
+    "rebuild_sales_hourly": "recibe el cursor de la migración",
+    "rebuild_product_sales_daily": "recibe el cursor de la migración",
+    "rebuild_inventory_stats": "recibe el cursor de la migración",
+}
+
+END = END_DATE.strftime("%Y-%m-%d")
+MONTH = (END_DATE - timedelta(days=29)).strftime("%Y-%m-%d")
+YEAR = (END_DATE - timedelta(days=364)).strftime("%Y-%m-%d")
+SALE_DATA = {'total': 0, 'payment_method': '💵 Efectivo', 'customer_type': '🧑 Consumidor Final'}
+
+
+def stock_for_sales(db):
+    with db.transaction() as cursor:
+        cursor.execute('UPDATE products SET stock = 1000000 WHERE id <= 3')
+    # Tupla y no lista: una lista de ids limita las repeticiones (ver test_method)
+    return tuple({'product_id': i, 'name': f"Producto {i:06d}", 'quantity': 1, 'price': 100, 'subtotal': 100}
+                 for i in (1, 2, 3))
+
+
+def ids_like(table, column, prefix):
+    def prepare(db):
+        rows = db.get_connection().execute(
+            f"SELECT id FROM {table} WHERE {column} LIKE ? ORDER BY id", (f"{prefix}%",)).fetchall()
+        return [row[0] for row in rows]
+    return prepare
+
+
+def future_date(n):
+    return (datetime(2100, 1, 1) + timedelta(days=n)).strftime("%Y-%m-%d")
+
+
+# (método, llamada, preparación). La llamada recibe (db, n, estado): n es el
+# número de repetición y estado lo que devolvió la preparación (que no se mide).
+# Las escrituras van al final para que las lecturas vean siempre los mismos datos.
+CASES = [
+    ("get_schema_version", lambda db, n, s: db.get_schema_version(), None),
+    ("latest_schema_version", lambda db, n, s: db.latest_schema_version(), None),
+    ("init_database", lambda db, n, s: db.init_database(), None),
+    ("get_runtime_profile", lambda db, n, s: db.get_runtime_profile(), None),
+    ("get_current_local_time", lambda db, n, s: db.get_current_local_time(), None),
+    ("get_categories", lambda db, n, s: db.get_categories(), None),
+    ("get_products", lambda db, n, s: db.get_products(), None),
+    ("get_product_by_id", lambda db, n, s: db.get_product_by_id(1 + n % PRODUCTS), None),
+    ("get_product_by_code", lambda db, n, s: db.get_product_by_code(f"779{1 + n % PRODUCTS:010d}"), None),
+    ("get_catalog_version", lambda db, n, s: db.get_catalog_version(), None),
+    ("get_product_changes", lambda db, n, version: db.get_product_changes(version),
+     lambda db: max(db.get_catalog_version() - 3, 0)),
+    ("get_inventory_stats", lambda db, n, s: db.get_inventory_stats(), None),
+    ("check_inventory_stats", lambda db, n, s: db.check_inventory_stats(), None),
+    ("get_total_products", lambda db, n, s: db.get_total_products(), None),
+    ("get_low_stock_count", lambda db, n, s: db.get_low_stock_count(), None),
+    ("get_out_of_stock_count", lambda db, n, s: db.get_out_of_stock_count(), None),
+    ("get_inventory_value", lambda db, n, s: db.get_inventory_value(), None),
+    ("get_sales_summary", lambda db, n, s: db.get_sales_summary(MONTH, END), None),
+    ("get_previous_period_sales", lambda db, n, s: db.get_previous_period_sales(MONTH, END), None),
+    ("get_sales_report", lambda db, n, s: db.get_sales_report(MONTH, END), None),
+    ("get_detailed_sales_report", lambda db, n, s: db.get_detailed_sales_report(MONTH, END), None),
+    ("get_top_products", lambda db, n, s: db.get_top_products(MONTH, END, 10), None),
+    ("get_total_products_sold", lambda db, n, s: db.get_total_products_sold(MONTH, END), None),
+    ("get_payment_methods_distribution", lambda db, n, s: db.get_payment_methods_distribution(MONTH, END), None),
+    ("get_hourly_sales", lambda db, n, s: db.get_hourly_sales(YEAR, END), None),
+    ("get_weekday_sales", lambda db, n, s: db.get_weekday_sales(YEAR, END), None),
+    ("get_sales_heatmap", lambda db, n, s: db.get_sales_heatmap(YEAR, END), None),
+    ("get_detailed_movements", lambda db, n, s: db.get_detailed_movements(END), None),
+    ("get_credit_payments_by_date", lambda db, n, s: db.get_credit_payments_by_date(END), None),
+    ("get_cash_register_income_summary", lambda db, n, s: db.get_cash_register_income_summary(END), None),
+    ("get_cash_close_snapshot", lambda db, n, s: db.get_cash_close_snapshot(END), None),
+    ("get_cash_close_records", lambda db, n, s: db.get_cash_close_records(MONTH, END), None),
+    ("get_cash_open_records", lambda db, n, s: db.get_cash_open_records(MONTH, END), None),
+    ("get_sales_archives", lambda db, n, s: db.get_sales_archives(), None),
+    # Escrituras
+    ("save_sale", lambda db, n, basket: db.save_sale(SALE_DATA, basket), stock_for_sales),
+    ("update_product_stock", lambda db, n, s: db.update_product_stock(1 + n % PRODUCTS, 50), None),
+    ("add_product", lambda db, n, s: db.add_product({
+        'code': f"BENCH-{n}", 'name': f"Bench {n}", 'category_id': 1,
+        'buy_price': 100, 'sell_price': 150, 'stock': 10}), None),
+    ("delete_product", lambda db, n, ids: db.delete_product(ids[n]), ids_like("products", "code", "BENCH-")),
+    ("add_category", lambda db, n, s: db.add_category(f"Bench {n}"), None),
+    ("delete_category", lambda db, n, ids: db.delete_category(ids[n]), ids_like("categories", "name", "Bench ")),
+    ("insert_cash_open_record", lambda db, n, s: db.insert_cash_open_record(future_date(n), 1000), None),
+    ("insert_cash_close_record", lambda db, n, s: db.insert_cash_close_record(future_date(n), 1000), None),
+]
+
+
+def pytest_generate_tests(metafunc):
+    if "scale" in metafunc.fixturenames:
+        scales = [scale.strip().lower() for scale in metafunc.config.getoption("escalas").split(",")
+                  if scale.strip()]
+        unknown = [scale for scale in scales if scale not in SCALES]
+        if unknown:
+            raise pytest.UsageError(f"Escala desconocida: {', '.join(unknown)} (opciones: {', '.join(SCALES)})")
+        metafunc.parametrize("scale", scales, scope="module")
+
+
+@pytest.fixture(scope="module")
+def scale_db(scale, request, tmp_path_factory):
+    """Copia de trabajo de la base sintética de la escala (se genera una vez si hay --datos)"""
+    data_dir = request.config.getoption("datos")
+    work_dir = tmp_path_factory.mktemp(f"bench_{scale}")
+    source = os.path.join(data_dir or str(work_dir), f"sintetica_{scale}_{SEED}.db")
+    if not os.path.exists(source):
+        db = Database(source)
+        generate_dataset(db, products=PRODUCTS, sale_items=SCALES[scale], days=DAYS, end_date=END_DATE, seed=SEED)
+        # Dejar el archivo autocontenido (sin -wal) para copiarlo
+        db.get_connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        db.close_connection()
+    work = str(work_dir / f"trabajo_{scale}.db")
+    shutil.copyfile(source, work)
+
+    db = Database(work)
+    conn = db.get_connection()
+    db.dataset = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ("products", "sales", "sale_items", "credit_payments", "cash_closes")}
+    yield db
+    db.close_connection()
+
+
+def test_every_public_method_is_benchmarked():
+    public = {name for name, _ in inspect.getmembers(Database, inspect.isfunction)
+              if not name.startswith("_") and name not in NOT_INSTRUMENTED}
+    measured = {name for name, _, _ in CASES}
+    assert sorted(public - measured - set(EXCLUDED)) == []
+    assert sorted((measured | set(EXCLUDED)) - public) == []
+
+
+@pytest.mark.parametrize("method, call, prepare", CASES, ids=[case[0] for case in CASES])
+def test_method(benchmark, request, scale, scale_db, method, call, prepare):
+    state = prepare(scale_db) if prepare else None
+    rounds = request.config.getoption("repeticiones")
+    if isinstance(state, list):
+        # Ids a borrar: cada repetición usa uno
+        rounds = min(rounds, len(state))
+    counter = itertools.count()
+
+    benchmark.group = scale
+    benchmark.extra_info.update(scale=scale, sqlite=sqlite3.sqlite_version, dataset=scale_db.dataset)
+    benchmark.pedantic(lambda: call(scale_db, next(counter), state), rounds=rounds, iterations=1)
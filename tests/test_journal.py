@@ -0,0 +1,107 @@
+"""
+Diario de cambios: un respaldo completo más los segmentos enviados después
+reconstruyen la base con exactamente las mismas filas (table_digests), y si
+falta un segmento en el medio la reconstrucción falla sin tocar la base.
+"""
+import random
+import shutil
+from datetime import timedelta
+
+import pytest
+
+from benchmark_db import SEED_END_DATE, make_basket, seed_products, seed_sales
+from database import Database
+from db_backup import decompress_file
+from db_journal import JournalGapError, list_segments, replay_journal, table_digests
+from utils.money import Money
+
+SALE_DATA = {'total': 0, 'payment_method': '💵 Efectivo', 'customer_type': '🧑 Consumidor Final'}
+CREDIT_SALE = {'total': 0, 'payment_method': 'Cuenta Corriente', 'customer_type': '👤 Cliente'}
+ROUNDS = 4
+
+
+@pytest.fixture(scope="module")
+def journaled(tmp_path_factory):
+    """
+    (base, respaldo descomprimido, carpeta del diario, último cambio incluido
+    en el respaldo): la base recibe ventas,
+    productos, abonos, caja y un archivo de ventas después del respaldo, con
+    envíos del diario en el medio
+    """
+    tmp_path = tmp_path_factory.mktemp("diario")
+    path = str(tmp_path / "pos.db")
+    db = Database(path)
+    seed_products(db, 200)
+    seed_sales(db, 3000, days=730, total_products=200)
+    with db.transaction() as cursor:
+        cursor.execute('UPDATE products SET stock = 1000000')
+    db.ship_change_journal()
+    base = db.backup_service.backup_now()
+    assert base.ok
+
+    rng = random.Random(7)
+    for round_number in range(ROUNDS):
+        for _ in range(20):
+            db.save_sale(CREDIT_SALE if rng.random() < 0.2 else SALE_DATA, make_basket(rng.randint(1, 6)))
+        with db.transaction() as cursor:
+            cursor.execute('INSERT INTO customers (name, phone) VALUES (?, ?)',
+                           (f"Cliente diario {round_number}", "1100000000"))
+            customer_id = cursor.lastrowid
+            cursor.execute('INSERT INTO credit_payments (customer_id, amount, payment_method) VALUES (?, ?, ?)',
+                           (customer_id, Money.to_cents(1500.5), '💵 Efectivo'))
+            cursor.execute('UPDATE customers SET current_credit = current_credit - ? WHERE id = ?',
+                           (Money.to_cents(1500.5), customer_id))
+            # Anular una venta vieja: sus items se borran por trigger
+            cursor.execute('DELETE FROM sales WHERE id = ?', (rng.randint(1, 1000),))
+        db.add_product({'code': f"DIARIO{round_number}", 'name': f"Producto diario {round_number}",
+                        'buy_price': 99.99, 'sell_price': 149.9, 'stock': 10})
+        db.update_product_stock(rng.randint(1, 200), rng.randint(0, 50))
+        db.delete_product(db.get_product_by_code(f"DIARIO{round_number}")[0])
+        day = (SEED_END_DATE + timedelta(days=round_number + 1)).strftime("%Y-%m-%d")
+        db.insert_cash_open_record(day, 10000)
+        db.insert_cash_close_record(day, 54321.09)
+        if round_number == ROUNDS // 2:
+            assert db.archive_old_sales(365, reference_date=SEED_END_DATE.strftime("%Y-%m-%d"))
+        # Varios segmentos chicos: la reconstrucción tiene que encadenarlos
+        db.ship_change_journal(max_rows=50)
+    journal_directory = db.journal_dir()
+    db.get_connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    db.close_connection()
+
+    restored = decompress_file(base.path, str(tmp_path / "respaldo.db"))
+    return path, restored, journal_directory, base.entry["journal_seq"]
+
+
+def test_replay_reproduces_every_table(journaled, tmp_path):
+    path, restored, journal_directory, _ = journaled
+    replayed = str(tmp_path / "reconstruida.db")
+    shutil.copyfile(restored, replayed)
+
+    assert replay_journal(replayed, journal_directory) > 0
+    original, rebuilt = table_digests(path), table_digests(replayed)
+    assert sorted(table for table in set(original) | set(rebuilt)
+                  if original.get(table) != rebuilt.get(table)) == []
+    # Aplicar de nuevo no cambia nada: los segmentos ya están incluidos
+    assert replay_journal(replayed, journal_directory) == 0
+    assert table_digests(replayed) == original
+
+
+def test_missing_segment_fails_without_touching_the_base(journaled, tmp_path):
+    _, restored, journal_directory, journal_seq = journaled
+    segments = [segment for segment in list_segments(journal_directory) if segment[1] > journal_seq]
+    assert len(segments) >= 3
+
+    # Copia del diario sin un segmento del medio
+    gap_directory = tmp_path / "diario_incompleto"
+    gap_directory.mkdir()
+    missing = segments[len(segments) // 2]
+    for segment in segments:
+        if segment is not missing:
+            shutil.copy(segment[2], gap_directory)
+    replayed = str(tmp_path / "incompleta.db")
+    shutil.copyfile(restored, replayed)
+    before = table_digests(replayed)
+
+    with pytest.raises(JournalGapError, match=f"entre los cambios {missing[0]} y {missing[1]}"):
+        replay_journal(replayed, str(gap_directory))
+    assert table_digests(replayed) == before
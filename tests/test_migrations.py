@@ -0,0 +1,123 @@
+"""
+Actualización de bases de cada esquema histórico a la última versión: la
+de aronium (sin categorías ni category_id), la base sin category_id y una
+base detenida en cada migración. Después de abrirla con Database tiene que
+quedar en la última user_version, con todas las columnas, índices y
+triggers del esquema actual y con los mismos datos.
+"""
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from benchmark_db import (build_aronium_schema, build_schema_version, build_schema_without_category,
+                          schema_objects)
+from database import Database
+from utils.money import Money
+
+LATEST = Database.SCHEMA_MIGRATIONS[-1][0]
+ARONIUM_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "aronium_pos.db")
+
+# (nombre, armado de la base, versión de la que parte)
+HISTORICAL_SCHEMAS = [
+    ("aronium", build_aronium_schema, 0),
+    ("sin_category_id", build_schema_without_category, 0),
+] + [(f"version_{version}", lambda path, v=version: build_schema_version(path, v), version)
+     for version in range(LATEST)]
+
+
+@pytest.fixture(scope="module")
+def reference(tmp_path_factory):
+    """Tablas con sus columnas, índices y triggers de una base nueva"""
+    database = Database(str(tmp_path_factory.mktemp("referencia") / "referencia.db"))
+    objects = schema_objects(database.get_connection())
+    database.close_connection()
+    return objects
+
+
+def snapshot(path):
+    """Datos que la actualización tiene que conservar, leídos sin pasar por Database"""
+    conn = sqlite3.connect(path)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(products)")}
+    price = "sell_price" if "sell_price" in columns else "price"
+    data = {
+        "products": conn.execute(f"SELECT id, code, name, stock, {price} FROM products ORDER BY id").fetchall(),
+        "sales": conn.execute("SELECT id, total, payment_method, created_at FROM sales ORDER BY id").fetchall(),
+        "sale_items": conn.execute("SELECT id, sale_id, product_id, quantity FROM sale_items ORDER BY id").fetchall(),
+    }
+    conn.close()
+    return data
+
+
+def upgraded_amount(value, from_version):
+    """Un importe después de la migración 6: los REAL en pesos pasan a centavos enteros"""
+    return Money.to_cents(value) if from_version < 6 else value
+
+
+@pytest.mark.parametrize("build, from_version", [case[1:] for case in HISTORICAL_SCHEMAS],
+                         ids=[case[0] for case in HISTORICAL_SCHEMAS])
+def test_upgrade_historical_schema(tmp_path, reference, build, from_version):
+    path = str(tmp_path / "historica.db")
+    build(path)
+    before = snapshot(path)
+
+    database = Database(path)
+    try:
+        conn = database.get_connection()
+        assert database.get_schema_version() == LATEST
+
+        tables, others = schema_objects(conn)
+        reference_tables, reference_others = reference
+        for table, columns in reference_tables.items():
+            assert columns <= tables.get(table, set()), f"faltan columnas en {table}"
+        assert reference_others <= others
+        assert "category_id" in tables["products"]
+
+        after = snapshot(path)
+        assert [row[:4] for row in after["products"]] == [row[:4] for row in before["products"]]
+        assert [row[4] for row in after["products"]] == \
+            [upgraded_amount(row[4], from_version) for row in before["products"]]
+        assert after["sales"] == [(sale_id, upgraded_amount(total, from_version), method, created_at)
+                                  for sale_id, total, method, created_at in before["sales"]]
+        assert after["sale_items"] == before["sale_items"]
+
+        # Los resúmenes armados en la migración coinciden con las tablas
+        assert database.get_total_products_sold() == sum(row[3] for row in before["sale_items"])
+        assert not database.check_inventory_stats()
+    finally:
+        database.close_connection()
+
+
+@pytest.mark.skipif(not os.path.exists(ARONIUM_DB), reason="no está aronium_pos.db")
+def test_upgrade_aronium_file(tmp_path, reference):
+    path = str(tmp_path / "aronium_pos.db")
+    shutil.copy(ARONIUM_DB, path)
+    before = snapshot(path)
+
+    database = Database(path)
+    try:
+        assert database.get_schema_version() == LATEST
+        tables, _ = schema_objects(database.get_connection())
+        assert "category_id" in tables["products"]
+        after = snapshot(path)
+        assert [row[:4] for row in after["products"]] == [row[:4] for row in before["products"]]
+        assert [row[0] for row in after["sales"]] == [row[0] for row in before["sales"]]
+    finally:
+        database.close_connection()
+
+
+def test_current_database_skips_schema_checks(tmp_path):
+    path = str(tmp_path / "actual.db")
+    Database(path).close_connection()
+    # Con user_version al día no se vuelve a crear nada: una tabla borrada a mano no reaparece
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE sales_archives")
+    conn.commit()
+    conn.close()
+    database = Database(path)
+    try:
+        assert database.get_schema_version() == LATEST
+        assert "sales_archives" not in schema_objects(database.get_connection())[0]
+    finally:
+        database.close_connection()
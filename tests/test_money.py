@@ -0,0 +1,97 @@
+"""
+Importes en centavos: las sumas de un año generado coinciden exactamente con
+la suma de los tickets hecha en Money, sin desvíos de punto flotante, y la
+migración 6 pasa los importes REAL de una base vieja a sus centavos exactos.
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmark_db import SEED_END_DATE, DatabaseEnVersion
+from database import Database
+from synthetic_data import generate_dataset
+from utils.money import Money
+
+START = (SEED_END_DATE - timedelta(days=364)).strftime("%Y-%m-%d")
+END = SEED_END_DATE.strftime("%Y-%m-%d")
+
+
+@pytest.fixture(scope="module")
+def year_db(tmp_path_factory):
+    db = Database(str(tmp_path_factory.mktemp("centavos") / "anio.db"))
+    generate_dataset(db, products=500, sale_items=20000, days=365, end_date=SEED_END_DATE)
+    yield db
+    db.close_connection()
+
+
+@pytest.fixture(scope="module")
+def tickets(year_db):
+    """Total de cada ticket recalculado desde sus items, sumado en Money"""
+    totals = {}
+    for sale_id, subtotal in year_db.get_connection().execute('SELECT sale_id, subtotal FROM sale_items'):
+        totals[sale_id] = totals.get(sale_id, Money(0)) + Money.from_cents(subtotal)
+    return totals
+
+
+def test_ticket_totals_match_items(year_db, tickets):
+    conn = year_db.get_connection()
+    mismatched = [sale_id for sale_id, total in conn.execute('SELECT id, total FROM sales')
+                  if tickets.get(sale_id, Money(0)) != Money.from_cents(total)]
+    assert mismatched == []
+
+
+def test_year_sum_equals_ticket_sum(year_db, tickets):
+    year_total = sum(tickets.values(), Money(0))
+    conn = year_db.get_connection()
+
+    assert Money.from_cents(conn.execute('SELECT SUM(total) FROM sales').fetchone()[0]) == year_total
+    assert Money.from_pesos(year_db.get_sales_summary(START, END)[1]) == year_total
+    assert Money.from_cents(conn.execute('SELECT SUM(total_amount) FROM sales_hourly').fetchone()[0]) == year_total
+    assert Money.from_cents(conn.execute('SELECT SUM(revenue) FROM product_sales_daily').fetchone()[0]) == year_total
+
+
+def test_each_month_equals_its_items(year_db):
+    months = year_db.get_connection().execute('''
+        SELECT strftime('%Y-%m', s.created_at), SUM(si.subtotal)
+        FROM sales s CROSS JOIN sale_items si ON si.sale_id = s.id GROUP BY 1
+    ''').fetchall()
+    assert len(months) >= 12
+    for month, cents in months:
+        first_day = datetime.strptime(f"{month}-01", "%Y-%m-%d")
+        last_day = (first_day + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        summary = year_db.get_sales_summary(first_day.strftime("%Y-%m-%d"), last_day.strftime("%Y-%m-%d"))
+        assert Money.from_pesos(summary[1]) == Money(cents), month
+
+
+def test_migration_converts_real_amounts_to_exact_cents(tmp_path):
+    path = str(tmp_path / "real.db")
+    legacy = DatabaseEnVersion(path, 5)
+    rng = random.Random(5)
+    legacy_totals = [round(rng.uniform(1, 5000), 2) for _ in range(5000)]
+    with legacy.transaction() as cursor:
+        cursor.executemany('''
+            INSERT INTO sales (total, payment_method, payment_status, customer_type, created_at)
+            VALUES (?, ?, 'pagado', ?, ?)
+        ''', ((total, "💵 Efectivo", "🧑 Consumidor Final", f"2024-06-{1 + i % 30:02d} 12:00:00")
+              for i, total in enumerate(legacy_totals)))
+    legacy.close_connection()
+
+    migrated = Database(path)
+    try:
+        stored = [row[0] for row in migrated.get_connection().execute('SELECT total FROM sales ORDER BY id')]
+        expected = [Money.to_cents(total) for total in legacy_totals]
+        assert stored == expected
+        assert Money.from_pesos(migrated.get_sales_summary()[1]) == Money(sum(expected))
+    finally:
+        migrated.close_connection()
+
+
+def test_money_equals_only_money():
+    # Igual solo a otro Money: así igualdad y hash coinciden en dict y set
+    assert Money(150) == Money.from_pesos(1.5)
+    assert Money(150) != 1.5
+    assert {Money(150): "precio"}.get(1.5) is None
+    assert {Money(150): "precio"}[Money.from_pesos("1.50")] == "precio"
+    with pytest.raises(TypeError):
+        Money(150) < 2
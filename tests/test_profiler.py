@@ -0,0 +1,45 @@
+"""
+Instrumentación (db_profiler.py): cuenta las filas que leen los cursores de
+cada método, respeta el row_factory de la conexión y deja afuera los métodos
+de esquema y arranque.
+"""
+import sqlite3
+
+from database import Database
+from db_profiler import NOT_PROFILED, QueryProfiler
+
+
+def test_rows_are_counted_from_cursors(tmp_path):
+    profiler = QueryProfiler(slow_ms=100000, log_dir=str(tmp_path / "logs"))
+    db = Database(str(tmp_path / "prueba.db"), profiler=profiler)
+    recorded = []
+    profiler._record = lambda name, elapsed_ms, rows, statements, database: recorded.append((name, rows))
+
+    categories = db.get_categories()
+    db.get_inventory_stats()
+    db.close_connection()
+
+    # get_inventory_stats devuelve un dict armado con una fila leída
+    assert recorded == [("get_categories", len(categories)), ("get_inventory_stats", 1)]
+
+
+def test_schema_methods_are_not_profiled(tmp_path):
+    profiler = QueryProfiler(slow_ms=100000, log_dir=str(tmp_path / "logs"))
+    db = Database(str(tmp_path / "prueba.db"), profiler=profiler)
+    db.get_schema_version()
+    db.get_products()
+    db.close_connection()
+
+    assert "get_products" in profiler.timings
+    assert not set(profiler.timings) & NOT_PROFILED
+
+
+def test_existing_row_factory_is_kept(tmp_path):
+    profiler = QueryProfiler(log_dir=str(tmp_path / "logs"))
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    profiler.watch_connection(conn)
+
+    row = conn.execute("SELECT 1 AS uno").fetchone()
+    assert isinstance(row, sqlite3.Row) and row["uno"] == 1
+    conn.close()
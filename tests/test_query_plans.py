@@ -0,0 +1,41 @@
+"""
+Regresión de EXPLAIN QUERY PLAN: ningún método de reporte debe recorrer
+completa una tabla grande (sale_items, sales, credit_payments). Si un cambio
+en una consulta o en los índices vuelve a un SCAN, la prueba falla con el
+paso del plan.
+"""
+from datetime import timedelta
+
+import pytest
+
+from benchmark_db import (REPORT_CALLS, SEED_END_DATE, capture_statements, find_full_scans,
+                          seed_products, seed_sales)
+
+END = SEED_END_DATE.strftime("%Y-%m-%d")
+START = (SEED_END_DATE - timedelta(days=6)).strftime("%Y-%m-%d")
+
+
+@pytest.fixture(scope="module")
+def report_db(tmp_path_factory):
+    from database import Database
+    database = Database(str(tmp_path_factory.mktemp("planes") / "planes.db"))
+    seed_products(database, 500)
+    seed_sales(database, 20000, days=365, total_products=500)
+    yield database
+    database.close_connection()
+
+
+@pytest.mark.parametrize("name, call", REPORT_CALLS, ids=[name for name, _ in REPORT_CALLS])
+def test_report_uses_indexes(report_db, name, call):
+    statements = capture_statements(report_db, lambda: call(report_db, START, END))
+    assert statements, f"{name} no ejecutó ninguna consulta"
+    conn = report_db.get_connection()
+    full_scans = [scan for sql in statements for scan in find_full_scans(conn, sql)]
+    assert not full_scans, f"{name} recorre una tabla grande completa: {'; '.join(full_scans)}"
+
+
+def test_full_scan_is_detected(report_db):
+    # El detector tiene que marcar una consulta que no puede usar índices
+    conn = report_db.get_connection()
+    assert find_full_scans(conn, "SELECT SUM(quantity) FROM sale_items WHERE quantity > 1")
+    assert find_full_scans(conn, "SELECT COUNT(*) FROM sales s WHERE s.total > 0")
@@ -0,0 +1,164 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+import itertools
+import threading
+
+
+class DbWorkerSignals(QObject):
+    """
+    Señales de las tareas de un DbExecutor (clave, número de tarea y resultado
+    o mensaje): se emiten desde el hilo del pool y Qt las entrega en el hilo de
+    la UI.
+
+    Es un solo objeto por ejecutor, que vive tanto como él. Uno por tarea,
+    conectado con lambdas que guardan la tarea, quedaba en un ciclo de
+    referencias: el recolector de Python podía borrarlo (incluso desde otro
+    hilo) con un resultado todavía en camino, y la aplicación se caía.
+    """
+    finished = pyqtSignal(object, int, object)
+    error = pyqtSignal(object, int, str)
+
+
+class TaskHandle:
+    """
+    Estado de una tarea que queda en el ejecutor: clave, número, callbacks y
+    cancelación. Es un objeto común de Python: el ejecutor no guarda el
+    QRunnable, que Qt borra al terminar (autoDelete).
+    """
+
+    def __init__(self, key, token, on_result=None, on_error=None):
+        self.key = key
+        self.token = token
+        self.on_result = on_result
+        self.on_error = on_error
+        self._cancelled = False
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+            # Solo se interrumpe mientras la tarea corre: la conexión se reutiliza después
+            if self._connection is not None:
+                self._connection.interrupt()
+
+    def is_cancelled(self):
+        return self._cancelled
+
+
+class DbTask(QRunnable):
+    """
+    Ejecuta fn(db) en un hilo del pool, sobre la conexión SQLite propia de ese hilo.
+    Si se cancela, el resultado se descarta y la consulta en curso se interrumpe.
+    """
+
+    def __init__(self, db, fn, signals, handle):
+        super().__init__()
+        self.setAutoDelete(True)
+        self.db = db
+        self.fn = fn
+        self.signals = signals
+        self.handle = handle
+
+    @pyqtSlot()
+    def run(self):
+        handle = self.handle
+        if handle.is_cancelled():
+            return
+        with handle._lock:
+            handle._connection = self.db.get_connection()
+        try:
+            result = self.fn(self.db)
+        except Exception as e:
+            if not handle.is_cancelled():
+                self.signals.error.emit(handle.key, handle.token, str(e))
+            return
+        finally:
+            with handle._lock:
+                handle._connection = None
+
+        if not handle.is_cancelled():
+            self.signals.finished.emit(handle.key, handle.token, result)
+
+
+class DbExecutor(QObject):
+    """
+    Acceso a la base fuera del hilo de la UI.
+
+    - Lecturas: pool de varios hilos, cada uno con su conexión (WAL permite leer en paralelo).
+    - Escrituras: pool de un solo hilo, además del lock de escritura de Database.
+
+    Las tareas se identifican con una clave: lanzar otra con la misma clave cancela
+    la anterior (por ejemplo, apretar dos veces "Actualizar Reporte").
+    """
+
+    READ_THREADS = 4
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.read_pool = QThreadPool()
+        self.read_pool.setMaxThreadCount(self.READ_THREADS)
+        self.write_pool = QThreadPool()
+        self.write_pool.setMaxThreadCount(1)
+        # Los hilos no expiran: cada uno conserva su conexión abierta
+        self.read_pool.setExpiryTimeout(-1)
+        self.write_pool.setExpiryTimeout(-1)
+        # Clave -> TaskHandle de la tarea en curso con esa clave
+        self._tasks = {}
+        self._tokens = itertools.count(1)
+        self.signals = DbWorkerSignals(self)
+        self.signals.finished.connect(self._on_finished)
+        self.signals.error.connect(self._on_error)
+
+    def read(self, key, fn, on_result=None, on_error=None):
+        """Ejecutar una lectura en segundo plano"""
+        return self._submit(self.read_pool, key, fn, on_result, on_error)
+
+    def write(self, key, fn, on_result=None, on_error=None):
+        """Ejecutar una escritura en segundo plano (de a una por vez)"""
+        return self._submit(self.write_pool, key, fn, on_result, on_error)
+
+    def cancel(self, key):
+        handle = self._tasks.pop(key, None)
+        if handle is not None:
+            handle.cancel()
+
+    def is_running(self, key):
+        return key in self._tasks
+
+    def _submit(self, pool, key, fn, on_result, on_error):
+        self.cancel(key)
+        handle = TaskHandle(key, next(self._tokens), on_result, on_error)
+        self._tasks[key] = handle
+        pool.start(DbTask(self.db, fn, self.signals, handle))
+        return handle
+
+    def _current(self, key, token):
+        """La tarea en curso con esa clave, si es la que avisa (no una reemplazada o cancelada)"""
+        handle = self._tasks.get(key)
+        if handle is None or handle.token != token or handle.is_cancelled():
+            return None
+        del self._tasks[key]
+        return handle
+
+    def _on_finished(self, key, token, result):
+        handle = self._current(key, token)
+        if handle is not None and handle.on_result:
+            handle.on_result(result)
+
+    def _on_error(self, key, token, message):
+        handle = self._current(key, token)
+        if handle is None:
+            return
+        if handle.on_error:
+            handle.on_error(message)
+        else:
+            print(f"Error en tarea {key}: {message}")
+
+    def shutdown(self, timeout_ms=5000):
+        """Cancelar lo pendiente y esperar a que terminen los hilos (al cerrar la aplicación)"""
+        for key in list(self._tasks):
+            self.cancel(key)
+        self.read_pool.clear()
+        self.read_pool.waitForDone(timeout_ms)
+        self.write_pool.waitForDone(timeout_ms)
@@ -1,3 +1,7 @@
+from utils.money import Money
+
+
 def format_currency(amount):
-    """Formatear moneda en pesos argentinos"""
-    return f"$ {amount:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
\ No newline at end of file
+    """Formatear moneda en pesos argentinos (acepta Money o un importe en pesos)"""
+    # Se formatea desde los centavos enteros: sin errores de redondeo de float
+    return f"$ {Money.from_pesos(amount):,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
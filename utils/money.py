@@ -0,0 +1,151 @@
+from decimal import Decimal, ROUND_HALF_UP
+from numbers import Number
+
+CENTS_PER_PESO = 100
+_CENT = Decimal("0.01")
+
+
+class Money:
+    """
+    Importe en centavos enteros.
+
+    Es la forma en que la base guarda los importes (INTEGER): las sumas son
+    exactas y no arrastran los errores de redondeo de REAL. Los pesos con
+    decimales solo aparecen al convertir desde/hacia la UI.
+    """
+
+    __slots__ = ("cents",)
+
+    def __init__(self, cents=0):
+        if isinstance(cents, bool) or not isinstance(cents, int):
+            raise TypeError(f"Money espera centavos enteros, no {type(cents).__name__}")
+        self.cents = cents
+
+    @classmethod
+    def from_pesos(cls, amount):
+        """Desde pesos (float, int, Decimal o texto), redondeando al centavo (mitad hacia arriba)"""
+        if isinstance(amount, Money):
+            return amount
+        if amount is None:
+            return cls(0)
+        # str() evita arrastrar la representación binaria del float (0.1 => 0.1000000000000000055...)
+        pesos = Decimal(str(amount)).quantize(_CENT, rounding=ROUND_HALF_UP)
+        return cls(int(pesos * CENTS_PER_PESO))
+
+    @classmethod
+    def from_cents(cls, cents):
+        return cls(int(cents or 0))
+
+    @staticmethod
+    def to_cents(amount):
+        """Centavos enteros de un importe en pesos o Money (para guardar en la base)"""
+        return Money.from_pesos(amount).cents
+
+    @property
+    def pesos(self):
+        return Decimal(self.cents) / CENTS_PER_PESO
+
+    # ===== ARITMÉTICA =====
+
+    def _coerce(self, other):
+        if isinstance(other, Money):
+            return other
+        if isinstance(other, Number):
+            return Money.from_pesos(other)
+        return NotImplemented
+
+    def __add__(self, other):
+        other = self._coerce(other)
+        if other is NotImplemented:
+            return other
+        return Money(self.cents + other.cents)
+
+    # sum() empieza en 0
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        other = self._coerce(other)
+        if other is NotImplemented:
+            return other
+        return Money(self.cents - other.cents)
+
+    def __rsub__(self, other):
+        other = self._coerce(other)
+        if other is NotImplemented:
+            return other
+        return Money(other.cents - self.cents)
+
+    def __mul__(self, factor):
+        """Multiplicar por una cantidad (precio x unidades), redondeando al centavo"""
+        if isinstance(factor, Money) or not isinstance(factor, Number):
+            return NotImplemented
+        if isinstance(factor, int):
+            return Money(self.cents * factor)
+        cents = (Decimal(self.cents) * Decimal(str(factor))).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+        return Money(int(cents))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        """Money / Money => proporción (float); Money / n => Money redondeado al centavo"""
+        if isinstance(other, Money):
+            return self.cents / other.cents
+        if not isinstance(other, Number):
+            return NotImplemented
+        cents = (Decimal(self.cents) / Decimal(str(other))).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+        return Money(int(cents))
+
+    def __neg__(self):
+        return Money(-self.cents)
+
+    def __abs__(self):
+        return Money(abs(self.cents))
+
+    # ===== COMPARACIÓN Y CONVERSIÓN =====
+
+    # Se compara solo con otro Money. Contra un número habría que redondearlo
+    # al centavo, y Money(10) == 0.1 sin el mismo hash que 0.1 rompe los
+    # dict y set que mezclan los dos: convertir antes con Money.from_pesos.
+    def __eq__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.cents == other.cents
+
+    def __lt__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.cents < other.cents
+
+    def __le__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.cents <= other.cents
+
+    def __gt__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.cents > other.cents
+
+    def __ge__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.cents >= other.cents
+
+    def __hash__(self):
+        return hash(self.cents)
+
+    def __bool__(self):
+        return self.cents != 0
+
+    def __float__(self):
+        return self.cents / CENTS_PER_PESO
+
+    def __format__(self, spec):
+        # Mismos formatos que un float ('.2f', ',.2f'), pero calculados desde el entero
+        return format(self.pesos, spec or ".2f")
+
+    def __str__(self):
+        return format(self, ".2f")
+
+    def __repr__(self):
+        return f"Money({self.cents})"
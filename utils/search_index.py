@@ -0,0 +1,262 @@
+import bisect
+import re
+import unicodedata
+
+# Números (con decimales: "2,25" y "2.25" son lo mismo) o palabras, sin signos
+TOKEN_PATTERN = re.compile(r'\d+(?:[.,]\d+)*|[^\W\d_]+')
+
+# Puntaje de una palabra de la búsqueda según cómo coincide con la del producto
+EXACT, PREFIX, INFIX = 3, 2, 1
+
+# Tildes, diéresis y demás marcas que NFKD separa de la letra (á -> a + ´)
+COMBINING_MARKS = re.compile('[\u0300-\u036f]+')
+
+# Desde este largo una palabra de la búsqueda también se busca dentro de otras (por trigramas)
+INFIX_MIN_LENGTH = 3
+
+# Números desde este largo (EAN-8 en adelante) son códigos de barras: se pueden buscar por el final
+BARCODE_MIN_LENGTH = 8
+
+
+def fold(text):
+    """Minúsculas y sin acentos: 'Café Ñandú' -> 'cafe nandu'"""
+    text = text.lower()
+    if text.isascii():
+        return text
+    return COMBINING_MARKS.sub('', unicodedata.normalize('NFKD', text))
+
+
+def word_tokens(word):
+    """Palabras normalizadas de una palabra sin espacios: 'Coca-Cola' -> ['coca', 'cola']"""
+    word = word.lower()
+    if word.isascii() and (word.isdigit() or word.isalpha()):
+        return [word]
+    return [token.replace(',', '.') for token in TOKEN_PATTERN.findall(fold(word))]
+
+
+def search_tokens(text):
+    """Palabras normalizadas de un texto: 'Coca-Cola 2,25L' -> ['coca', 'cola', '2.25', 'l']"""
+    tokens = []
+    for word in (text or '').split():
+        tokens += word_tokens(word)
+    return tokens
+
+
+def infix_searchable(token):
+    """
+    Si la palabra se busca también dentro de otras, por trigramas. Los números
+    (códigos, tamaños, precios) no: indexar los trigramas de cada código de
+    barras costaría más que todo el resto del índice (ver suffix_searchable).
+    """
+    return len(token) >= INFIX_MIN_LENGTH and not token[0].isdigit()
+
+
+def suffix_searchable(token):
+    """
+    Si el número de la búsqueda se busca también al final de los códigos de
+    barras: los últimos dígitos del código encuentran el producto, como antes
+    del índice.
+    """
+    return len(token) >= INFIX_MIN_LENGTH and token.isdigit()
+
+
+def is_barcode(token):
+    """Si la palabra del producto es un código de barras (entra en la lista de números dados vuelta)"""
+    return len(token) >= BARCODE_MIN_LENGTH and token.isdigit()
+
+
+def trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class SearchIndex:
+    """
+    Índice de búsqueda de las filas de una grilla (el texto de cada fila lo
+    arma el modelo: nombre, código...). Guarda para cada palabra las filas que
+    la tienen, las palabras ordenadas (las que empiezan con lo escrito quedan
+    juntas y se encuentran con bisect) y, para cada trigrama, las palabras que
+    lo contienen. Buscar no recorre las filas: cuesta lo que sumen las filas
+    que coinciden.
+
+    Cada palabra de la búsqueda tiene que aparecer en la fila como palabra
+    completa, como comienzo de una palabra o (desde 3 caracteres) dentro de
+    una; un número, al final de un código de barras. Los códigos se buscan
+    por el final con la lista ordenada de los códigos dados vuelta (otra vez
+    bisect), que se mantiene al día con cada cambio.
+    El puntaje de la fila suma cómo coincidió cada una, así lo exacto queda
+    primero.
+    """
+
+    def __init__(self, texts=()):
+        self.set_texts(texts)
+
+    def set_texts(self, texts):
+        self.row_tokens = []
+        self.postings = {}
+        self.trigram_tokens = {}
+        self._vocabulary = None
+        self._word_tokens = {}
+        # Igual que append() para cada texto, pero los trigramas se arman al final,
+        # una vez por palabra distinta
+        postings = self.postings
+        for row, text in enumerate(texts):
+            tokens = self.text_tokens(text)
+            self.row_tokens.append(tokens)
+            for token in tokens:
+                rows = postings.get(token)
+                if rows is None:
+                    postings[token] = {row}
+                else:
+                    rows.add(row)
+        for token in postings:
+            if infix_searchable(token):
+                for trigram in trigrams(token):
+                    self.trigram_tokens.setdefault(trigram, set()).add(token)
+        self.reversed_barcodes = sorted(token[::-1] for token in postings if is_barcode(token))
+
+    def append(self, text):
+        row = len(self.row_tokens)
+        self.row_tokens.append(())
+        self.set_text(row, text)
+
+    def pop(self):
+        """Quitar la última fila"""
+        self.set_text(len(self.row_tokens) - 1, '')
+        self.row_tokens.pop()
+
+    def set_text(self, row, text):
+        """Reindexar una fila (un cambio de precio o stock no toca el índice)"""
+        tokens = self.text_tokens(text)
+        previous = self.row_tokens[row]
+        if tokens == previous:
+            return
+        self.row_tokens[row] = tokens
+
+        for token in previous:
+            rows = self.postings[token]
+            rows.discard(row)
+            if not rows:
+                del self.postings[token]
+                if infix_searchable(token):
+                    for trigram in trigrams(token):
+                        self.trigram_tokens[trigram].discard(token)
+                elif is_barcode(token):
+                    reversed_barcodes = self.reversed_barcodes
+                    del reversed_barcodes[bisect.bisect_left(reversed_barcodes, token[::-1])]
+                self._vocabulary = None
+
+        for token in tokens:
+            rows = self.postings.get(token)
+            if rows is None:
+                rows = self.postings[token] = set()
+                if infix_searchable(token):
+                    for trigram in trigrams(token):
+                        self.trigram_tokens.setdefault(trigram, set()).add(token)
+                elif is_barcode(token):
+                    bisect.insort(self.reversed_barcodes, token[::-1])
+                self._vocabulary = None
+            rows.add(row)
+
+    def text_tokens(self, text):
+        """
+        search_tokens(text) sin repetidas. Las palabras que hay que separar o
+        normalizar se recuerdan: en un catálogo se repiten marcas y tamaños.
+        """
+        tokens = []
+        for word in (text or '').lower().split():
+            if word.isascii() and (word.isdigit() or word.isalpha()):
+                tokens.append(word)
+                continue
+            parts = self._word_tokens.get(word)
+            if parts is None:
+                parts = self._word_tokens[word] = word_tokens(word)
+            tokens += parts
+        return tuple(dict.fromkeys(tokens))
+
+    def vocabulary(self):
+        """Todas las palabras, ordenadas (se arma de nuevo solo si cambiaron)"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        return self._vocabulary
+
+    def token_rows(self, query_token):
+        """
+        Filas con alguna palabra que coincide con una de la búsqueda, por
+        puntaje ({puntaje: filas}; cada fila queda solo con su mejor puntaje).
+        Las filas de las palabras de cada puntaje se juntan de una vez: "1"
+        puede ser el comienzo de miles de códigos.
+        """
+        postings = self.postings
+        groups = {}
+        exact = postings.get(query_token, set())
+        if exact:
+            groups[EXACT] = exact
+
+        vocabulary = self.vocabulary()
+        start = bisect.bisect_left(vocabulary, query_token)
+        end = bisect.bisect_left(vocabulary, query_token + '\uffff', start)
+        prefix = set().union(*(postings[token] for token in vocabulary[start:end] if token != query_token))
+        prefix -= exact
+        if prefix:
+            groups[PREFIX] = prefix
+
+        if infix_searchable(query_token):
+            candidates = None
+            for trigram in trigrams(query_token):
+                tokens = self.trigram_tokens.get(trigram)
+                if not tokens:
+                    candidates = ()
+                    break
+                candidates = set(tokens) if candidates is None else candidates & tokens
+            infix = set().union(*(postings[token] for token in candidates
+                                  if query_token in token and not token.startswith(query_token)))
+            infix -= exact
+            infix -= prefix
+            if infix:
+                groups[INFIX] = infix
+        elif suffix_searchable(query_token):
+            # Los códigos que terminan igual quedan juntos en la lista dada vuelta
+            reversed_barcodes = self.reversed_barcodes
+            reversed_query = query_token[::-1]
+            start = bisect.bisect_left(reversed_barcodes, reversed_query)
+            end = bisect.bisect_left(reversed_barcodes, reversed_query + '\uffff', start)
+            suffix = set().union(*(postings[token[::-1]] for token in reversed_barcodes[start:end]))
+            suffix -= exact
+            suffix -= prefix
+            if suffix:
+                groups[INFIX] = suffix
+        return groups
+
+    def search(self, query):
+        """
+        Filas que coinciden con la búsqueda agrupadas por puntaje ({puntaje:
+        filas}, sin modificar: pueden ser los conjuntos del índice), o None si
+        la búsqueda no tiene palabras (coinciden todas). Todo se resuelve con
+        operaciones entre conjuntos, sin recorrer las filas una por una.
+        """
+        query_tokens = self.text_tokens(query)
+        if not query_tokens:
+            return None
+
+        per_token = []
+        for query_token in query_tokens:
+            groups = self.token_rows(query_token)
+            if not groups:
+                return {}
+            per_token.append(groups)
+        # Primero la palabra con menos filas: las intersecciones se achican antes
+        per_token.sort(key=lambda groups: sum(len(rows) for rows in groups.values()))
+
+        result = per_token[0]
+        for groups in per_token[1:]:
+            combined = {}
+            for score, rows in result.items():
+                for token_score, token_rows in groups.items():
+                    both = rows & token_rows
+                    if both:
+                        total = score + token_score
+                        combined[total] = combined[total] | both if total in combined else both
+            result = combined
+            if not result:
+                break
+        return result
@@ -0,0 +1,142 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QRect, pyqtSignal
+from PyQt5.QtGui import QPalette
+
+from utils.formatters import format_currency
+from utils.money import Money
+from widgets.product_table import ActionButtonsDelegate
+
+
+class CartTableModel(QAbstractTableModel):
+    """
+    Items del carrito (los diccionarios que recibe save_sale) para una
+    QTableView. Cada cambio avisa solo la fila afectada y el total se lleva
+    sumando y restando las diferencias, sin recorrer el carrito.
+    """
+
+    COLUMNS = ["Producto", "Precio", "Cantidad", "Subtotal", ""]
+    RIGHT_ALIGNED = (1, 3)
+
+    totalChanged = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items = []
+        self.total = Money(0)
+
+    def set_items(self, items):
+        """Reemplazar todo el carrito (vaciarlo, o cargar uno armado)"""
+        self.beginResetModel()
+        self.items = list(items)
+        self.endResetModel()
+        self.set_total(sum((item['subtotal'] for item in self.items), Money(0)))
+
+    def add_item(self, item):
+        row = len(self.items)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.items.append(item)
+        self.endInsertRows()
+        self.set_total(self.total + item['subtotal'])
+
+    def remove_item(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        item = self.items.pop(row)
+        self.endRemoveRows()
+        self.set_total(self.total - item['subtotal'])
+
+    def set_quantity(self, row, quantity):
+        item = self.items[row]
+        item['quantity'] = quantity
+        self._update_subtotal(row, item)
+
+    def set_price(self, row, price):
+        item = self.items[row]
+        item['price'] = price
+        self._update_subtotal(row, item)
+
+    def _update_subtotal(self, row, item):
+        previous = item['subtotal']
+        item['subtotal'] = item['price'] * item['quantity']
+        # Precio, cantidad y subtotal de esa fila
+        self.dataChanged.emit(self.index(row, 1), self.index(row, 3))
+        self.set_total(self.total + item['subtotal'] - previous)
+
+    def set_total(self, total):
+        self.total = total
+        self.totalChanged.emit(total)
+
+    def record(self, row):
+        return self.items[row]
+
+    def row_of(self, item):
+        """Fila de un item (el mismo diccionario, no uno igual)"""
+        for row, current in enumerate(self.items):
+            if current is item:
+                return row
+        return -1
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.items[index.row()]
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return item['name']
+            if column == 1:
+                return format_currency(item['price'])
+            if column == 2:
+                return str(item['quantity'])
+            if column == 3:
+                return format_currency(item['subtotal'])
+            return None
+        if role == Qt.TextAlignmentRole and column in self.RIGHT_ALIGNED:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def flags(self, index):
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled if index.isValid() else Qt.NoItemFlags
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return str(section + 1)
+
+
+class QuantityDelegate(ActionButtonsDelegate):
+    """Botones - y + con la cantidad (el texto de la celda) en el medio"""
+
+    def __init__(self, buttons, view, text_width=38, **kwargs):
+        super().__init__(buttons, view, **kwargs)
+        self.text_width = text_width
+
+    def button_rects(self, cell):
+        minus, plus = super().button_rects(cell)
+        plus.translate(self.text_width, 0)
+        return [minus, plus]
+
+    def text_rect(self, cell):
+        minus = super().button_rects(cell)[0]
+        return QRect(minus.right() + 1 + self.spacing, minus.top(),
+                     self.text_width - self.spacing, minus.height())
+
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)
+        painter.save()
+        painter.setFont(self.font)
+        painter.setPen(option.palette.color(QPalette.Text))
+        painter.drawText(self.text_rect(option.rect), Qt.AlignCenter, index.data(Qt.DisplayRole))
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        size.setWidth(size.width() + self.text_width)
+        return size
@@ -4,8 +4,10 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QFormLayout, QLineEdit,
 from PyQt5.QtCore import Qt
 
 class ProductDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, categories=None):
         super().__init__(parent)
+        # Nombres de las categorías de la base (del catálogo), además de las predeterminadas
+        self.categories = categories or []
         self.setWindowTitle("➕ Nuevo Producto")
         self.setModal(True)
         self.setFixedSize(500, 550)  # Un poco más grande para mejor visualización
@@ -141,8 +143,7 @@ class ProductDialog(QDialog):
 
     def load_categories(self):
         """Cargar categorías existentes desde la base de datos"""
-        # Esto se conectará con la base de datos
-        # Por ahora usamos categorías por defecto + cualquier nueva que se haya agregado
+        # Categorías por defecto + las que se hayan agregado en la base
         default_categories = [
             "Bebidas", "Snacks", "Cigarrillos", "Golosinas",
             "Lácteos", "Panadería", "Limpieza", "Otros"
@@ -150,6 +151,7 @@ class ProductDialog(QDialog):
 
         self.category_combo.clear()
         self.category_combo.addItems(default_categories)
+        self.category_combo.addItems([name for name in self.categories if name not in default_categories])
 
     def get_product_data(self):
         # Obtener el ID de la categoría si existe, o crear una nueva
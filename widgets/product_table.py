@@ -0,0 +1,372 @@
+from collections import namedtuple
+
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle, QApplication, QToolTip
+from PyQt5.QtCore import Qt, QAbstractTableModel, QAbstractProxyModel, QModelIndex, QRect, QEvent
+from PyQt5.QtGui import QColor, QCursor, QPainter, QFont
+
+# Espera desde la última tecla antes de filtrar (escribir rápido filtra una sola vez)
+SEARCH_DELAY_MS = 150
+
+# Columna de la grilla: funciones de la tupla del producto para el texto, el
+# color del texto y el orden al tocar el encabezado (None = no se muestra / no ordena)
+ProductColumn = namedtuple('ProductColumn', 'title text alignment color sort_key',
+                           defaults=(None, None, None, None))
+
+# Botón pintado por ActionButtonsDelegate. on_click y enabled reciben el registro de la
+# fila (model.record(row): el producto, o el item del carrito); enabled None = siempre habilitado
+ActionButton = namedtuple('ActionButton', 'text tooltip color hover_color on_click enabled',
+                          defaults=(None,))
+
+
+def stock_color(stock, min_stock):
+    """Color del indicador de stock: agotado, bajo o normal"""
+    if stock == 0:
+        return "#ef4444"
+    if stock <= min_stock:
+        return "#f59e0b"
+    return "#10b981"
+
+
+def stock_text(stock, min_stock):
+    if stock == 0:
+        return "❌ Agotado"
+    if stock <= min_stock:
+        return f"⚠️ {stock}"
+    return f"✅ {stock}"
+
+
+class ProductTableModel(QAbstractTableModel):
+    """
+    Productos del catálogo compartido (db_catalog.CatalogService) para una
+    QTableView. No copia los productos ni crea items o widgets por fila: la
+    fila es la posición del producto en el catálogo y la vista pide el texto
+    de las celdas que está mostrando. Cuando el catálogo cambia se redibujan
+    solo las filas afectadas (o todo, si cambiaron posiciones u orden).
+    """
+
+    ROLES = frozenset((Qt.DisplayRole, Qt.TextAlignmentRole, Qt.ForegroundRole))
+
+    def __init__(self, columns, catalog, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.catalog = catalog
+        self._colors = {}
+        catalog.add_listener(self.on_catalog_changed)
+
+    def on_catalog_changed(self, change):
+        if change.reset:
+            self.beginResetModel()
+            self.endResetModel()
+            return
+        last_column = len(self.columns) - 1
+        for row in change.updated:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, last_column))
+
+    def record(self, row):
+        return self.catalog.product(row)
+
+    def default_order(self):
+        """Filas en el orden de get_products (por nombre)"""
+        return self.catalog.name_order()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.catalog)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        return self.cell(index.row(), index.column(), role)
+
+    def cell(self, row, column, role):
+        """Dato de una celda sin pasar por QModelIndex (la vista pide varios roles por celda)"""
+        if role not in self.ROLES:
+            return None
+        product = self.catalog.product(row)
+        column = self.columns[column]
+
+        if role == Qt.DisplayRole:
+            return column.text(product) if column.text else None
+        if role == Qt.TextAlignmentRole and column.alignment is not None:
+            return int(column.alignment)
+        if role == Qt.ForegroundRole and column.color is not None:
+            color = column.color(product)
+            if color not in self._colors:
+                self._colors[color] = QColor(color)
+            return self._colors[color]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns[section].title
+        return str(section + 1)
+
+    def sort_key(self, column):
+        return self.columns[column].sort_key
+
+
+class ProductFilterProxy(QAbstractProxyModel):
+    """
+    Filas visibles de un ProductTableModel, en orden. El módulo busca en el
+    índice del catálogo, ordena las filas encontradas con ranked_rows() (o toma
+    ordered_rows() si no hay búsqueda), les aplica sus demás filtros y las
+    muestra con set_rows. La vista solo pide los datos de las filas que
+    entran en pantalla.
+    """
+
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        self._proxy_rows = None
+        self._sort_column = None
+        self._sort_order = Qt.AscendingOrder
+        self._ordered_rows = None
+        self._positions = None
+        self.setSourceModel(source)
+        source.modelReset.connect(self.on_source_reset)
+        source.dataChanged.connect(self.on_source_changed)
+
+    def set_rows(self, rows):
+        """Mostrar estas filas del modelo (posiciones del catálogo), en el orden en que vienen"""
+        # Las primeras letras de una búsqueda suelen dejar las mismas filas: no se redibuja
+        if rows == self.rows:
+            return
+        self.beginResetModel()
+        self.rows = rows
+        self._proxy_rows = None
+        self.endResetModel()
+
+    def on_source_reset(self):
+        # Las filas anteriores apuntan a productos que ya no están en esa posición
+        self._ordered_rows = None
+        self._positions = None
+        self.set_rows([])
+
+    def on_source_changed(self, top_left, bottom_right):
+        if self._ordered_rows is not None and not all(
+                self.still_ordered(source_row) for source_row in range(top_left.row(), bottom_right.row() + 1)):
+            # Un precio o un stock nuevo movió la fila en el orden: se rearma en el próximo filtro
+            self._ordered_rows = None
+            self._positions = None
+        for source_row in range(top_left.row(), bottom_right.row() + 1):
+            row = self.proxy_rows().get(source_row)
+            if row is not None:
+                self.dataChanged.emit(self.index(row, top_left.column()),
+                                      self.index(row, bottom_right.column()))
+
+    def still_ordered(self, source_row):
+        """Si la fila sigue entre sus vecinas en el orden de la columna elegida"""
+        ordered = self._ordered_rows
+        position = self.positions(ordered)[source_row]
+        source = self.sourceModel()
+        key = source.sort_key(self._sort_column)
+        value = key(source.record(source_row))
+        if self._sort_order == Qt.DescendingOrder:
+            before = lambda a, b: b <= a
+        else:
+            before = lambda a, b: a <= b
+        return ((position == 0 or before(key(source.record(ordered[position - 1])), value))
+                and (position == len(ordered) - 1 or before(value, key(source.record(ordered[position + 1])))))
+
+    def proxy_rows(self):
+        """Fila de la vista de cada fila del modelo (se arma solo si hace falta)"""
+        if self._proxy_rows is None:
+            self._proxy_rows = {source_row: row for row, source_row in enumerate(self.rows)}
+        return self._proxy_rows
+
+    def ordered_rows(self):
+        """Todas las filas del modelo en el orden de la columna elegida (o el del modelo)"""
+        source = self.sourceModel()
+        if self._sort_column is None:
+            return source.default_order()
+        if self._ordered_rows is None:
+            key = self.sourceModel().sort_key(self._sort_column)
+            self._ordered_rows = sorted(source.default_order(), key=lambda row: key(source.record(row)),
+                                        reverse=self._sort_order == Qt.DescendingOrder)
+            self._positions = None
+        return self._ordered_rows
+
+    def ranked_rows(self, groups):
+        """
+        Filas de una búsqueda ({puntaje: filas} de SearchIndex.search): primero
+        las de más puntaje y, a igual puntaje, en el orden de ordered_rows().
+        Sin búsqueda (None) son todas las filas.
+        """
+        ordered = self.ordered_rows()
+        if groups is None:
+            return list(ordered)
+        rows = []
+        for score in sorted(groups, reverse=True):
+            rows += self.in_order(groups[score], ordered)
+        return rows
+
+    def in_order(self, rows, ordered):
+        """Un conjunto de filas del modelo en el orden de ordered_rows()"""
+        if isinstance(ordered, range):
+            return sorted(rows)
+        if len(rows) * 4 > len(ordered):
+            return [row for row in ordered if row in rows]
+        # Pocas filas: se ordenan por su posición en lugar de recorrer todas
+        return sorted(rows, key=self.positions(ordered).__getitem__)
+
+    def positions(self, ordered):
+        """Posición de cada fila del modelo en ordered_rows() (se arma solo si hace falta)"""
+        if self._positions is None:
+            self._positions = [0] * len(ordered)
+            for position, row in enumerate(ordered):
+                self._positions[row] = position
+        return self._positions
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if column < 0 or self.sourceModel().sort_key(column) is None:
+            return
+        self._sort_column = column
+        self._sort_order = order
+        self._ordered_rows = None
+        self._positions = None
+        # Tocar un encabezado ordena la búsqueda actual por esa columna, sin el puntaje
+        visible = set(self.rows)
+        self.set_rows([row for row in self.ordered_rows() if row in visible])
+
+    def record(self, row):
+        """Producto de una fila de la vista"""
+        return self.sourceModel().record(self.rows[row])
+
+    # ===== QAbstractProxyModel =====
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self.rows)) or not (0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.sourceModel().columnCount()
+
+    def data(self, index, role=Qt.DisplayRole):
+        # Directo al modelo, sin armar el índice de origen para cada rol de cada celda
+        if not index.isValid():
+            return None
+        return self.sourceModel().cell(self.rows[index.row()], index.column(), role)
+
+    def flags(self, index):
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled if index.isValid() else Qt.NoItemFlags
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self.rows[proxy_index.row()], proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        row = self.proxy_rows().get(source_index.row())
+        return QModelIndex() if row is None else self.index(row, source_index.column())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        # Los títulos no dependen de las filas (la versión base los busca en la fila 0)
+        return self.sourceModel().headerData(section, orientation, role)
+
+
+class ActionButtonsDelegate(QStyledItemDelegate):
+    """
+    Pinta los botones de acción de una celda (en lugar de un QPushButton por
+    fila) y ejecuta on_click(registro) al soltar el mouse sobre uno habilitado.
+    El registro se pide al modelo (record) y no con index.data(): un QVariant
+    devolvería una copia de la tupla o el diccionario, no el mismo objeto.
+    Sin button_width, un único botón ocupa el ancho de la celda.
+    """
+
+    DISABLED_COLOR = "#9ca3af"
+    DISABLED_TEXT_COLOR = "#6b7280"
+
+    def __init__(self, buttons, view, button_width=None, button_height=35, spacing=4, margin=4):
+        super().__init__(view)
+        self.buttons = buttons
+        self.view = view
+        self.button_width = button_width
+        self.button_height = button_height
+        self.spacing = spacing
+        self.margin = margin
+        self.font = QFont()
+        self.font.setPixelSize(12)
+        self.font.setBold(True)
+        view.setMouseTracking(True)
+
+    def button_rects(self, cell):
+        height = min(self.button_height, cell.height() - 2)
+        top = cell.top() + (cell.height() - height) // 2
+        if self.button_width is None:
+            width = (cell.width() - 2 * self.margin - self.spacing * (len(self.buttons) - 1)) // len(self.buttons)
+        else:
+            width = self.button_width
+        return [QRect(cell.left() + self.margin + i * (width + self.spacing), top, width, height)
+                for i in range(len(self.buttons))]
+
+    def is_enabled(self, button, record):
+        return button.enabled is None or bool(button.enabled(record))
+
+    def paint(self, painter, option, index):
+        # Fondo de la celda (alternado / selección) como en las demás columnas
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawPrimitive(QStyle.PE_PanelItemViewItem, option, painter, option.widget)
+
+        record = index.model().record(index.row())
+        hover = None
+        if option.state & QStyle.State_MouseOver:
+            hover = self.view.viewport().mapFromGlobal(QCursor.pos())
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setFont(self.font)
+        for button, rect in zip(self.buttons, self.button_rects(option.rect)):
+            if not self.is_enabled(button, record):
+                background, text_color = self.DISABLED_COLOR, self.DISABLED_TEXT_COLOR
+            elif hover is not None and rect.contains(hover):
+                background, text_color = button.hover_color, "white"
+            else:
+                background, text_color = button.color, "white"
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor(background))
+            painter.drawRoundedRect(rect, 6, 6)
+            painter.setPen(QColor(text_color))
+            painter.drawText(rect, Qt.AlignCenter, button.text)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        if self.button_width is not None:
+            size.setWidth(2 * self.margin + len(self.buttons) * (self.button_width + self.spacing))
+        size.setHeight(max(size.height(), self.button_height + 4))
+        return size
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseMove:
+            # Cambia el color del botón bajo el mouse
+            self.view.viewport().update(option.rect)
+            return False
+        if event.type() != QEvent.MouseButtonRelease or event.button() != Qt.LeftButton:
+            return False
+
+        record = model.record(index.row())
+        for button, rect in zip(self.buttons, self.button_rects(option.rect)):
+            if rect.contains(event.pos()) and self.is_enabled(button, record):
+                button.on_click(record)
+                return True
+        return False
+
+    def helpEvent(self, event, view, option, index):
+        for button, rect in zip(self.buttons, self.button_rects(option.rect)):
+            if button.tooltip and rect.contains(event.pos()):
+                QToolTip.showText(event.globalPos(), button.tooltip, view)
+                return True
+        return super().helpEvent(event, view, option, index)